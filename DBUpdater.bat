@@ -1,19 +1,8 @@
 @echo off
 title stock_db update
 
-:retry
-ping -n 1 www.google.com > nul
-if %errorlevel%==0 (
-    echo Internet connection is available.
-    rem 다음에 실행할 명령을 여기에 넣으세요. 예: start firefox.exe
-
-    cd C:\Users\taelyon\OneDrive\Document\stock_analysis
-    C:\Users\taelyon\AppData\Local\Programs\Python\Python312\python DBUpdater_new.py
-    cmd.exe
-
-) else (
-    echo Internet connection is not available. Waiting for 60 seconds before retrying...
-    timeout /t 10
-    goto retry
-)
+rem 장 마감 후 자동 업데이트 데몬을 실행합니다. (휴장일은 거래소 캘린더로 건너뜀)
+rem 한 번만 실행하려면 --once, 실행 기록은 --status 옵션을 사용하세요.
+cd /d %~dp0
+C:\Users\taelyon\AppData\Local\Programs\Python\Python312\python update_daemon.py %*
 pause
@@ -1,70 +1,317 @@
+import os
 import sqlite3
-from datetime import datetime, timedelta
+import sys
+from datetime import datetime, timedelta, timezone
 import pandas as pd
+import numpy as np
 import FinanceDataReader as fdr
 from bs4 import BeautifulSoup
-import requests
 import re
 import yfinance as yf
-import exchange_calendars as xcals
 import warnings
 import json
 import threading
+import queue
 import time
 import concurrent.futures
+import contextlib
+import io
+from http_client import get_http_client
+from http_cache import configure_response_cache, get_response_cache
+from db_pool import get_connection_pool, print_pool_stats
+from market_calendar import FreshnessOracle, sync_timestamp
+from sise_parser import parse_sise_json, parse_sise_minute_json, sise_arrays_to_frame
+from price_sources import FETCH_TIMEOUT, PriceSource, hedged_fetch, print_latency_stats
+from job_scheduler import (PRIORITY_BULK, PRIORITY_WATCHLIST, JobCancelled, bind_context, current_token,
+                           get_job_scheduler)
+from minute_store import MinuteBarStore
+from single_flight import get_single_flight, print_single_flight_stats
 
 warnings.filterwarnings('ignore')
 
+# 시세를 처음 수집할 때의 기본 시작일
+DEFAULT_START_DATE = '2024-01-01'
+# yfinance 일괄 다운로드 시 한 번에 요청할 티커 수
+YF_BATCH_SIZE = 100
+# 병렬 수집 스레드 수 상한 (호스트별 실제 동시 요청 수는 http_client가 적응적으로 조절)
+MAX_FETCH_WORKERS = 50
+# sise_day HTML 페이지를 종목당 동시에 요청할 수
+NAVER_PAGE_WORKERS = 8
+# 업종별 구성 종목 페이지를 다시 수집하기 전까지 유지하는 기간
+SECTOR_TTL = timedelta(days=7)
+# 과거 시세 백필 시 한 번에 요청하는 구간 길이
+BACKFILL_CHUNK_DAYS = 365
+# resume=True일 때 이어서 실행할 수 있는 중단된 작업의 최대 경과 시간
+JOB_RESUME_MAX_AGE = timedelta(hours=12)
+# 분봉을 처음 받을 때 가져올 기간(일). 네이버 siseJson 분봉과 yfinance 1분봉은 최근 며칠치만 제공합니다.
+MINUTE_LOOKBACK_DAYS = 5
+# siseJson 분봉 요청의 하루 분봉 수 상한 (정규장 + 시간외 여유분)
+MINUTE_BARS_PER_DAY = 400
+
+
+def default_db_dir():
+    """DB 기본 폴더: PyInstaller 실행 파일이면 exe가 있는 폴더, 아니면 이 모듈이 있는 폴더"""
+    if getattr(sys, 'frozen', False):
+        return os.path.dirname(sys.executable)
+    return os.path.dirname(os.path.abspath(__file__))
+
+
+# DB 파일 위치. 실행 위치(cwd)와 무관하며 STOCK_DB_DIR 환경 변수로 바꿀 수 있습니다.
+DB_DIR = os.environ.get('STOCK_DB_DIR') or default_db_dir()
+# HTTP 응답 캐시도 DB 폴더 기준으로 둡니다. (STOCK_HTTP_CACHE_DIR의 상대 경로도 DB 폴더 기준)
+configure_response_cache(base_dir=DB_DIR)
+DB_FILENAME = 'investar.db'
+# 저장 레이아웃
+# - sharded: 종목 목록/작업 기록은 investar.db, 시세는 국가별 파일(investar_kr.db, investar_us.db)에 저장하여
+#            한국/미국 시세 저장이 서로의 쓰기 잠금을 기다리지 않고 동시에 커밋됩니다.
+# - single: 모든 테이블을 investar.db 하나에 저장합니다. (이전 방식)
+DB_LAYOUT = os.environ.get('STOCK_DB_LAYOUT', 'sharded')
+SHARD_COUNTRIES = ('kr', 'us')
+# 국가별 파일에 두는 테이블
+SHARDED_TABLES = ('daily_bar', 'daily_price', 'price_sync', 'price_coverage')
+# 일별 시세 저장 형식 (새로 만드는 시세 파일에 적용하며, 기존 파일은 저장된 형식을 그대로 사용합니다)
+# - compact: daily_bar 테이블에 날짜는 1970-01-01 기준 일수(INTEGER), 가격은 NUMERIC으로 저장합니다.
+#            (code, day) 순서로 묶인 WITHOUT ROWID 테이블이라 종목별 구간 조회가 이웃한 페이지만 읽고,
+#            원화 가격처럼 정수인 값은 정수로 저장되어 파일이 작아집니다. 기존 SQL은 daily_price 호환 뷰로 동작합니다.
+# - text: 날짜 TEXT, 가격 REAL인 daily_price 테이블 (이전 방식). migrate_price_schema()로 compact로 변환합니다.
+DB_SCHEMA = os.environ.get('STOCK_DB_SCHEMA', 'compact')
+# compact 변환 시 한 트랜잭션에서 옮기는 종목 수 (변환 중에도 다른 연결이 읽고 쓸 수 있도록 나눠서 커밋)
+SCHEMA_MIGRATE_BATCH = 200
+# 일수 <-> 'YYYY-MM-DD' 변환 SQL (1970-01-01의 율리우스일 = 2440587.5)
+DAY_TO_DATE_SQL = "date({} + 2440587.5)"
+DATE_TO_DAY_SQL = "CAST(julianday({}) - 2440587.5 AS INTEGER)"
+# compact 시세 테이블, 날짜별 조회 인덱스, 기존 SQL용 daily_price 호환 뷰와 쓰기 트리거
+# 호환 뷰의 가격 컬럼. daily_bar는 원화 가격을 정수로 저장하므로 text 형식(REAL 컬럼)과 같은 타입으로 돌려줍니다.
+COMPACT_VIEW_PRICES = ', '.join(f"CAST({name} AS REAL) AS {name}" for name in ('open', 'high', 'low', 'close', 'diff'))
+COMPACT_PRICE_DDL = (
+    """
+    CREATE TABLE IF NOT EXISTS daily_bar (
+        code TEXT NOT NULL, day INTEGER NOT NULL, open NUMERIC, high NUMERIC, low NUMERIC, close NUMERIC,
+        diff NUMERIC, volume INTEGER, PRIMARY KEY (code, day)
+    ) WITHOUT ROWID""",
+    "CREATE INDEX IF NOT EXISTS idx_daily_bar_day ON daily_bar (day)",
+    f"""
+    CREATE VIEW IF NOT EXISTS daily_price AS
+    SELECT code, {DAY_TO_DATE_SQL.format('day')} AS date, {COMPACT_VIEW_PRICES}, volume FROM daily_bar""",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS daily_price_insert INSTEAD OF INSERT ON daily_price BEGIN
+        INSERT OR REPLACE INTO daily_bar (code, day, open, high, low, close, diff, volume)
+        VALUES (NEW.code, {DATE_TO_DAY_SQL.format('NEW.date')}, NEW.open, NEW.high, NEW.low, NEW.close,
+                NEW.diff, NEW.volume);
+    END""",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS daily_price_update INSTEAD OF UPDATE ON daily_price BEGIN
+        UPDATE daily_bar SET open = NEW.open, high = NEW.high, low = NEW.low, close = NEW.close,
+               diff = NEW.diff, volume = NEW.volume
+        WHERE code = OLD.code AND day = {DATE_TO_DAY_SQL.format('OLD.date')};
+    END""",
+    f"""
+    CREATE TRIGGER IF NOT EXISTS daily_price_delete INSTEAD OF DELETE ON daily_price BEGIN
+        DELETE FROM daily_bar WHERE code = OLD.code AND day = {DATE_TO_DAY_SQL.format('OLD.date')};
+    END""",
+)
+# 시세 조회 결과에서 실수형으로 맞추는 컬럼 (compact에서는 정수로 저장된 원화 가격이 섞여 있음)
+PRICE_COLUMNS = ['open', 'high', 'low', 'close', 'diff']
+
+# 연결 프로파일: 연결을 열 때 적용할 PRAGMA 목록 (순서대로 실행)
+# - ingest: 대량 수집용. WAL + synchronous=NORMAL로 커밋 비용을 줄이고 캐시/mmap을 크게 잡습니다.
+# - read: 조회용. WAL에서 writer와 동시에 읽을 수 있으며 mmap으로 범위 조회를 빠르게 합니다.
+# - legacy: SQLite 기본 설정 (롤백 저널, synchronous=FULL) 그대로 사용합니다.
+DB_PROFILES = {
+    'ingest': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -131072,      # 128MB (음수는 KiB 단위)
+        'mmap_size': 268435456,     # 256MB
+        'temp_store': 'MEMORY',
+        'busy_timeout': 10000,
+    },
+    'read': {
+        'journal_mode': 'WAL',
+        'synchronous': 'NORMAL',
+        'cache_size': -32768,       # 32MB
+        'mmap_size': 268435456,
+        'temp_store': 'MEMORY',
+        'busy_timeout': 5000,
+    },
+    'legacy': {},
+}
+
+
+def date_to_day(date):
+    """'YYYY-MM-DD' 문자열 또는 Timestamp를 1970-01-01 기준 일수(compact 스키마의 day)로 변환합니다."""
+    return int(np.datetime64(pd.Timestamp(date).date(), 'D').astype(np.int64))
+
+
+def cached_stock_listing(market):
+    """fdr.StockListing(market) 결과를 디스크 응답 캐시에 보관하여 하루 동안 재사용합니다."""
+    return get_response_cache().get_object(f'fdr:{market}', 'fdr_listing', lambda: fdr.StockListing(market))
+
+
 class DBManager:
-    """ 각 스레드가 독립적인 DB 연결을 갖도록 관리하는 기반 클래스 """
-    def __init__(self):
-        self.thread_local = threading.local()
+    """
+    프로세스 공용 연결 풀(db_pool)에서 연결을 빌려 쓰는 기반 클래스.
+    같은 파일을 쓰는 DBUpdater/MarketDB 인스턴스는 하나의 풀을 공유하며, 연결 프로파일(read/ingest 등)별로
+    조회용과 저장용 연결 수를 따로 제한합니다. _get_db_conn()은 현재 스레드에 연결을 묶어 close_db_conn()까지 쓰고,
+    connection()은 with 블록 동안만 빌려 바로 반납합니다.
+    sharded 레이아웃에서는 기본 연결에 국가별 시세 파일을 ATTACH하고 시세 테이블 이름으로
+    국가별 테이블을 합친 임시 뷰(UNION ALL)를 만들어, 조회 코드는 레이아웃과 관계없이 같은 SQL을 사용합니다.
+    시세 쓰기는 connection(country)로 국가별 파일 연결을 빌려 직접 씁니다.
+    시세 저장 형식(schema)은 연결할 때 파일에 있는 테이블로 판단하며, 시세 테이블이 없으면 schema 인자(기본 DB_SCHEMA)를 따릅니다.
+    """
+    default_profile = 'read'
+
+    def __init__(self, db_path=None, profile=None, layout=None, schema=None):
+        # 상대 경로는 DB_DIR 기준으로 해석하므로 실행 위치가 달라도 같은 파일을 사용합니다.
+        self.db_path = os.path.join(DB_DIR, db_path or DB_FILENAME)
+        self.profile = profile or self.default_profile
+        self.layout = layout or DB_LAYOUT
+        self.schema = schema or DB_SCHEMA
+        self.pool = get_connection_pool((os.path.abspath(self.db_path), self.layout), self._open_main_conn,
+                                        name=os.path.basename(self.db_path))
+        self.schema_checked = False
+
+    def shard_path(self, country):
+        """국가별 시세 파일 경로 (investar.db -> investar_kr.db)"""
+        root, ext = os.path.splitext(self.db_path)
+        return f"{root}_{country}{ext}"
+
+    def _shard_pool(self, country):
+        path = self.shard_path(country)
+        return get_connection_pool((os.path.abspath(path), 'single'), lambda profile: self._connect(path, profile),
+                                   name=os.path.basename(path))
+
+    def _connect(self, path, profile):
+        # 풀에서 반납된 연결은 다른 스레드가 다시 빌려 쓰므로 생성 스레드 검사를 끕니다. (한 번에 한 스레드만 사용)
+        conn = sqlite3.connect(path, check_same_thread=False)
+        for name, value in DB_PROFILES[profile].items():
+            conn.execute(f"PRAGMA {name}={value}")
+        return conn
+
+    def _open_main_conn(self, profile):
+        """풀이 새 기본 연결을 만들 때 호출합니다. sharded면 국가별 시세 파일을 ATTACH하고 임시 뷰를 만듭니다."""
+        conn = self._connect(self.db_path, profile)
+        if self.layout == 'sharded':
+            cur = conn.cursor()
+            for country in SHARD_COUNTRIES:
+                cur.execute(f"ATTACH DATABASE ? AS {country}", (self.shard_path(country),))
+            self._create_shard_views(cur)
+        return conn
+
+    def _check_schema(self, conn):
+        if not self.schema_checked:
+            self.schema = self._stored_schema(conn.cursor()) or self.schema
+            self.schema_checked = True
 
     def _get_db_conn(self):
-        """ 현재 스레드에 대한 DB 연결 및 커서를 가져오거나 생성합니다. """
-        if not hasattr(self.thread_local, 'conn'):
-            self.thread_local.conn = sqlite3.connect('investar.db')
-            self.thread_local.cur = self.thread_local.conn.cursor()
-        return self.thread_local.conn, self.thread_local.cur
+        """ 현재 스레드에 묶인 기본 연결과 새 커서를 반환합니다. (없으면 풀에서 빌려 close_db_conn()까지 사용) """
+        conn = self.pool.acquire(self.profile)
+        self._check_schema(conn)
+        return conn, conn.cursor()
+
+    @contextlib.contextmanager
+    def connection(self, country=None):
+        """
+        with 블록 동안만 기본 연결(country가 있으면 그 국가의 시세 파일 연결)을 빌려 (conn, cur)를 제공합니다.
+        작업 스레드처럼 수집 중에 오래 기다릴 수 있는 곳에서 연결을 붙잡고 있지 않도록 사용합니다.
+        """
+        if country is not None and self.layout == 'sharded':
+            if country not in SHARD_COUNTRIES:
+                raise ValueError(f"시세 파일이 없는 국가입니다: {country}")
+            pool = self._shard_pool(country)
+        else:
+            pool = self.pool
+        with pool.lease(self.profile) as conn:
+            if pool is self.pool:
+                self._check_schema(conn)
+            yield conn, conn.cursor()
+
+    def _stored_schema(self, cur):
+        """
+        시세 파일에 저장된 형식. text 형식 daily_price 테이블이 하나라도 남아 있으면 'text'
+        (변환 중인 파일은 호환 뷰로도 읽고 쓸 수 있으므로), daily_bar만 있으면 'compact', 시세 테이블이 없으면 None.
+        """
+        found = set()
+        for db in (SHARD_COUNTRIES if self.layout == 'sharded' else ('main',)):
+            cur.execute(f"SELECT name FROM {db}.sqlite_master WHERE type = 'table' AND name IN ('daily_bar', 'daily_price')")
+            found.update(name for name, in cur.fetchall())
+        if 'daily_price' in found:
+            return 'text'
+        return 'compact' if 'daily_bar' in found else None
+
+    def _price_table(self):
+        """현재 형식의 시세 테이블과 날짜 컬럼 이름: ('daily_bar', 'day') 또는 ('daily_price', 'date')"""
+        return ('daily_bar', 'day') if self.schema == 'compact' else ('daily_price', 'date')
+
+    def _date_key(self, date):
+        """'YYYY-MM-DD' 날짜를 현재 형식의 날짜 컬럼 값(일수 또는 문자열)으로 변환합니다."""
+        return date_to_day(date) if self.schema == 'compact' else pd.Timestamp(date).strftime('%Y-%m-%d')
+
+    def _date_sql(self, expr):
+        """날짜 컬럼 SQL 식을 'YYYY-MM-DD' 문자열을 돌려주는 식으로 감쌉니다."""
+        return DAY_TO_DATE_SQL.format(expr) if self.schema == 'compact' else expr
+
+    def _create_shard_views(self, cur):
+        """국가별 시세 테이블(또는 호환 뷰)을 합친 임시 뷰를 (다시) 만듭니다. 아직 테이블이 없는 파일은 제외합니다."""
+        for table in SHARDED_TABLES:
+            sources = []
+            for country in SHARD_COUNTRIES:
+                cur.execute(f"SELECT 1 FROM {country}.sqlite_master WHERE type IN ('table', 'view') AND name = ?",
+                            (table,))
+                if cur.fetchone():
+                    sources.append(f"SELECT * FROM {country}.{table}")
+            cur.execute(f"DROP VIEW IF EXISTS temp.{table}")
+            if sources:
+                cur.execute(f"CREATE TEMP VIEW {table} AS {' UNION ALL '.join(sources)}")
+
+    def _countries_of(self, codes):
+        """
+        종목 코드별 국가 {code: country}. comp_info에 없으면 숫자 코드는 kr, 그 외는 us로 봅니다.
+        """
+        codes = list(codes)
+        with self.connection() as (conn, cur):
+            cur.execute(f"SELECT code, country FROM comp_info WHERE code IN ({', '.join('?' * len(codes))})", codes)
+            known = dict(cur.fetchall())
+        return {code: known.get(code) or ('kr' if code.isdigit() else 'us') for code in codes}
 
     def close_db_conn(self):
-        """ 현재 스레드의 DB 연결을 닫습니다. (필요시 사용) """
-        if hasattr(self.thread_local, 'conn'):
-            self.thread_local.conn.close()
-            del self.thread_local.conn
-            del self.thread_local.cur
+        """ 현재 스레드에 묶인 기본/국가별 시세 파일 연결을 풀에 반납합니다. """
+        self.pool.release()
+        if self.layout == 'sharded':
+            for country in SHARD_COUNTRIES:
+                self._shard_pool(country).release()
 
 class DBUpdater(DBManager):
-    def __init__(self):
+    default_profile = 'ingest'
+
+    def __init__(self, db_path=None, profile=None, layout=None, schema=None):
         """생성자: DB 연결 및 테이블 생성/검증"""
-        super().__init__()
-        conn, cur = self._get_db_conn()
-        self.create_tables(conn, cur)
+        super().__init__(db_path, profile, layout, schema)
+        with self.connection() as (conn, cur):
+            self.create_tables(conn, cur)
         self.ric_codes = {}
-        self.run_update = True
+        self.scheduler = get_job_scheduler()
+        self.price_flight = get_single_flight('daily_price')
+        self.minute_store = MinuteBarStore(self)
+        self.http = get_http_client()
+        self.freshness = FreshnessOracle(self)
 
     def create_tables(self, conn, cur):
         """DB에 필요한 테이블 생성 (없을 경우) 및 스키마 검증"""
-        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='daily_price'")
-        table_exists = cur.fetchone()
-        recreate_daily_price = False
-        if table_exists:
-            cur.execute("PRAGMA table_info(daily_price)")
-            columns = [info[1] for info in cur.fetchall()]
-            expected_columns = ['code', 'date', 'open', 'high', 'low', 'close', 'diff', 'volume']
-            if sorted(columns) != sorted(expected_columns):
-                print("daily_price 테이블 스키마가 변경되어 테이블을 삭제합니다.")
-                cur.execute("DROP TABLE daily_price")
-                recreate_daily_price = True
-        
-        if not table_exists or recreate_daily_price:
-            print("daily_price 테이블을 생성합니다.")
-            sql_daily_price = """
-                CREATE TABLE daily_price (
-                    code TEXT, date TEXT, open REAL, high REAL, low REAL, close REAL, diff REAL, volume INTEGER,
-                    PRIMARY KEY (code, date)
-                );"""
-            cur.execute(sql_daily_price)
+        if self.layout == 'sharded':
+            for country in SHARD_COUNTRIES:
+                with self.connection(country) as (shard_conn, shard_cur):
+                    self.create_price_tables(shard_conn, shard_cur)
+            self._migrate_to_shards(conn, cur)
+            cur.execute("SELECT name, sql FROM sqlite_temp_master WHERE type = 'view'")
+            views = cur.fetchall()
+            self._create_shard_views(cur)
+            cur.execute("SELECT name, sql FROM sqlite_temp_master WHERE type = 'view'")
+            if cur.fetchall() != views:
+                # 새로 생긴 시세 테이블이 풀의 다른 연결의 임시 뷰에도 보이도록 기존 연결을 새로 만듭니다.
+                self.pool.invalidate()
+        else:
+            self.create_price_tables(conn, cur)
 
         sql_comp_info = """
             CREATE TABLE IF NOT EXISTS comp_info (
@@ -72,6 +319,29 @@ class DBUpdater(DBManager):
                 marcap REAL, changes_ratio REAL
             );"""
         cur.execute(sql_comp_info)
+
+        # 네이버 업종 구성 종목과 업종 페이지별 마지막 수집 시각
+        cur.execute("CREATE TABLE IF NOT EXISTS sector_member (code TEXT PRIMARY KEY, sector TEXT)")
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS sector_page (
+                sector TEXT PRIMARY KEY, url TEXT, scraped_at TEXT, n_codes INTEGER
+            )""")
+        # 일괄 시세 업데이트 작업과 종목별 진행 상태 (pending/done/failed). 중단된 작업을 이어서 실행할 때 사용합니다.
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS update_job (
+                job_id INTEGER PRIMARY KEY AUTOINCREMENT, nation TEXT, period INTEGER, status TEXT,
+                created_at TEXT, finished_at TEXT, total INTEGER
+            )""")
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS update_job_item (
+                job_id INTEGER, code TEXT, country TEXT, status TEXT, error TEXT, attempts INTEGER DEFAULT 0,
+                updated_at TEXT, PRIMARY KEY (job_id, code)
+            )""")
+        # 국가별 마지막 종목 목록 갱신일과 그때 반영한 변경 건수
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS listing_refresh (
+                country TEXT PRIMARY KEY, refreshed_at TEXT, added INTEGER, removed INTEGER, changed INTEGER
+            )""")
         conn.commit()
         
         # 기존 테이블에 컬럼이 없을 경우 추가 (마이그레이션)
@@ -88,19 +358,171 @@ class DBUpdater(DBManager):
         except:
             pass
 
-    def init_db(self, table_name='daily_price'):
-        conn, cur = self._get_db_conn()
-        cur.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table_name}'")
-        if cur.fetchone() is not None:
-            cur.execute(f"DROP TABLE {table_name}")
-            conn.commit()
-            print(f"'{table_name}' 테이블이 성공적으로 삭제되었습니다.")
+        self.create_indexes(conn, cur)
+
+    def create_price_tables(self, conn, cur):
+        """
+        시세 테이블(daily_price 또는 daily_bar, price_sync, price_coverage) 생성 및 스키마 검증.
+        sharded면 국가별 파일마다 실행하며, 이미 compact 형식인 파일은 형식과 관계없이 compact로 유지합니다.
+        """
+        cur.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name IN ('daily_bar', 'daily_price')")
+        existing = {name for name, in cur.fetchall()}
+        if 'daily_bar' in existing or (self.schema == 'compact' and 'daily_price' not in existing):
+            cur.execute("SELECT sql FROM sqlite_master WHERE type = 'view' AND name = 'daily_price'")
+            row = cur.fetchone()
+            if row is not None and COMPACT_VIEW_PRICES not in row[0]:
+                # 가격을 저장된 정수 그대로 돌려주던 이전 호환 뷰는 트리거와 함께 새 정의로 다시 만듭니다.
+                cur.execute("DROP VIEW daily_price")
+            for sql in COMPACT_PRICE_DDL:
+                cur.execute(sql)
+            self.create_sync_tables(conn, cur)
+            return
+
+        table_exists = 'daily_price' in existing
+        recreate_daily_price = False
+        if table_exists:
+            cur.execute("PRAGMA table_info(daily_price)")
+            columns = [info[1] for info in cur.fetchall()]
+            expected_columns = ['code', 'date', 'open', 'high', 'low', 'close', 'diff', 'volume']
+            if sorted(columns) != sorted(expected_columns):
+                print("daily_price 테이블 스키마가 변경되어 테이블을 삭제합니다.")
+                cur.execute("DROP TABLE daily_price")
+                recreate_daily_price = True
+        
+        if not table_exists or recreate_daily_price:
+            print("daily_price 테이블을 생성합니다.")
+            sql_daily_price = """
+                CREATE TABLE daily_price (
+                    code TEXT, date TEXT, open REAL, high REAL, low REAL, close REAL, diff REAL, volume INTEGER,
+                    PRIMARY KEY (code, date)
+                );"""
+            cur.execute(sql_daily_price)
+        # 날짜별 횡단면 조회용 인덱스
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_daily_price_date ON daily_price (date)")
+        self.create_sync_tables(conn, cur)
+
+    def create_sync_tables(self, conn, cur):
+        """시세 형식과 관계없는 시세 파일의 보조 테이블(price_sync, price_coverage)을 생성합니다."""
+        # 종목별 마지막 시세 동기화 시각 (UTC). 거래소 캘린더와 비교해 불필요한 재요청을 막습니다.
+        cur.execute("CREATE TABLE IF NOT EXISTS price_sync (code TEXT PRIMARY KEY, synced_at TEXT)")
+        # 종목별로 이미 받아 둔 시세 구간 (백필 시 같은 구간을 다시 받지 않도록 사용)
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS price_coverage (
+                code TEXT, start_date TEXT, end_date TEXT, PRIMARY KEY (code, start_date)
+            )""")
+        conn.commit()
+
+    def _migrate_to_shards(self, conn, cur):
+        """
+        single 레이아웃으로 investar.db에 저장된 시세 테이블이 있으면 국가별 파일로 한 번 옮긴 뒤 삭제합니다.
+        국가는 comp_info 기준이며, comp_info에 없는 종목은 숫자 코드면 kr, 그 외는 us로 옮깁니다.
+        """
+        for table in SHARDED_TABLES:
+            cur.execute("SELECT 1 FROM main.sqlite_master WHERE type = 'table' AND name = ?", (table,))
+            if cur.fetchone() is None:
+                continue
+            print(f"{table} 테이블을 국가별 파일로 옮깁니다...")
+            country_expr = ("coalesce((SELECT c.country FROM main.comp_info c WHERE c.code = t.code), "
+                            "CASE WHEN t.code GLOB '[0-9]*' THEN 'kr' ELSE 'us' END)")
+            with conn:
+                for country in SHARD_COUNTRIES:
+                    target, columns = table, 't.*'
+                    cur.execute(f"SELECT 1 FROM {country}.sqlite_master WHERE type = 'table' AND name = ?", (table,))
+                    if table == 'daily_bar' and cur.fetchone() is None:
+                        # 국가별 파일이 text 형식이면 날짜 문자열로 바꿔 daily_price에 넣습니다.
+                        target = 'daily_price'
+                        columns = f"t.code, {DAY_TO_DATE_SQL.format('t.day')}, t.open, t.high, t.low, t.close, t.diff, t.volume"
+                    # compact 형식 파일의 daily_price는 호환 뷰라서 행이 INSTEAD OF 트리거로 들어가 rowcount가 0이므로,
+                    # 트리거 안의 변경까지 세는 total_changes의 증가분으로 옮긴 행 수를 셉니다.
+                    before = conn.total_changes
+                    cur.execute(f"INSERT OR IGNORE INTO {country}.{target} SELECT {columns} FROM main.{table} t "
+                                f"WHERE {country_expr} = ?", (country,))
+                    print(f"  -> {country}: {conn.total_changes - before}행")
+                if table == 'daily_bar':
+                    cur.execute("DROP VIEW IF EXISTS main.daily_price")
+                cur.execute(f"DROP TABLE main.{table}")
+
+    def create_indexes(self, conn, cur):
+        """조회용 보조 인덱스를 생성합니다. (국가별/종목명 검색. 시세 날짜 인덱스는 create_price_tables)"""
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_comp_info_country ON comp_info (country)")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_comp_info_lower_company ON comp_info (lower(company))")
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_comp_info_lower_code ON comp_info (lower(code))")
+        conn.commit()
+
+    def migrate_price_schema(self, batch_size=SCHEMA_MIGRATE_BATCH, vacuum=True):
+        """
+        text 형식 daily_price 테이블을 compact 형식(daily_bar + daily_price 호환 뷰)으로 변환합니다.
+        종목 batch_size개씩 따로 커밋하며 복사하므로 변환 중에도 다른 연결이 기존 테이블을 읽고 쓸 수 있고,
+        복사하는 동안 새로 저장된 종목(price_sync 기준)은 마지막 교체 트랜잭션에서 다시 복사합니다.
+        vacuum=True면 교체 후 VACUUM으로 파일 크기를 줄입니다.
+        반환값: {파일 경로: {'rows': 옮긴 행 수, 'bytes_before': n, 'bytes_after': n}}
+        """
+        if self.layout == 'sharded':
+            targets = [(self.shard_path(country), country) for country in SHARD_COUNTRIES]
         else:
-            print(f"'{table_name}' 테이블이 존재하지 않습니다.")
+            targets = [(self.db_path, None)]
+        copy_sql = ("INSERT OR REPLACE INTO daily_bar (code, day, open, high, low, close, diff, volume) "
+                    f"SELECT code, {DATE_TO_DAY_SQL.format('date')}, open, high, low, close, diff, volume "
+                    "FROM daily_price WHERE code IN ({})")
+
+        def copy(cur, codes):
+            for i in range(0, len(codes), batch_size):
+                batch = codes[i:i + batch_size]
+                cur.execute(copy_sql.format(', '.join('?' * len(batch))), batch)
+
+        result = {}
+        for path, country in targets:
+            with self.connection(country) as (conn, cur):
+                cur.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'daily_price'")
+                if cur.fetchone() is None:
+                    continue
+                cur.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                bytes_before = os.path.getsize(path)
+                started = sync_timestamp()
+                with conn:
+                    cur.execute(COMPACT_PRICE_DDL[0])
+                cur.execute("SELECT DISTINCT code FROM daily_price")
+                codes = [code for code, in cur.fetchall()]
+                print(f"{os.path.basename(path)}: {len(codes)}개 종목의 시세를 compact 형식으로 옮깁니다...")
+                for i in range(0, len(codes), batch_size):
+                    with conn:
+                        copy(cur, codes[i:i + batch_size])
+                    print(f"  {min(i + batch_size, len(codes))}/{len(codes)}")
+
+                with conn:
+                    # 교체하는 동안 다른 연결의 쓰기를 막고, 복사 이후 저장된 종목을 다시 옮긴 뒤 테이블을 뷰로 바꿉니다.
+                    cur.execute("BEGIN IMMEDIATE")
+                    cur.execute("SELECT code FROM price_sync WHERE synced_at >= ?", (started,))
+                    copy(cur, [code for code, in cur.fetchall()])
+                    cur.execute("SELECT count(*) FROM daily_price")
+                    rows = cur.fetchone()[0]
+                    cur.execute("DROP TABLE daily_price")
+                    for sql in COMPACT_PRICE_DDL:
+                        cur.execute(sql)
+                if vacuum:
+                    cur.execute("VACUUM")
+                    cur.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+                result[path] = {'rows': rows, 'bytes_before': bytes_before, 'bytes_after': os.path.getsize(path)}
+                print(f"  완료: {rows}행, {bytes_before / 1024 ** 2:,.1f}MB -> {result[path]['bytes_after'] / 1024 ** 2:,.1f}MB")
+
+        self.schema = 'compact'
+        if self.layout == 'sharded':
+            with self.connection() as (conn, cur):
+                self._create_shard_views(cur)
+        self.pool.invalidate()
+        return result
+
+    def init_db(self, table_name='daily_price'):
+        with self.connection() as (conn, cur):
+            cur.execute(f"SELECT name FROM sqlite_master WHERE type='table' AND name='{table_name}'")
+            if cur.fetchone() is not None:
+                cur.execute(f"DROP TABLE {table_name}")
+                conn.commit()
+                print(f"'{table_name}' 테이블이 성공적으로 삭제되었습니다.")
+            else:
+                print(f"'{table_name}' 테이블이 존재하지 않습니다.")
 
     def krx_stock_listing(self):
-        conn, cur = self._get_db_conn()
-        
         # 1. KRX 주식 (KRX-MARCAP)
         print("KRX 주식 목록 다운로드 중...")
         try:
@@ -109,27 +531,7 @@ class DBUpdater(DBManager):
             krx_list = krx_list.head(500) # 시가총액 상위 500개
         except Exception as e:
             print(f"KRX-MARCAP API 오류 발생({e}) - 네이버 금융 시가총액을 크롤링하여 상위 500개를 대체 조회합니다...")
-            import requests, io
-            
-            top_stocks = []
-            for sosok in [0, 1]:  # 0: KOSPI, 1: KOSDAQ
-                for page in range(1, 7):
-                    try:
-                        url = f'https://finance.naver.com/sise/sise_market_sum.nhn?sosok={sosok}&page={page}'
-                        res = requests.get(url, headers={'User-agent': 'Mozilla/5.0'})
-                        tables = pd.read_html(io.StringIO(res.text), encoding='euc-kr')
-                        df = tables[1].dropna(subset=['종목명'])
-                        for _, row in df.iterrows():
-                            c_str = str(row.get('등락률', '0')).replace('%', '').replace('+', '').strip()
-                            try: c_val = float(c_str)
-                            except: c_val = 0.0
-                            
-                            m_val = float(str(row.get('시가총액', '0')).replace(',', '')) * 100000000
-                            top_stocks.append({'company': row['종목명'], 'marcap': m_val, 'changes_ratio': c_val})
-                    except: pass
-            
-            top_df = pd.DataFrame(top_stocks)
-            krx_desc = fdr.StockListing('KRX-DESC')
+            top_df, krx_desc = self._naver_market_sum_listing()
             if not top_df.empty:
                 krx_list = pd.merge(krx_desc, top_df, left_on='Name', right_on='company', how='inner')
                 krx_list = krx_list.sort_values(by='marcap', ascending=False).head(500)
@@ -167,40 +569,107 @@ class DBUpdater(DBManager):
         # 병합
         combined_list = pd.concat([krx_list, etf_list], ignore_index=True)
         
-        today = datetime.today().strftime('%Y-%m-%d')
-        combined_list['updated_date'] = today
+        print(f"총 {len(combined_list)}개 종목(주식+ETF)을 DB와 비교하여 반영합니다.")
+
+        # marcap과 changes_ratio의 NaN은 0으로 저장
+        combined_list[['marcap', 'changes_ratio']] = combined_list[['marcap', 'changes_ratio']].fillna(0)
+        # 목록에서 빠진 종목(이전 크롤링으로 남은 전체 종목 등)은 삭제되고, 수동 추가된 종목(updated_date NULL)은 유지됩니다.
+        self.apply_listing_diff('kr', combined_list, ['company', 'market', 'marcap', 'changes_ratio'])
 
-        print(f"총 {len(combined_list)}개 종목(주식+ETF)을 DB에 저장합니다.")
         
-        # 이전 크롤링으로 잘못 저장되어서 남아있는 전체 종목(2800여개) 등의 데이터를 삭제 (수동 추가된 NULL 제외)
+    def _read_market_sum_page(self, sosok, page):
+        """네이버 금융 시가총액 페이지 한 장을 읽어 종목명/등락률/시가총액 컬럼만 반환합니다."""
+        url = f'https://finance.naver.com/sise/sise_market_sum.nhn?sosok={sosok}&page={page}'
         try:
-            cur.execute("DELETE FROM comp_info WHERE country='kr' AND updated_date IS NOT NULL")
-        except: pass
-
-        for r in combined_list.itertuples():
-            # marcap과 changes_ratio 추가 저장
-            # NaN 처리
-            marcap = r.marcap if pd.notnull(r.marcap) else 0
-            changes_ratio = r.changes_ratio if pd.notnull(r.changes_ratio) else 0
-            
-            sql = f"""
-                REPLACE INTO comp_info (code, company, market, country, updated_date, marcap, changes_ratio) 
-                VALUES ('{r.code}', "{r.company.replace('"', '""')}", '{r.market}', '{r.country}', '{r.updated_date}', {marcap}, {changes_ratio})
-            """
-            cur.execute(sql)
-        conn.commit()
+            res = self.http.get(url)
+            tables = pd.read_html(io.StringIO(res.text), encoding='euc-kr')
+            return tables[1].dropna(subset=['종목명'])[['종목명', '등락률', '시가총액']]
+        except Exception:
+            return None
+
+    def _naver_market_sum_listing(self):
+        """
+        KRX-MARCAP을 쓸 수 없을 때 네이버 시가총액 페이지(코스피/코스닥 각 6페이지)와 KRX-DESC를
+        동시에 받아옵니다. 숫자 파싱은 행 단위가 아닌 문자열 벡터 연산으로 처리합니다.
+        반환값: (company/marcap/changes_ratio DataFrame, KRX-DESC DataFrame)
+        """
+        with concurrent.futures.ThreadPoolExecutor(max_workers=13) as executor:
+            desc_future = executor.submit(cached_stock_listing, 'KRX-DESC')
+            pages = list(executor.map(lambda args: self._read_market_sum_page(*args),
+                                      [(sosok, page) for sosok in [0, 1] for page in range(1, 7)]))
+            krx_desc = desc_future.result()
+
+        pages = [page_df for page_df in pages if page_df is not None]
+        if not pages:
+            return pd.DataFrame(), krx_desc
+
+        df = pd.concat(pages, ignore_index=True)
+        changes = df['등락률'].astype(str).str.replace(r'[%+]', '', regex=True).str.strip()
+        marcap = df['시가총액'].astype(str).str.replace(',', '', regex=False)
+        top_df = pd.DataFrame({
+            'company': df['종목명'],
+            'marcap': pd.to_numeric(marcap, errors='coerce').fillna(0) * 100000000,
+            'changes_ratio': pd.to_numeric(changes, errors='coerce').fillna(0.0),
+        })
+        return top_df, krx_desc
+
+    def apply_listing_diff(self, country, listing, columns):
+        """
+        새로 받은 종목 목록(listing: code + columns)을 현재 comp_info와 비교하여
+        추가/삭제/변경된 종목만 한 트랜잭션으로 반영합니다.
+        - 추가: 목록에만 있는 종목을 새 행으로 추가
+        - 삭제: 목록에서 빠진 종목 DELETE (수동 추가되어 updated_date가 NULL인 종목은 유지)
+        - 변경: 값이 바뀐 컬럼만 UPDATE (sector 등 목록에 없는 컬럼은 건드리지 않음)
+        반환값: {'added': n, 'removed': n, 'changed': n}
+        """
+        today = datetime.today().strftime('%Y-%m-%d')
+
+        listing = listing.drop_duplicates(subset='code').set_index('code')[columns]
+        with self.connection() as (conn, cur):
+            current = pd.read_sql(f"SELECT code, {', '.join(columns)}, updated_date FROM comp_info WHERE country = ?",
+                                  conn, params=(country,)).set_index('code')
+
+        added = listing.index.difference(current.index)
+        removed = current.index[current['updated_date'].notna()].difference(listing.index)
+        common = listing.index.intersection(current.index)
+
+        new, old = listing.loc[common], current.loc[common]
+        changed_mask = old['updated_date'].isna()   # 수동 추가된 종목이 목록에 들어오면 목록 값으로 채웁니다.
+        for col in columns:
+            if pd.api.types.is_numeric_dtype(new[col]):
+                differs = ~np.isclose(new[col].astype(float), pd.to_numeric(old[col], errors='coerce'), equal_nan=True)
+            else:
+                differs = new[col].fillna('').astype(str) != old[col].fillna('').astype(str)
+            changed_mask |= differs
+        changed = common[changed_mask.to_numpy()]
+
+        def rows(codes):
+            frame = listing.loc[codes].astype(object).where(listing.loc[codes].notna(), None)
+            return [(*values, today, code) for code, values in zip(codes, frame.itertuples(index=False, name=None))]
+
+        set_clause = ', '.join(f"{col} = ?" for col in columns)
+        with self.connection() as (conn, cur), conn:
+            cur.executemany(
+                f"REPLACE INTO comp_info ({', '.join(columns)}, updated_date, code, country) "
+                f"VALUES ({', '.join('?' * (len(columns) + 3))})",
+                [row + (country,) for row in rows(added)])
+            cur.executemany(f"UPDATE comp_info SET {set_clause}, updated_date = ? WHERE code = ?", rows(changed))
+            cur.executemany("DELETE FROM comp_info WHERE code = ?", [(code,) for code in removed])
+            cur.execute("REPLACE INTO listing_refresh (country, refreshed_at, added, removed, changed) "
+                        "VALUES (?, ?, ?, ?, ?)", (country, today, len(added), len(removed), len(changed)))
+
+        print(f"[{country}] 종목 목록 비교 결과: 추가 {len(added)}개, 삭제 {len(removed)}개, "
+              f"변경 {len(changed)}개, 유지 {len(listing) - len(added) - len(changed)}개")
+        return {'added': len(added), 'removed': len(removed), 'changed': len(changed)}
 
-        
     def us_stock_listing(self):
         """ S&P 500 종목을 가져오되, market 열에는 실제 상장 거래소를 표시합니다. """
-        conn, cur = self._get_db_conn()
-        
         # 1. 모든 미국 거래소의 전체 종목 목록을 가져와 조회용 테이블 생성
         print("미국 전체 거래소 목록을 조회합니다 (NASDAQ, NYSE, AMEX)...")
         market_map = {}
         for market in ['NASDAQ', 'NYSE', 'AMEX']:
             try:
-                market_df = fdr.StockListing(market)
+                market_df = cached_stock_listing(market)
                 market_map.update(pd.Series(market, index=market_df.Symbol).to_dict())
                 print(f"{market} 목록 조회 완료.")
             except Exception as e:
@@ -210,9 +679,8 @@ class DBUpdater(DBManager):
         print("S&P 500 목록을 가져옵니다...")
         try:
             url = 'https://en.wikipedia.org/wiki/List_of_S%26P_500_companies'
-            headers = {'User-agent': 'Mozilla/5.0'}
-            response = requests.get(url, headers=headers)
-            tables = pd.read_html(response.text)
+            response = self.http.get_cached(url, 'wikipedia')
+            tables = pd.read_html(io.StringIO(response.text))
             
             sp500_list = None
             for df in tables:
@@ -240,82 +708,135 @@ class DBUpdater(DBManager):
 
         sp500_list['market'].fillna('N/A', inplace=True)
         
-        sp500_list['country'] = 'us'
-        today = datetime.today().strftime('%Y-%m-%d')
-        sp500_list['updated_date'] = today
-
-        # 4. DB에 저장
-        print("S&P 500 종목 정보를 실제 거래소 정보와 함께 DB에 저장합니다.")
-        for r in sp500_list.itertuples():
-            company_name = r.company.replace("'", "''")
-            sql = f"REPLACE INTO comp_info (code, company, market, country, updated_date) VALUES ('{r.code}', '{company_name}', '{r.market}', '{r.country}', '{r.updated_date}')"
-            cur.execute(sql)
-        conn.commit()
+        # 4. DB에 저장 (변경분만 반영하므로 sector 등 다른 컬럼은 유지됩니다)
+        print("S&P 500 종목 정보를 실제 거래소 정보와 함께 DB에 반영합니다.")
+        self.apply_listing_diff('us', sp500_list, ['company', 'market'])
 
         na_count = (sp500_list['market'] == 'N/A').sum()
         print(f"총 {len(sp500_list)}개의 S&P 500 종목 정보 업데이트를 완료했습니다. (거래소 정보 N/A: {na_count}개)")
 
-    def update_sector_info(self):
-        """네이버 금융에서 업종 정보를 크롤링하여 DB에 업데이트합니다."""
-        print("업종 정보를 업데이트합니다 (네이버 금융 크롤링 병렬 처리)...")
-        conn, cur = self._get_db_conn()
-        
+    def _fetch_sector_members(self, sector_name, sector_url, force=False):
+        """업종 상세 페이지에서 구성 종목 코드 목록을 가져옵니다. 실패하면 None. (force=True이면 응답 캐시를 건너뜀)"""
+        try:
+            res = self.http.get_cached(sector_url, 'naver_sector', force=force)
+            soup = BeautifulSoup(res.text, 'html.parser')
+            return [stock['href'].split('code=')[-1] for stock in soup.select('div.name_area a')]
+        except Exception as e:
+            print(f"[{sector_name}] 업종 페이지 수집 실패: {e}")
+            return None
+
+    def update_sector_info(self, force=False):
+        """
+        네이버 금융 업종 정보를 sector_member 테이블에 유지하고 comp_info.sector에 반영합니다.
+        업종별 마지막 수집 시각(sector_page.scraped_at)이 SECTOR_TTL보다 오래된 업종만 다시 수집하며,
+        수집 결과는 임시 테이블에 모은 뒤 한 번의 조인 UPDATE로 반영합니다.
+        force=True이면 응답 캐시도 건너뛰고 모든 업종을 다시 수집합니다.
+        반환값: {'fetched': 수집한 업종 수, 'sectors_changed': n, 'codes_changed': n, 'comp_info_updated': n}
+        """
+        print("업종 정보를 업데이트합니다 (변경된 업종만 반영)...")
+        result = {'fetched': 0, 'sectors_changed': 0, 'codes_changed': 0, 'comp_info_updated': 0}
+
         try:
             url = 'https://finance.naver.com/sise/sise_group.nhn?type=upjong'
-            response = requests.get(url)
+            response = self.http.get_cached(url, 'naver_sector', force=force)
             soup = BeautifulSoup(response.text, 'html.parser')
-            
-            sector_links = soup.select('table.type_1 tr td a')
-            total_sectors = len(sector_links)
-            print(f"총 {total_sectors}개의 업종을 발견했습니다. 병렬 수집을 시작합니다...")
-            
-            # 병렬 처리를 위한 함수
-            def fetch_sector_stocks(link):
-                sector_name = link.text
-                sector_url = 'https://finance.naver.com' + link['href']
-                codes = []
-                try:
-                    res = requests.get(sector_url)
-                    s = BeautifulSoup(res.text, 'html.parser')
-                    stocks = s.select('div.name_area a')
-                    for stock in stocks:
-                        code = stock['href'].split('code=')[-1]
-                        codes.append((sector_name, code))
-                except Exception as e:
-                    pass
-                return codes
+            sectors = {link.text: 'https://finance.naver.com' + link['href']
+                       for link in soup.select('table.type_1 tr td a')}
+            if not sectors:
+                # 업종 목록을 읽지 못했으면 기존 구성 종목과 수집 기록을 그대로 둡니다.
+                print("업종 목록을 찾지 못해 업종 정보 업데이트를 건너뜁니다.")
+                return result
+
+            cutoff = (datetime.now() - SECTOR_TTL).isoformat(timespec='seconds')
+            with self.connection() as (conn, cur):
+                cur.execute("SELECT sector FROM sector_page WHERE scraped_at >= ?", (cutoff,))
+                fresh = {row[0] for row in cur.fetchall()}
+            stale = {name: link for name, link in sectors.items() if force or name not in fresh}
+            print(f"총 {len(sectors)}개 업종 중 {len(stale)}개 업종을 다시 수집합니다. (TTL {SECTOR_TTL.days}일)")
+
+            scraped = {}
+            if stale:
+                # 실제 동시 요청 수는 HttpClient의 호스트별 적응형 한도가 조절합니다. (스레드 수는 상한)
+                with concurrent.futures.ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS) as executor:
+                    futures = {name: executor.submit(self._fetch_sector_members, name, link, force)
+                               for name, link in stale.items()}
+                    for name, future in futures.items():
+                        codes = future.result()
+                        if codes is not None:   # 실패한 업종은 기존 구성 종목을 유지합니다.
+                            scraped[name] = codes
+            result['fetched'] = len(scraped)
+
+            with self.connection() as (conn, cur):
+                cur.execute("SELECT code, sector FROM sector_member")
+                previous = dict(cur.fetchall())
+            staged = {code: name for name, codes in scraped.items() for code in codes}
+            changed_codes = {code for code, name in staged.items() if previous.get(code) != name}
+            dropped = {code for code, name in previous.items() if name in scraped and code not in staged}
+            result['codes_changed'] = len(changed_codes | dropped)
+            touched = {staged.get(c) for c in changed_codes | dropped} | {previous.get(c) for c in changed_codes | dropped}
+            result['sectors_changed'] = len(touched - {None})
+
+            now = datetime.now().isoformat(timespec='seconds')
+            with self.connection() as (conn, cur), conn:
+                cur.execute("CREATE TEMP TABLE IF NOT EXISTS sector_stage (code TEXT PRIMARY KEY, sector TEXT)")
+                cur.execute("DELETE FROM sector_stage")
+                cur.executemany("INSERT OR REPLACE INTO sector_stage (code, sector) VALUES (?, ?)", staged.items())
+
+                # 다시 수집한 업종의 구성 종목을 스테이징 결과로 교체
+                cur.executemany("DELETE FROM sector_member WHERE sector = ?", [(name,) for name in scraped])
+                cur.execute("REPLACE INTO sector_member (code, sector) SELECT code, sector FROM sector_stage")
+                cur.executemany("REPLACE INTO sector_page (sector, url, scraped_at, n_codes) VALUES (?, ?, ?, ?)",
+                                [(name, sectors[name], now, len(codes)) for name, codes in scraped.items()])
+                # 업종 목록에서 사라진 업종 정리
+                cur.execute(f"DELETE FROM sector_page WHERE sector NOT IN ({', '.join('?' * len(sectors))})",
+                            tuple(sectors))
+
+                # comp_info에는 값이 달라진 종목만 한 번의 조인 UPDATE로 반영
+                cur.execute("""
+                    UPDATE comp_info SET sector = m.sector
+                    FROM sector_member AS m
+                    WHERE comp_info.code = m.code AND comp_info.sector IS NOT m.sector""")
+                result['comp_info_updated'] = cur.rowcount
+                # 업종에서 빠지고 다른 업종에도 없는 종목은 업종을 비웁니다.
+                cur.executemany("UPDATE comp_info SET sector = NULL WHERE code = ? AND sector IS NOT NULL "
+                                "AND code NOT IN (SELECT code FROM sector_member)", [(code,) for code in dropped])
+                result['comp_info_updated'] += cur.rowcount
+
+            print(f"업종 정보 업데이트 완료: 수집 {result['fetched']}개 업종, 변경 업종 {result['sectors_changed']}개, "
+                  f"업종 변경 종목 {result['codes_changed']}개, comp_info 반영 {result['comp_info_updated']}개")
+            if stale:
+                self.http.print_connection_stats()
 
-            all_sector_updates = []
-            with concurrent.futures.ThreadPoolExecutor(max_workers=20) as executor:
-                results = executor.map(fetch_sector_stocks, sector_links)
-                for codes in results:
-                    all_sector_updates.extend(codes)
-            
-            # DB 일괄 업데이트
-            for sector_name, code in all_sector_updates:
-                sql = f"UPDATE comp_info SET sector = '{sector_name}' WHERE code = '{code}'"
-                cur.execute(sql)
-                
-            conn.commit()
-            print("업종 정보 업데이트가 완료되었습니다.")
-            
         except Exception as e:
             print(f"업종 정보 업데이트 실패: {e}")
+        return result
+
+    def _listing_refreshed_at(self, country):
+        """
+        국가별 종목 목록을 마지막으로 갱신한 날짜.
+        변경분만 반영하면 바뀌지 않은 종목의 updated_date는 그대로이므로 listing_refresh 기록을 우선 사용하고,
+        기록이 없으면(이전 버전 DB) comp_info의 max(updated_date)를 사용합니다.
+        """
+        with self.connection() as (conn, cur):
+            cur.execute("SELECT refreshed_at FROM listing_refresh WHERE country = ?", (country,))
+            row = cur.fetchone()
+            if row is None or row[0] is None:
+                cur.execute("SELECT max(updated_date) FROM comp_info WHERE country = ?", (country,))
+                row = cur.fetchone()
+        return row
 
     def update_comp_info(self, nation='all'):
-        conn, cur = self._get_db_conn()
         today = datetime.today().strftime('%Y-%m-%d')
 
         if nation in ['all', 'kr']:
             # 날짜 확인
-            sql_date = "SELECT max(updated_date) FROM comp_info WHERE country = 'kr'"
-            cur.execute(sql_date)
-            rs_date = cur.fetchone()
+            rs_date = self._listing_refreshed_at('kr')
             
             # 데이터 누락 확인 (marcap이 없는 경우)
             sql_check = "SELECT count(*) FROM comp_info WHERE country = 'kr' AND marcap IS NULL"
-            cur.execute(sql_check)
-            rs_check = cur.fetchone()
+            with self.connection() as (conn, cur):
+                cur.execute(sql_check)
+                rs_check = cur.fetchone()
             missing_data = rs_check[0] > 0 if rs_check else False
             
             if rs_date is None or rs_date[0] is None or rs_date[0] < today or missing_data:
@@ -326,15 +847,15 @@ class DBUpdater(DBManager):
                 print("한국 주식 목록은 최신 상태입니다.")
                 # 업종 정보 누락 확인
                 sql_sector = "SELECT count(*) FROM comp_info WHERE country = 'kr' AND sector IS NULL"
-                cur.execute(sql_sector)
-                if cur.fetchone()[0] > 0:
+                with self.connection() as (conn, cur):
+                    cur.execute(sql_sector)
+                    missing_sector = cur.fetchone()[0] > 0
+                if missing_sector:
                      print("업종 정보가 누락되어 업데이트를 진행합니다.")
                      self.update_sector_info()
 
         if nation in ['all', 'us']:
-            sql = "SELECT max(updated_date) FROM comp_info WHERE country = 'us'"
-            cur.execute(sql)
-            rs = cur.fetchone()
+            rs = self._listing_refreshed_at('us')
             
             if rs is None or rs[0] is None or rs[0] < today:
                 print("미국 주식 목록을 업데이트합니다.")
@@ -342,16 +863,88 @@ class DBUpdater(DBManager):
             else:
                 print("미국 주식 목록은 최신 상태입니다.")
 
-    def read_naver(self, code, company, pages_to_fetch):
-        df = pd.DataFrame()
-        for page in range(1, pages_to_fetch + 1):
-            page_df = self._read_naver_page(code, page)
+        get_response_cache().print_cache_stats()
+
+    def _page_crosses(self, page_df, cutoff):
+        """페이지의 가장 오래된 날짜가 cutoff 이전이면 True (sise_day 페이지는 최신순 정렬)"""
+        return page_df['날짜'].empty or pd.to_datetime(page_df['날짜'].iloc[-1]) < cutoff
+
+    def _last_naver_page(self, pages, cutoff):
+        """
+        받아온 페이지들 중 실제로 사용할 마지막 페이지 번호를 찾습니다. 아직 알 수 없으면 None.
+        cutoff를 넘는 페이지, 요청 실패로 비는 페이지의 직전, 마지막 페이지를 넘어
+        같은 내용이 반복되는 페이지의 직전에서 멈춥니다.
+        """
+        prev_first = None
+        for page in range(1, max(pages) + 1):
+            page_df = pages.get(page)
             if page_df is None:
-                break
-            
-            df = pd.concat([df, page_df], ignore_index=True)
-            if not page_df['날짜'].empty and pd.to_datetime(page_df['날짜'].iloc[-1]) < datetime(2024, 1, 1):
-                break
+                return page - 1
+            first_date = page_df['날짜'].iloc[0] if not page_df.empty else None
+            if first_date == prev_first:
+                return page - 1
+            if self._page_crosses(page_df, cutoff):
+                return page
+            prev_first = first_date
+        return None
+
+    def read_naver(self, code, company, pages_to_fetch=None, start_date=None):
+        """
+        네이버 금융 sise_day HTML 페이지를 병렬로 수집합니다. (siseJson API를 쓸 수 없을 때의 대체 경로)
+        첫 페이지를 받은 뒤 start_date까지 필요한 페이지 수를 추정해 동시에 요청하고,
+        cutoff를 넘는 페이지가 확인되면 그 뒤 페이지 요청은 취소합니다.
+        결과 DataFrame은 마지막에 한 번만 합칩니다.
+        """
+        cutoff = pd.Timestamp(start_date or DEFAULT_START_DATE)
+        first = self._read_naver_page(code, 1)
+        if first is None:
+            return None
+
+        pages = {1: first}
+        # 한 페이지에 10거래일씩 표시되므로 cutoff까지의 영업일 수로 페이지 수를 추정합니다.
+        rows_per_page = max(len(first), 1)
+        estimated = len(pd.bdate_range(cutoff, datetime.today())) // rows_per_page + 2
+        max_page = min(estimated, pages_to_fetch) if pages_to_fetch else estimated
+        last_page = self._last_naver_page(pages, cutoff)
+
+        next_page = 2
+        with concurrent.futures.ThreadPoolExecutor(max_workers=NAVER_PAGE_WORKERS) as executor:
+            while last_page is None and next_page <= max_page:
+                futures = {executor.submit(bind_context(self._read_naver_page), code, page): page
+                           for page in range(next_page, max_page + 1)}
+                crossed = None
+                first_dates = {}
+                for future in concurrent.futures.as_completed(futures):
+                    if future.cancelled():
+                        continue
+                    page = futures[future]
+                    page_df = future.result()
+                    pages[page] = page_df
+                    end_page = None
+                    # 행 수가 모자란 페이지나 다른 페이지와 내용이 같은 페이지는
+                    # 마지막 페이지(또는 그 반복)이므로 이후 페이지도 필요 없습니다.
+                    if page_df is None or len(page_df) < rows_per_page or self._page_crosses(page_df, cutoff):
+                        end_page = page
+                    else:
+                        first_date = page_df['날짜'].iloc[0]
+                        end_page = first_dates.get(first_date)
+                        first_dates[first_date] = min(page, end_page or page)
+                    if end_page is not None:
+                        crossed = end_page if crossed is None else min(crossed, end_page)
+                        # cutoff를 넘는 페이지 이후의 (아직 시작되지 않은) 요청은 취소합니다.
+                        for other, other_page in futures.items():
+                            if other_page > crossed:
+                                other.cancel()
+
+                last_page = self._last_naver_page(pages, cutoff)
+                next_page = max_page + 1
+                # 추정이 부족했고 페이지 수 제한이 없으면 같은 크기만큼 더 요청합니다.
+                if last_page is None and not pages_to_fetch:
+                    max_page += estimated
+
+        stop = last_page or max_page
+        page_frames = [pages[page] for page in range(1, stop + 1) if pages.get(page) is not None]
+        df = pd.concat(page_frames, ignore_index=True)
         
         if df.empty:
             return None
@@ -371,77 +964,157 @@ class DBUpdater(DBManager):
             df[col] = numeric_val.astype(int)
 
         df['date'] = pd.to_datetime(df['date'])
-        df = df[df['date'] >= datetime(2024,1,1)]
+        df = df[df['date'] >= cutoff]
         df = df.sort_values(by='date', ascending=True)
         return df
 
     def _read_naver_page(self, code, page, retries=3):
         url = f"https://finance.naver.com/item/sise_day.nhn?code={code}&page={page}"
-        headers = {'User-agent': 'Mozilla/5.0'}
-        for i in range(retries):
-            try:
-                response = requests.get(url, headers=headers)
-                response.raise_for_status()
-                
-                tables = pd.read_html(response.text, header=0)
-                if not tables or tables[0].empty:
-                    return None
-
-                page_df = tables[0]
-                page_df.dropna(inplace=True)
-                return page_df if not page_df.empty else None
-
-            except Exception:
-                time.sleep(0.5)
-        return None
-
-    def read_naver_api(self, code, company):
-        """네이버 금융 API를 직접 호출하여 시세 데이터를 빠르게 가져옵니다."""
         try:
-            # 2024년 이후 데이터는 약 250거래일 미만이므로 count=3000은 충분한 값입니다.
-            url = f"https://api.finance.naver.com/siseJson.naver?symbol={code}&requestType=1&startTime=20240101&endTime=20991231&timeframe=day&count=3000"
-            headers = {'User-agent': 'Mozilla/5.0'}
-            response = requests.get(url, headers=headers)
+            # 연결 오류/스로틀링 재시도는 HttpClient가 지수 백오프로 처리합니다.
+            response = self.http.get(url, retries=retries)
             response.raise_for_status()
             
-            # 첫 줄의 불필요한 문자열 제거 후 JSON 파싱
-            data = response.text.strip().replace("'", '"').replace("(", "").replace(")", "")
-            data = re.sub(r'([a-zA-Z_]+):', r'"\1":', data) # 키 값을 쌍따옴표로 감싸기
-            
-            parsed_data = json.loads(data)
-            
-            df = pd.DataFrame(parsed_data[1:], columns=parsed_data[0])
-            df = df.rename(columns={'날짜': 'date', '시가': 'open', '고가': 'high', '저가': 'low', '종가': 'close', '거래량': 'volume'})
-            
-            df['date'] = pd.to_datetime(df['date'])
-            numeric_cols = ['open', 'high', 'low', 'close', 'volume']
-            for col in numeric_cols:
-                df[col] = pd.to_numeric(df[col], errors='coerce')
+            tables = pd.read_html(response.text, header=0)
+            if not tables or tables[0].empty:
+                return None
+
+            page_df = tables[0]
+            page_df.dropna(inplace=True)
+            return page_df if not page_df.empty else None
+
+        except JobCancelled:
+            # 작업 취소는 데이터 없음과 구분되도록 그대로 전달합니다.
+            raise
+        except Exception:
+            return None
+
+    def _naver_api_url(self, code, start_date=None, end_date=None):
+        """
+        siseJson 요청 URL을 만듭니다. start_date가 주어지면 그 날짜부터의 구간만 요청하고,
+        end_date가 주어지면 그 날짜까지만 요청합니다. (백필 구간 요청)
+        """
+        start = pd.Timestamp(start_date or DEFAULT_START_DATE)
+        end = pd.Timestamp(end_date) if end_date else pd.Timestamp(datetime.today())
+        # 요청 구간의 영업일 수 + 여유분만큼만 count를 잡습니다.
+        count = min(3000, len(pd.bdate_range(start, end)) + 10)
+        end_time = end.strftime('%Y%m%d') if end_date else '20991231'
+        return (f"https://api.finance.naver.com/siseJson.naver?symbol={code}&requestType=1"
+                f"&startTime={start.strftime('%Y%m%d')}&endTime={end_time}&timeframe=day&count={count}")
+
+    def read_naver_api(self, code, company, start_date=None, end_date=None):
+        """
+        네이버 금융 API를 직접 호출하여 시세 데이터를 빠르게 가져옵니다.
+        start_date('YYYY-MM-DD')가 주어지면 해당 날짜 이후 구간만, end_date가 주어지면 그 날짜까지만 요청합니다.
+        """
+        try:
+            url = self._naver_api_url(code, start_date, end_date)
+            response = self.http.get(url)
+            response.raise_for_status()
             
-            df.dropna(subset=numeric_cols, inplace=True)
-            df = df.sort_values(by='date', ascending=True).reset_index(drop=True)
+            try:
+                # 응답 본문을 바로 NumPy 배열로 파싱합니다.
+                df = sise_arrays_to_frame(parse_sise_json(response.text))
+            except ValueError:
+                # 예상과 다른 형식이면 기존 JSON 파싱 경로로 처리합니다.
+                df = self._parse_sise_json_legacy(response.text)
             return df
+        except JobCancelled:
+            raise
         except Exception as e:
             print(f"[{code}] 네이버 API 호출 중 오류: {e}")
             return None
 
-    def read_yfinance(self, code, period=2):
+    def _parse_sise_json_legacy(self, text):
+        """siseJson 응답을 json.loads + DataFrame 변환으로 파싱합니다. (형식이 바뀐 경우의 대체 경로)"""
+        # 첫 줄의 불필요한 문자열 제거 후 JSON 파싱
+        data = text.strip().replace("'", '"').replace("(", "").replace(")", "")
+        data = re.sub(r'([a-zA-Z_]+):', r'"\1":', data) # 키 값을 쌍따옴표로 감싸기
+        
+        parsed_data = json.loads(data)
+        
+        df = pd.DataFrame(parsed_data[1:], columns=parsed_data[0])
+        df = df.rename(columns={'날짜': 'date', '시가': 'open', '고가': 'high', '저가': 'low', '종가': 'close', '거래량': 'volume'})
+        
+        df['date'] = pd.to_datetime(df['date'])
+        numeric_cols = ['open', 'high', 'low', 'close', 'volume']
+        for col in numeric_cols:
+            df[col] = pd.to_numeric(df[col], errors='coerce')
+        
+        df.dropna(subset=numeric_cols, inplace=True)
+        return df.sort_values(by='date', ascending=True).reset_index(drop=True)
+
+    def _yfinance_range(self, period=2, start_date=None):
+        """yfinance 요청 구간 (start, end) 문자열을 계산합니다."""
         end_date = datetime.today() + timedelta(days=1)
-        if period == 1:
+        if start_date is not None:
+            start_date = pd.Timestamp(start_date).to_pydatetime()
+        elif period == 1:
             start_date = end_date - timedelta(days=20)
+        elif period > 2:
+            # 3 이상은 최근 period년으로 해석합니다.
+            start_date = (pd.Timestamp(end_date) - pd.DateOffset(years=period)).to_pydatetime()
         else:
-            start_date = datetime(2024, 1, 1)
+            start_date = pd.Timestamp(DEFAULT_START_DATE).to_pydatetime()
+        return start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d')
+
+    def read_yfinance(self, code, period=2, start_date=None):
+        start, end = self._yfinance_range(period, start_date)
+        return self._download_yfinance_data(code, start, end)
+
+    def read_yfinance_batch(self, codes, period=2, start_date=None, chunk_size=YF_BATCH_SIZE):
+        """
+        여러 미국 티커를 chunk_size개씩 yf.download 한 번으로 받아 {code: df}로 나눠 반환합니다.
+        df는 fetch_daily_price_by_code와 같은 소문자 컬럼 형식이며,
+        일괄 다운로드에서 빠진 티커만 _download_yfinance_data로 개별 재시도합니다.
+        """
+        start, end = self._yfinance_range(period, start_date)
+        frames = {}
+        failed = []
+        for i in range(0, len(codes), chunk_size):
+            if current_token().cancelled:
+                break
+            chunk = codes[i:i + chunk_size]
+            # 야후 티커 형식(BRK.B -> BRK-B)으로 요청하고 원래 코드로 되돌려 매핑합니다.
+            symbols = {code.replace('.', '-'): code for code in chunk}
+            try:
+                data = yf.download(list(symbols), start=start, end=end, group_by='ticker',
+                                   auto_adjust=False, threads=True, progress=False)
+            except Exception as e:
+                print(f"[US 일괄] yfinance 다운로드 오류 ({chunk[0]} 외 {len(chunk) - 1}개): {e}")
+                data = pd.DataFrame()
+
+            downloaded = set(data.columns.get_level_values(0)) if isinstance(data.columns, pd.MultiIndex) else set()
+            for symbol, code in symbols.items():
+                df = data[symbol].dropna(how='all') if symbol in downloaded else None
+                df = self._normalize_yfinance_frame(df)
+                if df is None or df.empty:
+                    failed.append(code)
+                else:
+                    frames[code] = df
 
-        return self._download_yfinance_data(code, start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))
+        # 일괄 요청에서 실패한 티커만 개별 재시도
+        for code in failed:
+            if current_token().cancelled:
+                break
+            df = self._normalize_yfinance_frame(self._download_yfinance_data(code, start, end))
+            if df is not None and not df.empty:
+                frames[code] = df
+        return frames
 
-    def _download_yfinance_data(self, code, start, end):
-        """yfinance를 사용하여 데이터를 다운로드하고, 실패 시 티커를 변경하여 재시도합니다."""
+    def _download_yfinance_data(self, code, start, end, keep_empty=False):
+        """
+        yfinance를 사용하여 데이터를 다운로드하고, 실패 시 티커를 변경하여 재시도합니다.
+        keep_empty=True이면 요청은 성공했지만 구간에 데이터가 없을 때 None 대신 빈 DataFrame을 반환합니다. (요청 실패는 None)
+        """
+        empty = None
         # 첫 번째 시도
         try:
             ticker = yf.Ticker(code)
             df = ticker.history(start=start, end=end, auto_adjust=False)
             if not df.empty:
                 return df
+            empty = df
         except Exception as e:
             # yfinance 내부 오류는 무시하고 재시도 로직으로 넘어갑니다.
             pass
@@ -451,88 +1124,832 @@ class DBUpdater(DBManager):
             code_alt = code.replace('.', '-')
             ticker_alt = yf.Ticker(code_alt)
             df_alt = ticker_alt.history(start=start, end=end, auto_adjust=False)
-            return df_alt if not df_alt.empty else None
+            if not df_alt.empty:
+                return df_alt
+            empty = df_alt
         except Exception as e:
-            return None
+            pass
+        return empty if keep_empty else None
 
-    def replace_into_db(self, df, code):
-        conn, cur = self._get_db_conn()
+    def _frame_to_rows(self, df, code):
+        """시세 DataFrame을 시세 테이블 executemany용 튜플 리스트로 변환합니다. 날짜는 현재 형식(일수 또는 문자열)입니다."""
         if 'diff' not in df.columns:
             df['diff'] = df['close'].diff().fillna(0)
-            
+
         try:
-            df['open'] = df['open'].astype(float)
-            df['high'] = df['high'].astype(float)
-            df['low'] = df['low'].astype(float)
-            df['close'] = df['close'].astype(float)
-            df['diff'] = df['diff'].astype(float)
-            df['volume'] = df['volume'].astype(int)
+            opens = df['open'].astype(float).tolist()
+            highs = df['high'].astype(float).tolist()
+            lows = df['low'].astype(float).tolist()
+            closes = df['close'].astype(float).tolist()
+            diffs = df['diff'].astype(float).tolist()
+            volumes = df['volume'].astype(int).tolist()
         except Exception as e:
             print(f"[{code}] 데이터 타입 변환 중 오류: {e}")
-            return
+            return None
 
-        for r in df.itertuples():
-            date_str = r.Index.strftime('%Y-%m-%d')
-            sql = (f"REPLACE INTO daily_price (code, date, open, high, low, close, diff, volume) "
-                   f"VALUES ('{code}', '{date_str}', '{r.open}', '{r.high}', '{r.low}', '{r.close}', '{r.diff}', '{r.volume}')")
-            try:
-                cur.execute(sql)
-            except sqlite3.Error as e:
-                print(f"[{code}] DB 저장 중 오류: {e}")
-                return
-        conn.commit()
+        index = pd.DatetimeIndex(df.index)
+        if index.tz is not None:
+            # yfinance의 거래소 현지 시각 인덱스는 현지 날짜 그대로 사용합니다.
+            index = index.tz_localize(None)
+        if self.schema == 'compact':
+            dates = index.values.astype('M8[D]').astype(np.int64).tolist()
+        else:
+            dates = index.strftime('%Y-%m-%d').tolist()
+        return list(zip([code] * len(dates), dates, opens, highs, lows, closes, diffs, volumes))
 
-    def update_daily_price_by_code(self, code, country, period=2):
-        """code와 country를 사용하여 특정 종목의 일별 시세를 업데이트합니다."""
-        if not self.run_update:
-            return f"[{code}] 업데이트 중단됨."
+    def _read_stored_bars(self, cur, code, first_date, last_date):
+        """저장된 시세를 날짜 구간 한 번의 범위 조회로 읽어 {date: (open, high, low, close, diff, volume)}로 반환합니다."""
+        table, key = self._price_table()
+        cur.execute(f"SELECT {key}, open, high, low, close, diff, volume FROM {table} "
+                    f"WHERE code = ? AND {key} BETWEEN ? AND ?", (code, first_date, last_date))
+        return {row[0]: row[1:] for row in cur.fetchall()}
 
-        df = None
+    @staticmethod
+    def _same_bar(new_values, stored_values):
+        # NaN은 SQLite에 NULL로 저장되므로 None과 같은 값으로 취급합니다.
+        for new, stored in zip(new_values, stored_values):
+            if new != new:
+                new = None
+            if new != stored:
+                return False
+        return True
+
+    def bulk_replace_into_db(self, frames, job_id=None, coverage=None, country=None):
+        """
+        여러 종목의 시세를 하나의 트랜잭션에서 파라미터 바인딩 executemany로 저장합니다.
+        frames는 {code: df} 딕셔너리 또는 (code, df) 튜플의 iterable입니다.
+        종목마다 저장된 구간을 한 번 읽어 비교한 뒤 새 봉은 INSERT, 값이 바뀐 봉만 UPDATE 하고
+        같은 봉은 건너뜁니다. (REPLACE의 삭제+삽입으로 인한 페이지/WAL 증가 방지)
+        job_id가 주어지면 저장한 종목의 작업 상태를 같은 트랜잭션에서 done으로 바꿉니다.
+        coverage([(code, start, end), ...])가 주어지면 받아 둔 구간을 같은 트랜잭션에서 price_coverage에 기록합니다.
+        sharded 레이아웃에서는 country의 시세 파일에 저장하며, country가 없으면 종목별 국가로 나눠 각각 저장합니다.
+        이때 작업 상태(job_id)는 공용 파일에 있으므로 시세 커밋 직후에 따로 기록합니다.
+        반환값: {code: {'inserted': n, 'updated': n, 'skipped': n}}
+        """
+        if isinstance(frames, dict):
+            frames = frames.items()
+        if self.layout == 'sharded' and country is None:
+            frames, coverage = list(frames), list(coverage or ())
+            countries = self._countries_of({code for code, _ in frames} | {c[0] for c in coverage})
+            counts = {}
+            for shard in SHARD_COUNTRIES:
+                counts.update(self.bulk_replace_into_db(
+                    [item for item in frames if countries[item[0]] == shard], job_id,
+                    [item for item in coverage if countries[item[0]] == shard], shard))
+            return counts
+
+        # single 레이아웃은 작업 상태도 같은 파일에 있으므로 시세와 같은 트랜잭션에서 기록합니다.
+        job_in_txn = job_id is not None and self.layout != 'sharded'
+
+        table, key = self._price_table()
+        insert_sql = (f"INSERT INTO {table} (code, {key}, open, high, low, close, diff, volume) "
+                      "VALUES (?, ?, ?, ?, ?, ?, ?, ?)")
+        update_sql = (f"UPDATE {table} SET open = ?, high = ?, low = ?, close = ?, diff = ?, volume = ? "
+                      f"WHERE code = ? AND {key} = ?")
+        counts = {}
+        synced_at = sync_timestamp()
+        try:
+            with self.connection(country) as (conn, cur), conn:
+                for code, df in frames:
+                    if df is None or df.empty:
+                        continue
+                    rows = self._frame_to_rows(df, code)
+                    if rows is None:
+                        continue
+
+                    stored = self._read_stored_bars(cur, code, min(r[1] for r in rows), max(r[1] for r in rows))
+                    stat = counts.setdefault(code, {'inserted': 0, 'updated': 0, 'skipped': 0})
+                    inserts, updates = [], []
+                    for row in rows:
+                        old = stored.get(row[1])
+                        if old is None:
+                            inserts.append(row)
+                            stat['inserted'] += 1
+                        elif not self._same_bar(row[2:], old):
+                            updates.append(row[2:] + row[:2])
+                            stat['updated'] += 1
+                        else:
+                            stat['skipped'] += 1
+
+                    # 같은 종목이 한 번에 여러 번 들어와도 다음 비교가 방금 쓴 값을 보도록 종목 단위로 실행합니다.
+                    if inserts:
+                        cur.executemany(insert_sql, inserts)
+                    if updates:
+                        cur.executemany(update_sql, updates)
+                    cur.execute("REPLACE INTO price_sync (code, synced_at) VALUES (?, ?)", (code, synced_at))
+                    if job_in_txn:
+                        cur.execute("UPDATE update_job_item SET status = 'done', error = NULL, updated_at = ? "
+                                    "WHERE job_id = ? AND code = ?", (synced_at, job_id, code))
+                for code, start, end in coverage or ():
+                    self._add_coverage(cur, code, start, end)
+        except sqlite3.Error as e:
+            print(f"시세 일괄 저장 중 오류: {e}")
+            return {}
+        if job_id is not None and not job_in_txn and counts:
+            self.mark_job_items(job_id, 'done', [(code, None) for code in counts])
+        return counts
+
+    def replace_into_db(self, df, code, country=None):
+        counts = self.bulk_replace_into_db([(code, df)], country=country)
+        stat = counts.get(code)
+        if stat:
+            print(f"[{code}] 시세 저장: 신규 {stat['inserted']}, 변경 {stat['updated']}, 동일 {stat['skipped']}")
+        return counts
+
+    def get_last_bar_dates(self, codes=None):
+        """
+        종목별 마지막 저장 봉 날짜(high-water mark)를 {code: 'YYYY-MM-DD'}로 반환합니다.
+        (code, date) 기본키 인덱스만 읽는 GROUP BY 한 번으로 전체 종목을 조회합니다.
+        """
+        with self.connection() as (conn, cur):
+            table, key = self._price_table()
+            cur.execute(f"SELECT code, {self._date_sql(f'MAX({key})')} FROM {table} GROUP BY code")
+            last_dates = dict(cur.fetchall())
+        if codes is not None:
+            last_dates = {code: last_dates[code] for code in codes if code in last_dates}
+        return last_dates
+
+    def get_last_bar_date(self, code):
+        """단일 종목의 마지막 저장 봉 날짜를 반환합니다. 데이터가 없으면 None."""
+        with self.connection() as (conn, cur):
+            table, key = self._price_table()
+            cur.execute(f"SELECT {self._date_sql(f'MAX({key})')} FROM {table} WHERE code = ?", (code,))
+            row = cur.fetchone()
+        return row[0] if row else None
+
+    def _fill_diff(self, df, code):
+        """
+        부분 구간만 받아온 경우 첫 봉의 전일비가 0이 되지 않도록
+        DB에 저장된 직전 종가를 기준으로 diff 컬럼을 채웁니다.
+        """
+        if df is None or df.empty or 'diff' in df.columns:
+            return df
+        # 수집 스레드에서 호출되므로 연결은 조회하는 동안만 빌립니다.
+        with self.connection() as (conn, cur):
+            table, key = self._price_table()
+            cur.execute(f"SELECT close FROM {table} WHERE code = ? AND {key} < ? ORDER BY {key} DESC LIMIT 1",
+                        (code, self._date_key(df.index[0])))
+            row = cur.fetchone()
+        df['diff'] = df['close'].diff()
+        df.iloc[0, df.columns.get_loc('diff')] = df['close'].iloc[0] - row[0] if row else 0
+        return df
+
+    def _normalize_yfinance_frame(self, df):
+        """yfinance 결과를 open/high/low/close/volume 소문자 컬럼으로 정리합니다."""
+        if df is None or df.empty:
+            return df
+        if isinstance(df.columns, pd.MultiIndex):
+            df.columns = df.columns.get_level_values(0)
+        df = df.loc[:, ~df.columns.duplicated(keep='first')]
+        df = df[['Open', 'High', 'Low', 'Close', 'Volume']].dropna(subset=['Close'])
+        df.columns = ['open', 'high', 'low', 'close', 'volume']
+        return df
+
+    def _yfinance_kr_symbol(self, code):
+        """한국 종목 코드를 야후 티커로 변환합니다. (코스닥 .KQ, 그 외 .KS)"""
+        with self.connection() as (conn, cur):
+            cur.execute("SELECT market FROM comp_info WHERE code = ?", (code,))
+            row = cur.fetchone()
+        market = (row[0] or '') if row else ''
+        return f"{code}.KQ" if 'KOSDAQ' in market.upper() else f"{code}.KS"
+
+    def _indexed(self, df):
+        """read_naver/read_naver_api 결과(date 컬럼)를 날짜 인덱스로 바꿉니다."""
+        if df is not None and not df.empty:
+            df = df.set_index('date')
+        return df
+
+    def price_sources(self, code, country, period=2, start_date=None):
+        """
+        국가별 시세 제공처를 우선순위대로 반환합니다. (각 fetch()는 날짜 인덱스 DataFrame 반환)
+        - kr: 네이버 siseJson API -> 네이버 sise_day HTML 페이지 -> yfinance(.KS/.KQ)
+        - us: yfinance
+        """
         if country == 'kr':
-            df = self.read_naver_api(code, "")
+            symbol = self._yfinance_kr_symbol(code)
+            start, end = self._yfinance_range(period, start_date)
+            return [
+                PriceSource('naver_api', lambda: self._indexed(self.read_naver_api(code, "", start_date=start_date))),
+                PriceSource('naver_html', lambda: self._indexed(self.read_naver(code, "", start_date=start_date))),
+                PriceSource('yfinance_kr', lambda: self._normalize_yfinance_frame(
+                    self._download_yfinance_data(symbol, start, end))),
+            ]
+        if country == 'us':
+            return [PriceSource('yfinance', lambda: self._normalize_yfinance_frame(
+                self.read_yfinance(code, period=period, start_date=start_date)))]
+        return []
+
+    def fetch_daily_price_by_code(self, code, country, period=2, start_date=None, hedge=False):
+        """
+        DB 저장 없이 종목의 일별 시세를 내려받아 소문자 컬럼/날짜 인덱스 DataFrame으로 반환합니다.
+        start_date가 주어지면 그 날짜부터의 누락 구간만 요청합니다.
+        hedge=True이면 주 소스가 지연 백분위 기준 시간 안에 응답하지 않을 때 보조 소스에도 요청하고
+        먼저 도착한 응답을 사용합니다. (차트 클릭 등 사용자가 기다리는 단건 조회용)
+        스케줄러 작업에 지연 예산이 있으면 남은 예산을 헤지 요청의 전체 제한 시간으로 사용합니다.
+        """
+        df = None
+        if hedge:
+            df, source = hedged_fetch(self.price_sources(code, country, period, start_date),
+                                      timeout=current_token().remaining(FETCH_TIMEOUT))
+            if source is not None and source != 'naver_api':
+                print(f"[{code}] 시세를 보조 소스({source})에서 받았습니다.")
+        elif country == 'kr':
+            df = self.read_naver_api(code, "", start_date=start_date)
+            if df is None:
+                # siseJson API 실패 시 sise_day HTML 페이지 병렬 수집으로 대체합니다.
+                df = self.read_naver(code, "", start_date=start_date)
             if df is not None and not df.empty:
                 df.set_index('date', inplace=True)
         elif country == 'us':
-            df = self.read_yfinance(code, period=period)
-            if df is not None and not df.empty:
-                if isinstance(df.columns, pd.MultiIndex):
-                    df.columns = df.columns.get_level_values(0)
-                df = df.loc[:, ~df.columns.duplicated(keep='first')]
-                df = df[['Open', 'High', 'Low', 'Close', 'Volume']] 
-                df.columns = ['open', 'high', 'low', 'close', 'volume']
+            df = self._normalize_yfinance_frame(self.read_yfinance(code, period=period, start_date=start_date))
+        if start_date is not None:
+            df = self._fill_diff(df, code)
+        return df
+
+    def fetch_range_start(self, country, period=2, start_date=None):
+        """fetch_daily_price_by_code가 요청하는 구간의 시작일('YYYY-MM-DD')"""
+        if country == 'us':
+            return self._yfinance_range(period, start_date)[0]
+        return pd.Timestamp(start_date or DEFAULT_START_DATE).strftime('%Y-%m-%d')
+
+    def sync_daily_price(self, code, country, period=2, start_date=None, hedge=False):
+        """
+        종목의 일별 시세를 받아 DB에 저장하고 받은 DataFrame(받지 못했으면 None)을 반환합니다.
+        같은 종목을 같거나 더 이른 시작일부터 받는 요청이 진행 중이거나 방금 끝났으면
+        다운로드와 저장을 다시 하지 않고 그 결과를 함께 사용합니다. (single-flight, 키: 종목 코드와 구간 시작일)
+        """
+        start = self.fetch_range_start(country, period, start_date)
+        return self.price_flight.do(code, start, self._sync_daily_price, code, country, period, start_date, hedge)
+
+    def _sync_daily_price(self, code, country, period, start_date, hedge):
+        df = self.fetch_daily_price_by_code(code, country, period, start_date=start_date, hedge=hedge)
+        if df is None or df.empty:
+            return None
+        self.replace_into_db(df, code, country)
+        return df
+
+    def update_daily_price_by_code(self, code, country, period=2, writer=None, start_date=None):
+        """
+        code와 country를 사용하여 특정 종목의 일별 시세를 업데이트합니다.
+        writer(DailyPriceWriter)가 주어지면 직접 저장하지 않고 writer 큐로 넘깁니다.
+        start_date(마지막 저장 봉 날짜)가 주어지면 그 이후 구간만 받아옵니다.
+        """
+        try:
+            df = None if current_token().cancelled else \
+                self.fetch_daily_price_by_code(code, country, period, start_date=start_date)
+        except JobCancelled:
+            df = None
 
         if df is not None and not df.empty:
+            if writer is not None:
+                writer.put(code, df)
+                return f"[{code}] ({country}) 수집 완료. 저장 대기열에 추가."
             self.replace_into_db(df, code)
             return f"[{code}] ({country}) 업데이트 완료."
+        elif current_token().cancelled:
+            # 요청 도중 취소된 종목은 실패가 아니라 미완료로 남겨 다음 resume 때 다시 받습니다.
+            if writer is not None:
+                writer.defer(code)
+            return f"[{code}] 업데이트 중단됨."
         else:
+            if writer is not None:
+                writer.fail(code, 'no_data')
             return f"[{code}] ({country}) 데이터 없음. 업데이트 실패."
 
-    def update_daily_price(self, nation='all', period=1):
+    def update_us_daily_price_batch(self, codes, period=1, writer=None, last_dates=None, chunk_size=YF_BATCH_SIZE):
+        """
+        미국 종목들을 yfinance 일괄 다운로드로 업데이트합니다.
+        마지막 저장 봉 날짜가 같은 종목끼리 묶어 같은 구간을 한 번에 요청합니다.
+        """
+        last_dates = last_dates or {}
+        groups = {}
+        for code in codes:
+            groups.setdefault(last_dates.get(code), []).append(code)
+
+        saved = 0
+        for start_date, group in groups.items():
+            frames = self.read_yfinance_batch(group, period, start_date, chunk_size)
+            for code, df in frames.items():
+                if start_date is not None:
+                    df = self._fill_diff(df, code)
+                if writer is not None:
+                    writer.put(code, df)
+                else:
+                    self.replace_into_db(df, code)
+                saved += 1
+            if writer is not None:
+                for code in set(group) - set(frames):
+                    if current_token().cancelled:
+                        writer.defer(code)
+                    else:
+                        writer.fail(code, 'no_data')
+        return f"[US 일괄] {saved}/{len(codes)}개 종목 수집 완료. (실패 {len(codes) - saved}개)"
+
+    def _add_coverage(self, cur, code, start, end):
+        """[start, end] 구간을 price_coverage에 기록하며 겹치거나 맞닿은 구간과 합칩니다."""
+        next_day = (pd.Timestamp(end) + timedelta(days=1)).strftime('%Y-%m-%d')
+        prev_day = (pd.Timestamp(start) - timedelta(days=1)).strftime('%Y-%m-%d')
+        cur.execute("SELECT start_date, end_date FROM price_coverage WHERE code = ? AND start_date <= ? AND end_date >= ?",
+                    (code, next_day, prev_day))
+        overlaps = cur.fetchall()
+        start = min([start] + [row[0] for row in overlaps])
+        end = max([end] + [row[1] for row in overlaps])
+        cur.executemany("DELETE FROM price_coverage WHERE code = ? AND start_date = ?",
+                        [(code, row[0]) for row in overlaps])
+        cur.execute("INSERT INTO price_coverage (code, start_date, end_date) VALUES (?, ?, ?)", (code, start, end))
+
+    def get_coverage(self, code, country=None):
+        """
+        종목의 받아 둔 시세 구간 [(start, end), ...]을 반환합니다.
+        기록이 없으면 저장된 시세의 첫 봉~마지막 봉을 받아 둔 구간으로 보고 기록해 둡니다. (이전 버전 DB)
+        """
+        with self.connection(country or self._countries_of([code])[code]) as (conn, cur):
+            cur.execute("SELECT start_date, end_date FROM price_coverage WHERE code = ? ORDER BY start_date", (code,))
+            ranges = cur.fetchall()
+            if not ranges:
+                table, key = self._price_table()
+                cur.execute(f"SELECT {self._date_sql(f'min({key})')}, {self._date_sql(f'max({key})')} FROM {table} "
+                            "WHERE code = ?", (code,))
+                first, last = cur.fetchone()
+                if first is not None:
+                    with conn:
+                        self._add_coverage(cur, code, first, last)
+                    ranges = [(first, last)]
+        return ranges
+
+    def _missing_ranges(self, covered, since, until, chunk_days=BACKFILL_CHUNK_DAYS):
+        """[since, until] 중 covered에 없는 구간을 chunk_days 단위로 잘라 최신 구간부터 반환합니다."""
+        gaps = []
+        cursor = pd.Timestamp(since)
+        for start, end in covered:
+            start, end = pd.Timestamp(start), pd.Timestamp(end)
+            if start > cursor:
+                gaps.append((cursor, min(start - timedelta(days=1), pd.Timestamp(until))))
+            cursor = max(cursor, end + timedelta(days=1))
+        gaps.append((cursor, pd.Timestamp(until)))
+
+        chunks = []
+        for start, end in reversed(gaps):
+            while end >= start:
+                chunk_start = max(start, end - timedelta(days=chunk_days - 1))
+                chunks.append((chunk_start.strftime('%Y-%m-%d'), end.strftime('%Y-%m-%d')))
+                end = chunk_start - timedelta(days=1)
+        return chunks
+
+    def fetch_price_range(self, code, country, start, end):
+        """
+        [start, end] 구간의 일별 시세를 날짜 인덱스 DataFrame으로 받습니다.
+        요청이 성공했지만 해당 구간에 거래가 없으면 빈 DataFrame, 요청 실패면 None을 반환합니다.
+        """
+        end_exclusive = (pd.Timestamp(end) + timedelta(days=1)).strftime('%Y-%m-%d')
+        if country == 'kr':
+            df = self.read_naver_api(code, "", start_date=start, end_date=end)
+            if df is not None:
+                return df.set_index('date')
+            symbol = self._yfinance_kr_symbol(code)
+        elif country == 'us':
+            symbol = code
+        else:
+            return None
+        # 요청 실패(None)와 데이터가 없는 구간(빈 DataFrame)을 구분해야 상장 이전 구간으로 잘못 기록하지 않습니다.
+        df = self._download_yfinance_data(symbol, start, end_exclusive, keep_empty=True)
+        if df is None:
+            return None
+        return self._normalize_yfinance_frame(df) if not df.empty else pd.DataFrame()
+
+    def _next_bar_diff_fix(self, code, df):
+        """
+        df 바로 다음 날짜에 이미 저장된 봉의 전일비를 df의 마지막 종가 기준으로 다시 계산한 1행 프레임을 반환합니다.
+        저장된 봉이 없거나 전일비가 이미 맞으면 None.
+        """
+        with self.connection() as (conn, cur):
+            table, key = self._price_table()
+            cur.execute(f"SELECT {self._date_sql(key)}, open, high, low, close, volume, diff FROM {table} "
+                        f"WHERE code = ? AND {key} > ? ORDER BY {key} LIMIT 1", (code, self._date_key(df.index[-1])))
+            row = cur.fetchone()
+        if row is None:
+            return None
+        diff = row[4] - float(df['close'].iloc[-1])
+        if abs(row[6] - diff) < 1e-9:
+            return None
+        return pd.DataFrame([row[1:6] + (diff,)], index=pd.DatetimeIndex([row[0]]),
+                            columns=['open', 'high', 'low', 'close', 'volume', 'diff'])
+
+    def _backfill_code(self, code, country, since, until, writer, chunk_days):
+        """
+        한 종목의 누락 구간을 최신 구간부터 과거로 받아 writer로 넘깁니다. 반환값: (요청 수, 받은 봉 수)
+        구간 첫 봉의 전일비는 바로 앞(더 과거) 구간의 마지막 종가가 있어야 알 수 있으므로,
+        받은 구간은 다음 구간을 받을 때까지 들고 있다가 전일비를 채운 뒤 넘깁니다.
+        앞 구간이 없거나(상장 이전, 마지막 구간) 받지 못했으면 DB에 저장된 직전 종가를 기준으로 채웁니다.
+        """
+        requests_made, bars = 0, 0
+        chunks = self._missing_ranges(self.get_coverage(code, country), since, until, chunk_days)
+        with self.connection() as (conn, cur):
+            cur.execute(f"SELECT count(*) FROM {self._price_table()[0]} WHERE code = ?", (code,))
+            has_later = cur.fetchone()[0] > 0
+        held = None     # (df, span): 전일비를 채울 앞 구간을 기다리는 구간
+        prev_start = None
+
+        def release(prev_close=None):
+            nonlocal held
+            if held is None:
+                return
+            df, span = held
+            held = None
+            if prev_close is None or 'diff' in df.columns:
+                df = self._fill_diff(df, code)
+            else:
+                df['diff'] = df['close'].diff()
+                df.iloc[0, df.columns.get_loc('diff')] = df['close'].iloc[0] - prev_close
+            writer.put(code, df, span=span)
+
+        try:
+            for start, end in chunks:
+                if current_token().cancelled:
+                    break
+                # 직전에 받은 구간과 바로 이어지는 구간인지 (아니면 새 누락 구간의 가장 최근 구간)
+                contiguous = prev_start is not None and \
+                    pd.Timestamp(end) + timedelta(days=1) == pd.Timestamp(prev_start)
+                prev_start = start
+                df = self.fetch_price_range(code, country, start, end)
+                requests_made += 1
+                if df is None:
+                    print(f"[{code}] {start} ~ {end} 구간 요청 실패 (다음 백필 때 다시 요청합니다)")
+                    release()
+                    continue
+                if df.empty:
+                    if has_later:
+                        # 이후 구간에는 시세가 있는데 이 구간이 비어 있으면 상장 이전이므로
+                        # 더 과거 구간도 모두 받아 둔 것으로 기록하고 멈춥니다.
+                        release()
+                        writer.put(code, df, span=(since, end))
+                        break
+                    continue
+                has_later = True
+                bars += len(df)
+                if contiguous:
+                    release(prev_close=float(df['close'].iloc[-1]))
+                else:
+                    release()
+                    # 누락 구간 바로 뒤에 이미 저장된 봉이 있으면 그 봉의 전일비도 이 구간 기준으로 고칩니다.
+                    fix = self._next_bar_diff_fix(code, df)
+                    if fix is not None:
+                        writer.put(code, fix)
+                held = (df, (start, end))
+        finally:
+            release()
+        return requests_made, bars
+
+    def backfill(self, codes=None, since=None, years=10, until=None, chunk_days=BACKFILL_CHUNK_DAYS,
+                 priority=PRIORITY_BULK):
+        """
+        과거 시세를 since(없으면 years년 전)까지 chunk_days 단위 구간으로 나눠 받아 일괄 저장 경로로 저장합니다.
+        price_coverage에 받아 둔 구간을 기록하므로 같은 구간은 다시 요청하지 않습니다.
+        codes: 종목 코드 하나(str), 코드 목록, 또는 None(comp_info 전체)
+        until: 백필 구간의 끝 (기본값: 저장된 시세가 있으면 마지막 봉, 없으면 오늘)
+        priority: 종목별 백필 작업을 넣을 스케줄러 lane (단건 조회 중의 백필은 호출한 작업의 lane 사용)
+        """
+        with self.scheduler.scope(priority) as token:
+            return self._backfill(codes, since, years, until, chunk_days, priority, token)
+
+    def _backfill(self, codes, since, years, until, chunk_days, priority, token):
+        since = pd.Timestamp(since) if since else pd.Timestamp(datetime.today()) - pd.DateOffset(years=years)
+        since = since.strftime('%Y-%m-%d')
+
+        with self.connection() as (conn, cur):
+            cur.execute("SELECT code, country FROM comp_info")
+            countries = dict(cur.fetchall())
+        if codes is None:
+            codes = list(countries)
+        elif isinstance(codes, str):
+            codes = [codes]
+        last_dates = self.get_last_bar_dates()
+        today = datetime.today().strftime('%Y-%m-%d')
+
+        print(f"{len(codes)}개 종목의 시세를 {since}까지 백필합니다. (구간 {chunk_days}일)")
+        writer = DailyPriceWriter(self)
+        writer.start()
+        requests_made, bars = 0, 0
+        futures = {}
+        try:
+            futures = {self.scheduler.submit(self._backfill_code, code, countries.get(code), since,
+                                             until or last_dates.get(code) or today, writer, chunk_days,
+                                             priority=priority, token=token): code
+                       for code in codes}
+            for future in concurrent.futures.as_completed(futures):
+                if future.cancelled():
+                    continue
+                try:
+                    n_requests, n_bars = future.result()
+                    requests_made += n_requests
+                    bars += n_bars
+                except JobCancelled:
+                    pass
+                except Exception as e:
+                    print(f"[{futures[future]}] 백필 중 오류: {e}")
+        finally:
+            # 실행 중인 작업이 writer에 넘기기를 마친 뒤에 writer를 닫습니다.
+            concurrent.futures.wait(futures)
+            stats = writer.close()
+        if token.cancelled:
+            print("[알림] 백필이 중단되었습니다. 받은 구간까지만 저장합니다.")
+        print(f"백필 완료: 구간 요청 {requests_made}회, 받은 봉 {bars}개, 신규 저장 {stats['inserted']}행")
+        return {'requests': requests_made, 'bars': bars, 'inserted': stats['inserted']}
+
+    def _naver_minute_url(self, code, start_date):
+        """siseJson 분봉 요청 URL. 누적 거래량을 분별로 되돌릴 수 있도록 start_date 하루의 첫 분봉부터 요청합니다."""
+        start = pd.Timestamp(start_date)
+        count = (len(pd.bdate_range(start, datetime.today())) + 1) * MINUTE_BARS_PER_DAY
+        return (f"https://api.finance.naver.com/siseJson.naver?symbol={code}&requestType=1"
+                f"&startTime={start.strftime('%Y%m%d')}&endTime=20991231&timeframe=minute&count={count}")
+
+    def read_naver_minute(self, code, start_date):
+        """네이버 siseJson 분봉을 start_date부터 받아 배열({'minute', 'open', ..., 'volume'})로 반환합니다. (실패 시 None)"""
+        try:
+            response = self.http.get(self._naver_minute_url(code, start_date))
+            response.raise_for_status()
+            return parse_sise_minute_json(response.text)
+        except Exception as e:
+            print(f"[{code}] 네이버 분봉 요청 중 오류: {e}")
+            return None
+
+    def read_yfinance_minute(self, code, start_date):
+        """yfinance 1분봉을 start_date부터 받아 거래소 현지 시각 기준 배열로 반환합니다. (실패 시 None)"""
+        try:
+            df = yf.Ticker(code.replace('.', '-')).history(start=start_date, interval='1m', auto_adjust=False)
+        except Exception as e:
+            print(f"[{code}] yfinance 분봉 요청 중 오류: {e}")
+            return None
+        df = self._normalize_yfinance_frame(df if df is not None and not df.empty else None)
+        if df is None or df.empty:
+            return None
+        index = pd.DatetimeIndex(df.index)
+        if index.tz is not None:
+            index = index.tz_localize(None)
+        bars = {'minute': index.values.astype('M8[m]').astype(np.int64)}
+        bars.update({name: df[name].to_numpy(np.float64) for name in ('open', 'high', 'low', 'close')})
+        bars['volume'] = df['volume'].to_numpy(np.int64)
+        return bars
+
+    def fetch_minute_bars(self, code, country, since=None):
+        """since('YYYY-MM-DD', 없으면 MINUTE_LOOKBACK_DAYS일 전) 날짜부터의 분봉 배열. (kr: 네이버, us: yfinance)"""
+        since = since or (datetime.today() - timedelta(days=MINUTE_LOOKBACK_DAYS)).strftime('%Y-%m-%d')
+        if country == 'kr':
+            return self.read_naver_minute(code, since)
+        if country == 'us':
+            return self.read_yfinance_minute(code, since)
+        return None
+
+    def update_minute_bars_by_code(self, code, country):
+        """
+        한 종목의 분봉을 받아 분봉 저장소에 저장합니다. 마지막 저장 분봉이 있는 날짜부터 다시 받으므로
+        그날의 누적 거래량을 정확히 분별로 되돌리고, 이미 저장된 분은 새 값으로 덮어씁니다.
+        반환값: (받은 분봉 수, 새로 저장된 분봉 수)
+        """
+        if current_token().cancelled:
+            return 0, 0
+        last = self.minute_store.last_minutes([code]).get(code)
+        since = str(np.datetime64(last, 'm').astype('M8[D]')) if last is not None else None
+        bars = self.fetch_minute_bars(code, country, since)
+        if bars is None or len(bars['minute']) == 0:
+            return 0, 0
+        return len(bars['minute']), self.minute_store.write(code, bars)
+
+    def _resolve_codes(self, companies):
+        """종목명 또는 코드 목록을 {code: country}로 바꿉니다. comp_info에 없는 항목은 건너뜁니다."""
+        resolved = {}
+        with self.connection() as (conn, cur):
+            for company in companies:
+                cur.execute("SELECT code, country FROM comp_info WHERE lower(company) = ? OR lower(code) = ?",
+                            (company.lower(), company.lower()))
+                row = cur.fetchone()
+                if row is None:
+                    print(f"'{company}' 종목 정보를 찾을 수 없어 분봉 수집에서 제외합니다.")
+                    continue
+                resolved[row[0]] = row[1]
+        return resolved
+
+    def update_minute_bars(self, companies, priority=PRIORITY_WATCHLIST):
+        """
+        보유/관심 종목 등 companies(종목명 또는 코드 목록)의 분봉을 받아 분봉 저장소(종목/월 단위 압축 블록)에 저장합니다.
+        종목별 수집은 스케줄러의 priority lane(기본 watchlist) 작업으로 실행됩니다.
+        반환값: {code: 새로 저장된 분봉 수}
+        """
+        codes = self._resolve_codes(companies)
+        added = {}
+        with self.scheduler.scope(priority) as token:
+            futures = {self.scheduler.submit(self.update_minute_bars_by_code, code, country,
+                                             priority=priority, token=token): code
+                       for code, country in codes.items()}
+            for future in concurrent.futures.as_completed(futures):
+                code = futures[future]
+                if future.cancelled():
+                    continue
+                try:
+                    received, added[code] = future.result()
+                    print(f"[{code}] 분봉 {received}개 수신, 신규 {added[code]}개 저장")
+                except Exception as e:
+                    print(f"[{code}] 분봉 수집 중 오류: {e}")
+        return added
+
+    def _start_job(self, nation, period, stocks):
+        """새 일괄 업데이트 작업을 만들고 종목별 상태를 pending으로 기록합니다. 반환값: job_id"""
+        now = sync_timestamp()
+        with self.connection() as (conn, cur), conn:
+            cur.execute("INSERT INTO update_job (nation, period, status, created_at, total) VALUES (?, ?, 'running', ?, ?)",
+                        (nation, period, now, len(stocks)))
+            job_id = cur.lastrowid
+            cur.executemany("INSERT INTO update_job_item (job_id, code, country, status, updated_at) "
+                            "VALUES (?, ?, ?, 'pending', ?)", [(job_id, code, country, now) for code, country in stocks])
+        return job_id
+
+    def _resumable_job(self, nation):
+        """
+        이어서 실행할 작업을 찾습니다. 같은 nation으로 JOB_RESUME_MAX_AGE 이내에 시작되어
+        끝나지 않은(중단된 stopped, 비정상 종료로 running에 남은) 작업 중 미완료/실패 종목이 남은 가장 최근 작업.
+        끝까지 실행된(done) 작업은 실패 종목이 있어도 이어서 실행하지 않습니다.
+        반환값: (job_id, 다시 받을 [(code, country), ...], 데이터가 없어 건너뛸 {code}) 또는 (None, [], set())
+        데이터가 없어 실패한(no_data) 종목은 다시 받아도 같은 결과이므로 건너뛸 목록으로 돌려줍니다.
+        """
+        since = (datetime.now(timezone.utc) - JOB_RESUME_MAX_AGE).isoformat(timespec='seconds')
+        with self.connection() as (conn, cur):
+            cur.execute("SELECT job_id FROM update_job WHERE nation = ? AND created_at >= ? "
+                        "AND status IN ('stopped', 'running') AND job_id IN "
+                        "(SELECT job_id FROM update_job_item WHERE status IN ('pending', 'failed')) "
+                        "ORDER BY job_id DESC LIMIT 1", (nation, since))
+            row = cur.fetchone()
+            if row is None:
+                return None, [], set()
+            cur.execute("SELECT code, country, status, error FROM update_job_item "
+                        "WHERE job_id = ? AND status IN ('pending', 'failed')", (row[0],))
+            items = cur.fetchall()
+        retry = [(code, country) for code, country, status, error in items if error != 'no_data']
+        no_data = {code for code, country, status, error in items if error == 'no_data'}
+        return row[0], retry, no_data
+
+    def _finish_job(self, job_id, status):
+        with self.connection() as (conn, cur), conn:
+            cur.execute("UPDATE update_job SET status = ?, finished_at = ? WHERE job_id = ?",
+                        (status, sync_timestamp(), job_id))
+
+    def mark_job_items(self, job_id, status, items):
+        """items: [(code, error), ...]의 작업 상태를 status로 기록합니다."""
+        now = sync_timestamp()
+        with self.connection() as (conn, cur), conn:
+            cur.executemany("UPDATE update_job_item SET status = ?, error = ?, updated_at = ? WHERE job_id = ? AND code = ?",
+                            [(status, error, now, job_id, code) for code, error in items])
+
+    def job_report(self, job_id):
+        """
+        작업 진행 현황과 실패 사유별 종목 목록을 반환합니다.
+        반환값: {'job_id', 'status', 'total', 'done', 'pending', 'failed', 'failures': {사유: [code, ...]}}
+        """
+        with self.connection() as (conn, cur):
+            cur.execute("SELECT status, total FROM update_job WHERE job_id = ?", (job_id,))
+            row = cur.fetchone()
+            if row is None:
+                return None
+            report = {'job_id': job_id, 'status': row[0], 'total': row[1], 'done': 0, 'pending': 0, 'failed': 0,
+                      'failures': {}}
+            cur.execute("SELECT status, count(*) FROM update_job_item WHERE job_id = ? GROUP BY status", (job_id,))
+            for status, count in cur.fetchall():
+                report[status] = count
+            cur.execute("SELECT error, code FROM update_job_item WHERE job_id = ? AND status = 'failed' ORDER BY error, code",
+                        (job_id,))
+            for error, code in cur.fetchall():
+                report['failures'].setdefault(error or 'unknown', []).append(code)
+        return report
+
+    def print_job_report(self, report):
+        print(f"[작업 {report['job_id']}] {report['status']}: 전체 {report['total']}개, 완료 {report['done']}개, "
+              f"미완료 {report['pending']}개, 실패 {report['failed']}개")
+        for reason, codes in sorted(report['failures'].items(), key=lambda item: -len(item[1])):
+            sample = ', '.join(codes[:5]) + (' ...' if len(codes) > 5 else '')
+            print(f"  - 실패 사유 '{reason}': {len(codes)}개 ({sample})")
+
+    def update_daily_price(self, nation='all', period=1, us_batch_size=YF_BATCH_SIZE, resume=False):
+        """
+        전체(또는 국가별) 종목의 일별 시세를 업데이트합니다.
+        us_batch_size가 0이면 미국 종목도 종목별 yfinance 요청으로 받습니다.
+        실행은 update_job/update_job_item 테이블에 작업으로 기록되며, resume=True이면 중단되었거나 비정상 종료된
+        최근 작업을 찾아 미완료/실패 종목을 먼저 다시 받고 나머지 종목 중 최신이 아닌 종목을 이어서 받습니다. (없으면 새 작업)
+        반환값: job_report() 결과 (실패 사유별 종목 목록 포함)
+        """
         if nation == 'stop':
-            self.run_update = False
+            self.stop_update()
             return
-        self.run_update = True
+        with self.scheduler.scope(PRIORITY_BULK) as token:
+            return self._update_daily_price(nation, period, us_batch_size, resume, token)
 
-        conn, cur = self._get_db_conn()
-        cur.execute("SELECT code, country FROM comp_info")
-        stocks = [(code, country) for code, country in cur.fetchall() if nation == 'all' or nation == country]
+    def stop_update(self):
+        """
+        진행 중인 일괄 업데이트/백필(bulk lane 작업)을 모두 취소합니다.
+        스케줄러는 프로세스 공용이므로 업데이트를 시작한 인스턴스가 아니어도 중단됩니다.
+        """
+        cancelled = self.scheduler.cancel(PRIORITY_BULK)
+        if cancelled:
+            print(f"[알림] 일괄 업데이트 작업 {cancelled}개를 취소합니다.")
+
+    def _update_daily_price(self, nation, period, us_batch_size, resume, token):
+        with self.connection() as (conn, cur):
+            cur.execute("SELECT code, country FROM comp_info")
+            universe = [(code, country) for code, country in cur.fetchall() if nation == 'all' or nation == country]
+        job_id, retry, no_data = self._resumable_job(nation) if resume else (None, [], set())
+        if job_id is not None:
+            # 남은 종목을 먼저 받고, 이어서 나머지 종목 중 최신이 아닌 종목을 받습니다.
+            # (중단 이후 새로 추가된 종목은 작업에 추가하고, 데이터가 없었던 종목은 다시 요청하지 않습니다.)
+            print(f"[작업 {job_id}] 미완료/실패 {len(retry)}개 종목부터 이어서 실행합니다. "
+                  f"(데이터 없음 {len(no_data)}개 제외)")
+            queued = {code for code, _ in retry} | no_data
+            stocks = retry + [(code, country) for code, country in universe if code not in queued]
+            now = sync_timestamp()
+            with self.connection() as (conn, cur), conn:
+                cur.executemany("INSERT OR IGNORE INTO update_job_item (job_id, code, country, status, updated_at) "
+                                "VALUES (?, ?, ?, 'pending', ?)", [(job_id, code, country, now) for code, country in stocks])
+                cur.execute("UPDATE update_job SET status = 'running', finished_at = NULL, "
+                            "total = (SELECT count(*) FROM update_job_item WHERE job_id = ?) WHERE job_id = ?",
+                            (job_id, job_id))
+        else:
+            if resume:
+                print("이어서 실행할 작업이 없어 새 작업을 시작합니다.")
+            stocks = universe
+            job_id = self._start_job(nation, period, stocks)
+
+        # 거래소 캘린더 기준으로 이미 최신인 종목(휴장일, 장 마감 후 이미 저장 등)은 요청하지 않습니다.
+        total_count = len(stocks)
+        stale = self.freshness.filter_stale(stocks)
+        stale_codes = {code for code, _ in stale}
+        self.mark_job_items(job_id, 'done', [(code, None) for code, _ in stocks if code not in stale_codes])
+        stocks = stale
+        print(f"최신 상태 {total_count - len(stocks)}개 종목을 건너뛰고 {len(stocks)}개 종목을 업데이트합니다.")
+        with self.connection() as (conn, cur), conn:
+            cur.executemany("UPDATE update_job_item SET attempts = attempts + 1 WHERE job_id = ? AND code = ?",
+                            [(job_id, code) for code, _ in stocks])
+        # 마지막 저장 봉부터만 받아오도록 종목별 high-water mark를 한 번에 조회합니다.
+        # (마지막 봉은 장중에 저장됐을 수 있으므로 다시 받아 덮어씁니다.)
+        last_dates = self.get_last_bar_dates()
+
+        # 수집 스레드는 다운로드/파싱만 하고, 저장은 writer 스레드가 묶어서 커밋합니다.
+        # sharded 레이아웃에서는 국가별 파일마다 writer를 두어 한국/미국 시세가 동시에 커밋됩니다.
+        if self.layout == 'sharded':
+            writers = {country: DailyPriceWriter(self, job_id=job_id, country=country) for country in SHARD_COUNTRIES}
+        else:
+            writers = dict.fromkeys(SHARD_COUNTRIES, DailyPriceWriter(self, job_id=job_id))
+        for writer in set(writers.values()):
+            writer.start()
+        futures = {}
+        try:
+            # 종목별 수집은 스케줄러의 bulk lane 작업으로 실행되므로 단건 조회가 들어오면 그 작업이 먼저 실행됩니다.
+            batch_us = bool(us_batch_size)
+            futures = {self.scheduler.submit(self.update_daily_price_by_code, code, country, period,
+                                             writers.get(country), last_dates.get(code),
+                                             priority=PRIORITY_BULK, token=token): [code]
+                       for code, country in stocks if not (batch_us and country == 'us')}
+            us_codes = [code for code, country in stocks if country == 'us']
+            countries = dict(stocks)
+            if batch_us and us_codes:
+                # yf.download는 스레드 간 공유 상태를 쓰므로 미국 일괄 다운로드는 한 작업에서 순차 실행합니다.
+                futures[self.scheduler.submit(self.update_us_daily_price_batch, us_codes, period, writers['us'],
+                                              last_dates, us_batch_size, priority=PRIORITY_BULK, token=token)] = us_codes
 
-        with concurrent.futures.ThreadPoolExecutor(max_workers=30) as executor:
-            futures = [executor.submit(self.update_daily_price_by_code, code, country, period) for code, country in stocks]
-            
             for i, future in enumerate(concurrent.futures.as_completed(futures), 1):
-                if not self.run_update:
+                if token.cancelled:
                     print("\n[알림] 사용자에 의해 업데이트가 중단되었습니다. 남은 작업을 취소합니다...")
-                    executor.shutdown(wait=False, cancel_futures=True)
                     break
 
                 try:
                     result = future.result()
-                    print(f"({i}/{len(stocks)}) {result}")
+                    print(f"({i}/{len(futures)}) {result}")
+                except JobCancelled:
+                    for code in futures[future]:
+                        if writers.get(countries[code]) is not None:
+                            writers[countries[code]].defer(code)
                 except Exception as e:
-                    print(f"({i}/{len(stocks)}) 에러 발생: {e}")
+                    print(f"({i}/{len(futures)}) 에러 발생: {e}")
+                    for code in futures[future]:
+                        if writers.get(countries[code]) is not None:
+                            writers[countries[code]].fail(code, f"error:{type(e).__name__}")
+        finally:
+            # 대기 중인 작업은 취소 시 바로 버려지고, 실행 중인 작업은 writer에 넘기기를 마친 뒤 끝납니다.
+            concurrent.futures.wait(futures)
+            stats = {}
+            for writer in set(writers.values()):
+                for key, value in writer.close().items():
+                    stats[key] = stats.get(key, 0) + value
+            self._finish_job(job_id, 'stopped' if token.cancelled else 'done')
 
+        self.http.print_connection_stats()
+        print_pool_stats()
+        self.scheduler.print_scheduler_stats()
+        print_single_flight_stats()
+        print_latency_stats()
+        print(f"\n시세 저장: {stats['frames']}종목 (신규 {stats['inserted']}행, 변경 {stats['updated']}행, "
+              f"동일하여 건너뜀 {stats['skipped']}행), 커밋 {stats['commits']}회, "
+              f"대기열 포화 누적 대기 {stats['blocked_sec']:.1f}초")
+        report = self.job_report(job_id)
+        self.print_job_report(report)
         print("\n모든 일별 시세 업데이트가 완료되었습니다.")
+        return report
     
     def update_single_stock_all_data(self, company):
         mdb = MarketDB()
@@ -545,39 +1962,132 @@ class DBUpdater(DBManager):
         code = comp_info.iloc[0]['code']
         country = comp_info.iloc[0]['country']
         
-        df = None
-        if country == 'kr':
-            df = self.read_naver_api(code, company)
-            if df is not None and not df.empty:
-                df.set_index('date', inplace=True)
-        elif country == 'us':
-            df = self.read_yfinance(code, period=2)
-            if df is not None and not df.empty:
-                df.columns = [col[0].lower() if isinstance(col, tuple) else col.lower() for col in df.columns]
+        # 같은 종목을 조회 중인 요청(차트 클릭 등)이 있으면 그 다운로드/저장을 함께 사용합니다.
+        df = self.sync_daily_price(code, country, period=2)
 
-        if df is not None and not df.empty:
-            self.replace_into_db(df, code)
+        if df is not None:
             print(f"'{company}' ({code})의 업데이트를 완료했습니다.")
         else:
             print(f"'{company}' ({code})의 데이터를 가져오는 데 실패했습니다.")
         
         return df
 
+class DailyPriceWriter(threading.Thread):
+    """
+    수집 스레드들이 넘긴 시세 프레임을 제한된 크기의 큐로 받아 단일 스레드에서 저장하는 writer.
+    행 수(commit_rows) 또는 경과 시간(commit_interval) 기준으로 모아서 한 번에 커밋하며,
+    큐가 가득 차면 put()이 블로킹되어 수집 스레드에 배압(backpressure)을 겁니다.
+    """
+    _STOP = object()
+
+    def __init__(self, db_updater, max_queue=64, commit_rows=20000, commit_interval=2.0, job_id=None, country=None):
+        super().__init__(name=f"DailyPriceWriter-{country or 'all'}", daemon=True)
+        self.db_updater = db_updater
+        self.job_id = job_id
+        self.country = country
+        self.failures = []
+        self.deferred = []
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.commit_rows = commit_rows
+        self.commit_interval = commit_interval
+        self.stats_lock = threading.Lock()
+        self.stats = {'frames': 0, 'inserted': 0, 'updated': 0, 'skipped': 0, 'commits': 0, 'blocked_sec': 0.0}
+
+    def put(self, code, df, span=None):
+        """
+        시세 프레임을 저장 대기열에 넣습니다. 대기열이 가득 차면 빈 자리가 생길 때까지 기다립니다.
+        span=(start, end)이 주어지면 저장과 함께 해당 구간을 받아 둔 구간(price_coverage)으로 기록합니다.
+        """
+        start = time.monotonic()
+        self.queue.put((code, df, span))
+        waited = time.monotonic() - start
+        with self.stats_lock:
+            self.stats['blocked_sec'] += waited
+
+    def fail(self, code, reason):
+        """수집에 실패한 종목을 기록합니다. job_id가 있으면 다음 커밋 때 작업 상태를 failed로 저장합니다."""
+        with self.stats_lock:
+            self.failures.append((code, reason))
+
+    def defer(self, code):
+        """취소되어 받지 못한 종목을 기록합니다. job_id가 있으면 다음 커밋 때 작업 상태를 pending으로 되돌립니다."""
+        with self.stats_lock:
+            self.deferred.append((code, None))
+
+    def close(self):
+        """남은 대기열을 모두 저장한 뒤 writer를 종료하고 통계를 반환합니다."""
+        self.queue.put(self._STOP)
+        self.join()
+        return dict(self.stats)
+
+    def run(self):
+        pending = []
+        pending_rows = 0
+        last_commit = time.monotonic()
+        try:
+            while True:
+                timeout = max(0.0, self.commit_interval - (time.monotonic() - last_commit))
+                try:
+                    item = self.queue.get(timeout=timeout)
+                except queue.Empty:
+                    item = None
+
+                if item is self._STOP:
+                    break
+                if item is not None:
+                    pending.append(item)
+                    pending_rows += len(item[1])
+
+                due = time.monotonic() - last_commit >= self.commit_interval
+                if pending and (pending_rows >= self.commit_rows or due):
+                    self._flush(pending)
+                    pending, pending_rows = [], 0
+                if pending_rows == 0:
+                    last_commit = time.monotonic()
+            self._flush(pending)
+        finally:
+            self.db_updater.close_db_conn()
+
+    def _flush(self, pending):
+        frames = [(code, df) for code, df, _ in pending]
+        coverage = [(code,) + span for code, _, span in pending if span is not None]
+        counts = (self.db_updater.bulk_replace_into_db(frames, job_id=self.job_id, coverage=coverage, country=self.country)
+                  if pending else {})
+        with self.stats_lock:
+            if pending:
+                self.stats['frames'] += len(pending)
+                self.stats['commits'] += 1
+            for code, stat in counts.items():
+                for key in ('inserted', 'updated', 'skipped'):
+                    self.stats[key] += stat[key]
+            # 변환/저장 오류로 저장되지 않은 종목도 실패로 기록합니다.
+            failures = self.failures + [(code, 'save_error') for code, df, _ in pending
+                                        if code not in counts and not df.empty]
+            self.failures = []
+            deferred, self.deferred = self.deferred, []
+        if self.job_id is not None and failures:
+            self.db_updater.mark_job_items(self.job_id, 'failed', failures)
+        if self.job_id is not None and deferred:
+            self.db_updater.mark_job_items(self.job_id, 'pending', deferred)
+        for code, stat in counts.items():
+            print(f"[{code}] 시세 저장: 신규 {stat['inserted']}, 변경 {stat['updated']}, 동일 {stat['skipped']}")
+
 class MarketDB(DBManager):
+    """조회 전용 DB 접근. 조회마다 풀에서 read 연결을 빌렸다가 바로 반납합니다."""
     def get_comp_info(self, company=None):
-        conn, cur = self._get_db_conn()
-        if company:
-            company_safe = company.replace("'", "''").lower()
-            sql = f"SELECT * FROM comp_info WHERE lower(company) = '{company_safe}' or lower(code) = '{company_safe}'"
-            df = pd.read_sql(sql, conn)
-            
-            if df.empty:
-                sql = f"SELECT * FROM comp_info WHERE lower(company) LIKE '%{company_safe}%' or lower(code) LIKE '%{company_safe}%'"
-                df = pd.read_sql(sql, conn)
-            return df
-        else:
-            sql = "SELECT * FROM comp_info"
-        return pd.read_sql(sql, conn)
+        with self.connection() as (conn, cur):
+            if company:
+                company_lower = company.lower()
+                # lower(company), lower(code) 표현식 인덱스를 타도록 파라미터 바인딩으로 조회합니다.
+                sql = "SELECT * FROM comp_info WHERE lower(company) = ? or lower(code) = ?"
+                df = pd.read_sql(sql, conn, params=(company_lower, company_lower))
+
+                if df.empty:
+                    pattern = f"%{company_lower}%"
+                    sql = "SELECT * FROM comp_info WHERE lower(company) LIKE ? or lower(code) LIKE ?"
+                    df = pd.read_sql(sql, conn, params=(pattern, pattern))
+                return df
+            return pd.read_sql("SELECT * FROM comp_info", conn)
 
     def get_daily_price(self, company, start_date=None, end_date=None):
         comp_info = self.get_comp_info(company)
@@ -587,20 +2097,59 @@ class MarketDB(DBManager):
         code = comp_info.iloc[0]['code']
         name = comp_info.iloc[0]['company']
         
-        conn, cur = self._get_db_conn()
-        
-        if start_date and end_date:
-            sql = f"SELECT * FROM daily_price WHERE code = '{code}' AND date BETWEEN '{start_date}' AND '{end_date}'"
-        elif start_date:
-            sql = f"SELECT * FROM daily_price WHERE code = '{code}' AND date >= '{start_date}'"
-        else:
-            sql = f"SELECT * FROM daily_price WHERE code = '{code}'"
-        
-        df = pd.read_sql(sql, conn)
-        if not df.empty:
-            df.index = pd.to_datetime(df.date)
+        with self.connection() as (conn, cur):
+            table, key = self._price_table()
+            conditions, params = ["code = ?"], [code]
+            if start_date:
+                conditions.append(f"{key} >= ?")
+                params.append(self._date_key(start_date))
+            if end_date:
+                conditions.append(f"{key} <= ?")
+                params.append(self._date_key(end_date))
+            where = ' AND '.join(conditions)
+
+            if self.schema != 'compact':
+                df = pd.read_sql(f"SELECT * FROM daily_price WHERE {where}", conn, params=params)
+                if not df.empty:
+                    df.index = pd.to_datetime(df.date)
+                return df
+
+            # compact: 숫자만 있는 행을 한 번에 float64 배열로 읽고, 일수는 문자열 파싱 없이 datetime64로 바꿉니다.
+            # (정수로 저장된 원화 가격도 text 형식과 같은 실수형 컬럼이 됩니다)
+            cur.execute(f"SELECT day, open, high, low, close, diff, volume FROM daily_bar WHERE {where}", params)
+            values = np.array(cur.fetchall(), dtype=np.float64).reshape(-1, 7)
+        dates = pd.DatetimeIndex(values[:, 0].astype(np.int64).astype('M8[D]'), name='date')
+        df = pd.DataFrame(values[:, 1:6], columns=PRICE_COLUMNS, index=dates)
+        df.insert(0, 'code', code)
+        df.insert(1, 'date', dates)
+        df['volume'] = values[:, 6].astype(np.int64)
         return df
 
+    def get_minute_bars(self, company, start=None, end=None):
+        """
+        종목의 [start, end] 구간 분봉을 분봉 저장소에서 읽습니다. (start/end: 'YYYY-MM-DD' 또는 'YYYY-MM-DD HH:MM')
+        반환값: {'time': datetime64[m] (거래소 현지 시각), 'open'/'high'/'low'/'close': float64, 'volume': int64} 배열
+        (종목을 찾지 못하면 None)
+        """
+        comp_info = self.get_comp_info(company)
+        if comp_info.empty:
+            return None
+        return MinuteBarStore(self).read(comp_info.iloc[0]['code'], start, end)
+
+    def get_prices_on_date(self, date, country=None):
+        """특정 날짜의 전 종목 시세를 조회합니다. (날짜 인덱스 사용)"""
+        with self.connection() as (conn, cur):
+            table, key = self._price_table()
+            columns = (f"p.code, {self._date_sql(f'p.{key}')} AS date, "
+                       "p.open, p.high, p.low, p.close, p.diff, p.volume")
+            if country:
+                sql = (f"SELECT {columns} FROM {table} p JOIN comp_info c ON p.code = c.code "
+                       f"WHERE p.{key} = ? AND c.country = ?")
+                return pd.read_sql(sql, conn, params=(self._date_key(date), country))
+            return pd.read_sql(f"SELECT {columns} FROM {table} p WHERE p.{key} = ?", conn,
+                               params=(self._date_key(date),))
+
 if __name__ == '__main__':
-    dbu = DBUpdater()
-    dbu.execute_daily()
+    # 장 마감 후 자동 업데이트 데몬 (update_daemon.py와 같은 옵션: --once, --nation, --status)
+    from update_daemon import main
+    main()
@@ -0,0 +1,474 @@
+import argparse
+import os
+import shutil
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import DBUpdater_new
+
+
+def make_synthetic_frames(n_codes, n_bars, seed=0):
+    """합성 시세 데이터({code: df})를 생성합니다. 인덱스는 영업일 기준 DatetimeIndex입니다."""
+    rng = np.random.default_rng(seed)
+    dates = pd.bdate_range('2024-01-02', periods=n_bars)
+    frames = {}
+    for i in range(n_codes):
+        close = 10000 + rng.normal(0, 100, n_bars).cumsum()
+        frames[f"{i:06d}"] = pd.DataFrame({
+            'open': close + rng.normal(0, 10, n_bars),
+            'high': close + 50,
+            'low': close - 50,
+            'close': close,
+            'volume': rng.integers(1000, 1000000, n_bars),
+        }, index=dates)
+    return frames
+
+
+def legacy_replace_into_db(dbu, df, code):
+    """기존 방식: 행마다 f-string REPLACE 문을 만들어 cur.execute로 실행합니다."""
+    # 합성 종목 코드는 숫자이므로 sharded 레이아웃에서는 kr 시세 파일에 씁니다.
+    if 'diff' not in df.columns:
+        df['diff'] = df['close'].diff().fillna(0)
+    with dbu.connection('kr') as (conn, cur):
+        for r in df.itertuples():
+            date_str = r.Index.strftime('%Y-%m-%d')
+            sql = (f"REPLACE INTO daily_price (code, date, open, high, low, close, diff, volume) "
+                   f"VALUES ('{code}', '{date_str}', '{r.open}', '{r.high}', '{r.low}', '{r.close}', '{r.diff}', '{r.volume}')")
+            cur.execute(sql)
+        conn.commit()
+
+
+def bench_upsert(args):
+    """행 단위 REPLACE 루프와 executemany 일괄 저장 경로의 소요 시간을 비교합니다."""
+    frames = make_synthetic_frames(args.codes, args.bars)
+    n_rows = args.codes * args.bars
+    work_dir = tempfile.mkdtemp(prefix='investar_bench_')
+    try:
+        # 행 단위 REPLACE는 이전 방식이므로 이전 저장 형식(text)에서 측정합니다.
+        legacy = DBUpdater_new.DBUpdater(os.path.join(work_dir, 'legacy.db'), schema='text')
+        start = time.perf_counter()
+        for code, df in frames.items():
+            legacy_replace_into_db(legacy, df.copy(), code)
+        legacy_sec = time.perf_counter() - start
+        legacy.close_db_conn()
+
+        bulk = DBUpdater_new.DBUpdater(os.path.join(work_dir, 'bulk.db'), schema='text')
+        start = time.perf_counter()
+        counts = bulk.bulk_replace_into_db({code: df.copy() for code, df in frames.items()})
+        written = sum(stat['inserted'] + stat['updated'] for stat in counts.values())
+        bulk_sec = time.perf_counter() - start
+
+        # 같은 데이터를 다시 넣는 경우(겹치는 구간 재수집): 변경 없는 봉은 건너뜁니다.
+        start = time.perf_counter()
+        counts = bulk.bulk_replace_into_db({code: df.copy() for code, df in frames.items()})
+        reingest_sec = time.perf_counter() - start
+        skipped = sum(stat['skipped'] for stat in counts.values())
+        bulk.close_db_conn()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"[upsert] {args.codes}종목 x {args.bars}봉 = {n_rows}행")
+    print(f"  행 단위 REPLACE 루프 : {legacy_sec:8.3f}초 ({n_rows / legacy_sec:,.0f}행/초)")
+    print(f"  executemany 일괄 저장: {bulk_sec:8.3f}초 ({written / bulk_sec:,.0f}행/초)")
+    print(f"  동일 데이터 재수집    : {reingest_sec:8.3f}초 (건너뜀 {skipped}행)")
+    print(f"  속도 향상: {legacy_sec / bulk_sec:.1f}배")
+
+
+def bench_incremental(args):
+    """
+    네이버 siseJson 전체 구간 요청과 마지막 저장 봉 이후 구간 요청의
+    응답 크기와 다운로드+파싱 시간을 비교합니다. (네트워크 필요)
+    """
+    from http_client import get_http_client
+    http = get_http_client()
+    dbu = DBUpdater_new.DBUpdater(os.path.join(tempfile.mkdtemp(prefix='investar_bench_'), 'incr.db'))
+    last_date = pd.bdate_range(end=pd.Timestamp.today().normalize(), periods=2)[0].strftime('%Y-%m-%d')
+    totals = {'full': [0, 0.0], 'incremental': [0, 0.0]}
+    for code in args.codes:
+        for mode, start_date in (('full', None), ('incremental', last_date)):
+            res = http.get(dbu._naver_api_url(code, start_date))
+            totals[mode][0] += len(res.content)
+            start = time.perf_counter()
+            dbu.read_naver_api(code, "", start_date=start_date)
+            totals[mode][1] += time.perf_counter() - start
+
+    print(f"[incremental] {len(args.codes)}종목, 증분 시작일 {last_date}")
+    for mode, (n_bytes, sec) in totals.items():
+        print(f"  {mode:12s}: {n_bytes:>10,d} bytes, 다운로드+파싱 {sec:.3f}초")
+    print(f"  응답 크기 비율: {totals['full'][0] / max(totals['incremental'][0], 1):.0f}배")
+
+
+def bench_yfinance(args):
+    """종목별 yf.Ticker().history 경로와 yf.download 일괄 경로의 소요 시간을 비교합니다. (네트워크 필요)"""
+    dbu = DBUpdater_new.DBUpdater(os.path.join(tempfile.mkdtemp(prefix='investar_bench_'), 'yf.db'))
+    codes = args.codes
+
+    start = time.perf_counter()
+    per_ticker = {}
+    for code in codes:
+        df = dbu.fetch_daily_price_by_code(code, 'us', period=args.period)
+        if df is not None and not df.empty:
+            per_ticker[code] = df
+    per_ticker_sec = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch = dbu.read_yfinance_batch(codes, period=args.period, chunk_size=args.chunk)
+    batch_sec = time.perf_counter() - start
+
+    print(f"[yfinance] {len(codes)}개 티커, period={args.period}, chunk={args.chunk}")
+    print(f"  종목별 history : {per_ticker_sec:8.2f}초 (성공 {len(per_ticker)}개)")
+    print(f"  일괄 download  : {batch_sec:8.2f}초 (성공 {len(batch)}개)")
+    print(f"  속도 향상: {per_ticker_sec / batch_sec:.1f}배")
+
+
+def _time_queries(conn, queries, repeat):
+    timings = {}
+    for name, sql, params in queries:
+        start = time.perf_counter()
+        for _ in range(repeat):
+            conn.execute(sql, params).fetchall()
+        timings[name] = (time.perf_counter() - start) / repeat * 1000
+    return timings
+
+
+def bench_profile(args):
+    """
+    SQLite 기본 설정(legacy, 보조 인덱스 없음)과 ingest 프로파일(WAL/mmap/cache + 보조 인덱스)의
+    저장 시간 및 조회 시간을 비교합니다.
+    """
+    frames = make_synthetic_frames(args.codes, args.bars)
+    codes = list(frames)
+    comp_rows = [(code, f"Company {code}", 'KOSPI' if i % 2 else 'NASDAQ', 'kr' if i % 2 else 'us')
+                 for i, code in enumerate(codes)]
+    probe_date = frames[codes[0]].index[args.bars // 2].strftime('%Y-%m-%d')
+    queries = [
+        ('날짜별 전 종목 조회', "SELECT * FROM daily_price WHERE date = ?", (probe_date,)),
+        ('국가별 종목 목록', "SELECT * FROM comp_info WHERE country = ?", ('kr',)),
+        ('종목명 검색', "SELECT * FROM comp_info WHERE lower(company) = ? OR lower(code) = ?",
+         (f"company {codes[-1]}", f"company {codes[-1]}")),
+    ]
+
+    work_dir = tempfile.mkdtemp(prefix='investar_bench_')
+    results = {}
+    try:
+        for profile in ('legacy', 'ingest'):
+            # 보조 인덱스 삭제/조회를 한 파일의 daily_price 테이블에서 비교하도록 single 레이아웃, text 형식을 사용합니다.
+            dbu = DBUpdater_new.DBUpdater(os.path.join(work_dir, f'{profile}.db'), profile=profile, layout='single',
+                                          schema='text')
+            conn, cur = dbu._get_db_conn()
+            if profile == 'legacy':
+                for (name,) in cur.execute("SELECT name FROM sqlite_master WHERE type='index' AND name LIKE 'idx_%'").fetchall():
+                    cur.execute(f"DROP INDEX {name}")
+            cur.executemany("INSERT INTO comp_info (code, company, market, country) VALUES (?, ?, ?, ?)", comp_rows)
+            conn.commit()
+
+            start = time.perf_counter()
+            for i in range(0, len(codes), 50):
+                dbu.bulk_replace_into_db({code: frames[code].copy() for code in codes[i:i + 50]})
+            write_sec = time.perf_counter() - start
+            results[profile] = (write_sec, _time_queries(conn, queries, args.repeat))
+            dbu.close_db_conn()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"[profile] {args.codes}종목 x {args.bars}봉, 조회 {args.repeat}회 평균")
+    print(f"  {'':24s}{'legacy':>12s}{'ingest':>12s}")
+    print(f"  {'저장 (50종목씩 커밋)':24s}{results['legacy'][0]:>11.2f}s{results['ingest'][0]:>11.2f}s")
+    for name, _, _ in queries:
+        print(f"  {name:24s}{results['legacy'][1][name]:>10.2f}ms{results['ingest'][1][name]:>10.2f}ms")
+
+
+def bench_shards(args):
+    """
+    한국/미국 시세를 두 스레드에서 동시에 저장할 때 single(파일 하나)과 sharded(국가별 파일) 레이아웃의
+    총 소요 시간과 쓰기 잠금 대기를 비교합니다.
+    """
+    import threading
+    frames = make_synthetic_frames(args.codes * 2, args.bars)
+    codes = list(frames)
+    by_country = {'kr': codes[:args.codes], 'us': codes[args.codes:]}
+
+    work_dir = tempfile.mkdtemp(prefix='investar_bench_')
+    results = {}
+    try:
+        for layout in ('single', 'sharded'):
+            dbu = DBUpdater_new.DBUpdater(os.path.join(work_dir, f'{layout}.db'), layout=layout)
+            conn, cur = dbu._get_db_conn()
+            cur.executemany("INSERT INTO comp_info (code, company, country) VALUES (?, ?, ?)",
+                            [(code, code, country) for country, group in by_country.items() for code in group])
+            conn.commit()
+
+            def write(country):
+                group = by_country[country]
+                for i in range(0, len(group), 20):
+                    dbu.bulk_replace_into_db({code: frames[code].copy() for code in group[i:i + 20]},
+                                             country=country if layout == 'sharded' else None)
+                dbu.close_db_conn()
+
+            threads = [threading.Thread(target=write, args=(country,)) for country in by_country]
+            start = time.perf_counter()
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+            results[layout] = time.perf_counter() - start
+            dbu.close_db_conn()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    n_rows = args.codes * 2 * args.bars
+    print(f"[shards] 한국 {args.codes}종목 + 미국 {args.codes}종목 x {args.bars}봉 = {n_rows}행, 국가별 스레드 동시 저장")
+    for layout, sec in results.items():
+        print(f"  {layout:8s}: {sec:8.3f}초 ({n_rows / sec:,.0f}행/초)")
+    print(f"  속도 향상: {results['single'] / results['sharded']:.1f}배")
+
+
+def bench_schema(args):
+    """
+    text 형식(daily_price: 날짜 TEXT, 가격 REAL)과 compact 형식(daily_bar: 정수 일수, WITHOUT ROWID)의
+    저장 시간, 파일 크기, 종목별 구간 조회(MarketDB.get_daily_price), 날짜별 조회 시간과
+    text -> compact 변환 시간을 비교합니다. 원화 가격처럼 정수인 합성 시세를 사용합니다.
+    """
+    frames = {code: df.round(0) for code, df in make_synthetic_frames(args.codes, args.bars).items()}
+    codes = list(frames)
+    start_date = frames[codes[0]].index[args.bars // 2].strftime('%Y-%m-%d')
+
+    work_dir = tempfile.mkdtemp(prefix='investar_bench_')
+    results = {}
+    try:
+        for schema in ('text', 'compact'):
+            path = os.path.join(work_dir, f'{schema}.db')
+            dbu = DBUpdater_new.DBUpdater(path, layout='single', schema=schema)
+            conn, cur = dbu._get_db_conn()
+            cur.executemany("INSERT INTO comp_info (code, company, country) VALUES (?, ?, 'kr')",
+                            [(code, code) for code in codes])
+            conn.commit()
+
+            start = time.perf_counter()
+            for i in range(0, len(codes), 50):
+                dbu.bulk_replace_into_db({code: frames[code].copy() for code in codes[i:i + 50]})
+            write_sec = time.perf_counter() - start
+            cur.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            dbu.close_db_conn()
+
+            mdb = DBUpdater_new.MarketDB(path, layout='single')
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                for code in codes[:100]:
+                    mdb.get_daily_price(code, start_date)
+            range_ms = (time.perf_counter() - start) / (args.repeat * min(len(codes), 100)) * 1000
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                mdb.get_prices_on_date(start_date)
+            date_ms = (time.perf_counter() - start) / args.repeat * 1000
+            mdb.close_db_conn()
+            results[schema] = (write_sec, os.path.getsize(path), range_ms, date_ms)
+
+        # 같은 text DB를 compact로 변환
+        dbu = DBUpdater_new.DBUpdater(os.path.join(work_dir, 'text.db'), layout='single')
+        start = time.perf_counter()
+        dbu.migrate_price_schema()
+        migrate_sec = time.perf_counter() - start
+        dbu.close_db_conn()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"[schema] {args.codes}종목 x {args.bars}봉, 조회 {args.repeat}회 평균")
+    print(f"  {'':24s}{'text':>12s}{'compact':>12s}")
+    print(f"  {'저장 (50종목씩 커밋)':24s}{results['text'][0]:>11.2f}s{results['compact'][0]:>11.2f}s")
+    print(f"  {'파일 크기':24s}{results['text'][1] / 1024 ** 2:>10.1f}MB{results['compact'][1] / 1024 ** 2:>10.1f}MB")
+    print(f"  {'종목별 구간 조회':24s}{results['text'][2]:>10.2f}ms{results['compact'][2]:>10.2f}ms")
+    print(f"  {'날짜별 전 종목 조회':24s}{results['text'][3]:>10.2f}ms{results['compact'][3]:>10.2f}ms")
+    print(f"  text -> compact 변환: {migrate_sec:.2f}초")
+
+
+def make_synthetic_minute_bars(n_codes, n_days, seed=0):
+    """합성 분봉({code: 배열}). 영업일마다 09:00부터 390개, 가격은 10원 단위 정수입니다."""
+    rng = np.random.default_rng(seed)
+    days = pd.bdate_range('2024-01-02', periods=n_days).values.astype('M8[m]').astype(np.int64)
+    minutes = (days[:, None] + 9 * 60 + np.arange(390)).ravel()
+    bars = {}
+    for i in range(n_codes):
+        close = np.round((60000 + rng.normal(0, 30, len(minutes)).cumsum()) / 10) * 10
+        bars[f"{i:06d}"] = {'minute': minutes, 'open': close + rng.choice([-10, 0, 10], len(minutes)),
+                            'high': close + 20, 'low': close - 20, 'close': close,
+                            'volume': rng.integers(0, 50000, len(minutes))}
+    return bars
+
+
+def bench_minute(args):
+    """
+    분봉을 행 단위 테이블(minute_price: 분봉 하나가 한 행, executemany REPLACE)에 저장할 때와
+    종목/월 단위 압축 블록 저장소(MinuteBarStore)에 저장할 때의 저장 시간, 파일 크기, 하루/한 달 구간 조회 시간을 비교합니다.
+    """
+    from minute_store import MinuteBarStore
+
+    bars = make_synthetic_minute_bars(args.codes, args.days)
+    codes = list(bars)
+    n_rows = sum(len(b['minute']) for b in bars.values())
+    first = bars[codes[0]]['minute']
+    day = str(first[len(first) // 2].astype('M8[m]').astype('M8[D]'))
+    month_start = str(first[0].astype('M8[m]').astype('M8[D]'))
+    month_end = str((first[0].astype('M8[m]').astype('M8[M]') + 1).astype('M8[D]') - 1)
+
+    work_dir = tempfile.mkdtemp(prefix='investar_bench_')
+    results = {}
+    try:
+        dbu = DBUpdater_new.DBUpdater(os.path.join(work_dir, 'rows.db'), layout='single')
+        conn, cur = dbu._get_db_conn()
+        cur.execute("CREATE TABLE minute_price (code TEXT, minute INTEGER, open REAL, high REAL, low REAL, "
+                    "close REAL, volume INTEGER, PRIMARY KEY (code, minute))")
+        start = time.perf_counter()
+        for code, b in bars.items():
+            cur.executemany("REPLACE INTO minute_price VALUES (?, ?, ?, ?, ?, ?, ?)",
+                            zip([code] * len(b['minute']), b['minute'].tolist(), b['open'].tolist(),
+                                b['high'].tolist(), b['low'].tolist(), b['close'].tolist(), b['volume'].tolist()))
+            conn.commit()
+        write_sec = time.perf_counter() - start
+        cur.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+        def read_rows(code, lo, hi):
+            lo = np.datetime64(lo, 'm').astype(np.int64)
+            hi = np.datetime64(hi, 'm').astype(np.int64) + 24 * 60 - 1
+            cur.execute("SELECT minute, open, high, low, close, volume FROM minute_price "
+                        "WHERE code = ? AND minute BETWEEN ? AND ?", (code, int(lo), int(hi)))
+            return np.array(cur.fetchall(), dtype=np.float64)
+
+        timings = []
+        for lo, hi in ((day, day), (month_start, month_end)):
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                for code in codes:
+                    read_rows(code, lo, hi)
+            timings.append((time.perf_counter() - start) / (args.repeat * len(codes)) * 1000)
+        results['rows'] = (write_sec, os.path.getsize(os.path.join(work_dir, 'rows.db')), *timings)
+        dbu.close_db_conn()
+
+        store = MinuteBarStore(DBUpdater_new.DBManager(os.path.join(work_dir, 'blocks.db'), layout='single'))
+        start = time.perf_counter()
+        for code, b in bars.items():
+            store.write(code, b)
+        write_sec = time.perf_counter() - start
+        with store.pool.lease('ingest') as conn:
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        timings = []
+        for lo, hi in ((day, day), (month_start, month_end)):
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                for code in codes:
+                    store.read(code, lo, hi)
+            timings.append((time.perf_counter() - start) / (args.repeat * len(codes)) * 1000)
+        results['blocks'] = (write_sec, os.path.getsize(store.path), *timings)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"[minute] {args.codes}종목 x {args.days}일 ({n_rows:,}개 분봉), 조회 {args.repeat}회 평균")
+    print(f"  {'':24s}{'행 단위':>12s}{'월 블록':>12s}")
+    print(f"  {'저장 (종목별 커밋)':24s}{results['rows'][0]:>11.2f}s{results['blocks'][0]:>11.2f}s")
+    print(f"  {'파일 크기':24s}{results['rows'][1] / 1024 ** 2:>10.1f}MB{results['blocks'][1] / 1024 ** 2:>10.1f}MB")
+    print(f"  {'하루 구간 조회':24s}{results['rows'][2]:>10.2f}ms{results['blocks'][2]:>10.2f}ms")
+    print(f"  {'한 달 구간 조회':24s}{results['rows'][3]:>10.2f}ms{results['blocks'][3]:>10.2f}ms")
+
+
+def make_sise_payload(n_bars, seed=0):
+    """네이버 siseJson 일봉 응답과 같은 형식의 합성 페이로드 문자열을 만듭니다."""
+    frame = make_synthetic_frames(1, n_bars, seed)['000000'].round(0)
+    lines = ["\n [['날짜', '시가', '고가', '저가', '종가', '거래량', '외국인소진율'],"]
+    for date, r in zip(frame.index.strftime('%Y%m%d'), frame.itertuples()):
+        lines.append(f'["{date}", {r.open:.0f}, {r.high:.0f}, {r.low:.0f}, {r.close:.0f}, {r.volume}, 53.28],')
+    lines[-1] = lines[-1].rstrip(',')
+    return "\n".join(lines) + "\n]\n"
+
+
+def bench_parse(args):
+    """
+    기록된(또는 합성) siseJson 페이로드를 기존 json.loads 경로와 NumPy 파서로 파싱하여
+    종목당 파싱 시간과 최대 메모리 할당량을 비교합니다.
+    """
+    import tracemalloc
+    from sise_parser import parse_sise_json, sise_arrays_to_frame
+
+    if args.files:
+        payloads = []
+        for path in args.files:
+            with open(path, encoding='utf-8') as f:
+                payloads.append(f.read())
+    else:
+        payloads = [make_sise_payload(args.bars, seed) for seed in range(args.codes)]
+
+    dbu = DBUpdater_new.DBUpdater(os.path.join(tempfile.mkdtemp(prefix='investar_bench_'), 'parse.db'))
+    parsers = {
+        'json.loads + DataFrame': dbu._parse_sise_json_legacy,
+        'NumPy 파서': lambda text: sise_arrays_to_frame(parse_sise_json(text)),
+    }
+
+    print(f"[parse] 페이로드 {len(payloads)}개 (평균 {sum(map(len, payloads)) / len(payloads) / 1024:.0f}KB)")
+    for name, parse in parsers.items():
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for text in payloads:
+                parse(text)
+        per_code_ms = (time.perf_counter() - start) / (args.repeat * len(payloads)) * 1000
+
+        tracemalloc.start()
+        parse(payloads[0])
+        peak_kb = tracemalloc.get_traced_memory()[1] / 1024
+        tracemalloc.stop()
+        print(f"  {name:24s}: 종목당 {per_code_ms:7.3f}ms, 최대 할당 {peak_kb:8.0f}KB")
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="DBUpdater 성능 측정 스크립트")
+    sub = parser.add_subparsers(dest='bench', required=True)
+
+    p = sub.add_parser('upsert', help="daily_price 저장 경로 비교 (합성 investar.db)")
+    p.add_argument('--codes', type=int, default=200)
+    p.add_argument('--bars', type=int, default=450)
+    p.set_defaults(func=bench_upsert)
+
+    p = sub.add_parser('profile', help="SQLite 연결 프로파일/보조 인덱스 전후 비교 (합성 investar.db)")
+    p.add_argument('--codes', type=int, default=500)
+    p.add_argument('--bars', type=int, default=450)
+    p.add_argument('--repeat', type=int, default=20)
+    p.set_defaults(func=bench_profile)
+
+    p = sub.add_parser('shards', help="국가별 시세 파일 분리 전후 동시 저장 비교 (합성 데이터)")
+    p.add_argument('--codes', type=int, default=200)
+    p.add_argument('--bars', type=int, default=450)
+    p.set_defaults(func=bench_shards)
+
+    p = sub.add_parser('schema', help="text/compact 시세 저장 형식 비교 (합성 investar.db)")
+    p.add_argument('--codes', type=int, default=500)
+    p.add_argument('--bars', type=int, default=450)
+    p.add_argument('--repeat', type=int, default=5)
+    p.set_defaults(func=bench_schema)
+
+    p = sub.add_parser('minute', help="분봉 행 단위 저장과 종목/월 블록 저장소 비교 (합성 데이터)")
+    p.add_argument('--codes', type=int, default=20)
+    p.add_argument('--days', type=int, default=60)
+    p.add_argument('--repeat', type=int, default=5)
+    p.set_defaults(func=bench_minute)
+
+    p = sub.add_parser('parse', help="siseJson 파서 마이크로벤치마크 (기록된 페이로드 또는 합성)")
+    p.add_argument('--files', nargs='*', help="기록해 둔 siseJson 응답 파일 경로")
+    p.add_argument('--codes', type=int, default=20)
+    p.add_argument('--bars', type=int, default=450)
+    p.add_argument('--repeat', type=int, default=10)
+    p.set_defaults(func=bench_parse)
+
+    p = sub.add_parser('incremental', help="siseJson 전체/증분 구간 요청 비교 (네트워크 필요)")
+    p.add_argument('--codes', nargs='+', default=['005930', '000660', '035420', '005380', '051910'])
+    p.set_defaults(func=bench_incremental)
+
+    p = sub.add_parser('yfinance', help="yfinance 종목별/일괄 다운로드 비교 (네트워크 필요)")
+    p.add_argument('--codes', nargs='+', default=['AAPL', 'MSFT', 'NVDA', 'AMZN', 'GOOGL', 'META', 'BRK.B',
+                                                  'JPM', 'V', 'XOM', 'UNH', 'JNJ', 'PG', 'HD', 'BF.B'])
+    p.add_argument('--period', type=int, default=2)
+    p.add_argument('--chunk', type=int, default=DBUpdater_new.YF_BATCH_SIZE)
+    p.set_defaults(func=bench_yfinance)
+
+    args = parser.parse_args()
+    args.func(args)
@@ -1,10 +1,12 @@
 import pandas as pd
 import DBUpdater_new
+import concurrent.futures
 from threading import Lock
 import FinanceDataReader as fdr
 from datetime import datetime, timedelta
 import yfinance as yf
 import logging
+from job_scheduler import PRIORITY_INTERACTIVE, INTERACTIVE_BUDGET, get_job_scheduler
 
 # yfinance 라이브러리가 생성하는 INFO, WARNING 수준의 로그를 비활성화합니다.
 # 이렇게 하면 'possibly delisted'와 같은 메시지가 콘솔에 나타나지 않습니다.
@@ -33,7 +35,8 @@ class DataManager:
                 markets = ['NASDAQ', 'NYSE', 'AMEX', 'KRX', 'ETF/KR']
                 for market_name in markets:
                     fdr_market_name = 'KRX-DESC' if market_name == 'KRX' else market_name
-                    df_stocks = fdr.StockListing(fdr_market_name)
+                    # 종목 목록은 디스크 캐시에 하루 동안 보관되어 반복 검색 시 다시 내려받지 않습니다.
+                    df_stocks = DBUpdater_new.cached_stock_listing(fdr_market_name)
                     code_col = 'Code' if market_name == 'KRX' else 'Symbol'
                     if code_col not in df_stocks.columns or 'Name' not in df_stocks.columns:
                         continue
@@ -55,8 +58,7 @@ class DataManager:
                         
                         print(f"인터넷에서 종목을 찾았습니다: 코드='{code}', 이름='{name}', 국가='{country}', 마켓='{market_name}'")
                         
-                        conn, cur = self.market_db._get_db_conn()
-                        with conn:
+                        with self.market_db.connection() as (conn, cur), conn:
                             cur.execute(
                                 "INSERT OR IGNORE INTO comp_info (code, company, country, market) VALUES (?, ?, ?, ?)",
                                 (code, name, country, market_name)
@@ -74,31 +76,32 @@ class DataManager:
                 return None, None, None, None
 
     def update_recent_stock_data(self, code, country):
-        """특정 종목의 최신 시세 데이터를 DB에 덮어쓰기하여 업데이트합니다."""
+        """
+        특정 종목의 최신 시세 데이터를 DB에 덮어쓰기하여 업데이트합니다.
+        사용자가 기다리는 조회이므로 interactive lane 작업으로 지연 예산 안에서 실행합니다.
+        """
         try:
-            df_new = None
-            if country == 'kr':
-                # 국내 주식은 네이버 API를 사용합니다.
-                df_new = self.db_updater.read_naver_api(code, "")
-                if df_new is not None and not df_new.empty:
-                    df_new.set_index('date', inplace=True)
-            elif country == 'us':
-                # 미국 주식은 yfinance를 사용합니다.
-                df_new = self.db_updater.read_yfinance(code, period=1) # period=1은 최신 20일 데이터를 의미합니다.
-                if df_new is not None and not df_new.empty:
-                    # yfinance가 반환하는 대문자 컬럼명을 소문자로 변경합니다.
-                    if isinstance(df_new.columns, pd.MultiIndex):
-                        df_new.columns = df_new.columns.get_level_values(0)
-                    df_new = df_new.loc[:, ~df_new.columns.duplicated(keep='first')]
-                    df_new = df_new[['Open', 'High', 'Low', 'Close', 'Volume']]
-                    df_new.columns = ['open', 'high', 'low', 'close', 'volume']
+            get_job_scheduler().run(self._update_recent_stock_data, code, country,
+                                    priority=PRIORITY_INTERACTIVE, budget=INTERACTIVE_BUDGET)
+        except concurrent.futures.CancelledError:
+            print(f"'{code}' 최신 시세 업데이트가 지연 예산을 넘겨 저장된 데이터를 사용합니다.")
 
-            if df_new is None or df_new.empty:
-                print(f"'{code}'에 대한 새로운 시세 데이터가 없습니다.")
-                return
+    def _update_recent_stock_data(self, code, country):
+        try:
+            # 거래소 캘린더 기준으로 이미 최신이면 네트워크 요청을 하지 않습니다.
+            with self.db_lock:
+                if self.db_updater.freshness.is_up_to_date(code, country):
+                    return
+            # 마지막으로 저장된 봉 이후 구간만 받아옵니다. (저장된 데이터가 없으면 기본 구간)
+            with self.db_lock:
+                last_date = self.db_updater.get_last_bar_date(code)
+            # 미국 주식의 기본 구간은 period=1(최신 20일)입니다.
+            # 주 소스가 늦으면 보조 소스에 헤지 요청을 보내 먼저 도착한 응답을 사용하고,
+            # 같은 구간을 포함하는 요청(차트 클릭 직전의 update_stock_price 등)이 있으면 그 다운로드/저장을 함께 사용합니다.
+            df_new = self.db_updater.sync_daily_price(code, country, period=1, start_date=last_date, hedge=True)
 
-            # DBUpdater의 replace_into_db를 사용하여 DB에 저장합니다.
-            self.db_updater.replace_into_db(df_new, code)
+            if df_new is None:
+                print(f"'{code}'에 대한 새로운 시세 데이터가 없습니다.")
 
         except Exception as e:
             print(f"'{code}'의 최신 시세 업데이트 중 오류 발생: {e}")
@@ -142,7 +145,7 @@ class DataManager:
 
     def stop_update(self):
         """시세 업데이트 중지"""
-        self.db_updater.run_update = False
+        self.db_updater.stop_update()
 
     def update_specific_stock(self, company):
         """특정 종목 또는 전체 DB를 업데이트합니다."""
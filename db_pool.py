@@ -0,0 +1,258 @@
+import contextlib
+import os
+import sqlite3
+import threading
+import time
+
+# 연결 종류(lane)별 최대 연결 수. 연결 프로파일 이름을 lane으로 사용하며,
+# 조회용(read)과 저장용(ingest/legacy 등 그 외 프로파일) 연결은 서로 다른 lane에서 따로 제한됩니다.
+POOL_SIZES = {
+    'read': int(os.environ.get('STOCK_DB_READ_POOL', 8)),
+}
+DEFAULT_POOL_SIZE = int(os.environ.get('STOCK_DB_WRITE_POOL', 8))
+# 빈 연결을 기다리는 최대 시간(초). 넘으면 PoolTimeout을 발생시킵니다.
+CHECKOUT_TIMEOUT = 30.0
+# 이 시간(초) 이상 쉬고 있던 연결은 꺼내기 전에 SELECT 1로 상태를 확인합니다.
+HEALTH_CHECK_IDLE = 30.0
+
+
+class PoolTimeout(sqlite3.OperationalError):
+    """CHECKOUT_TIMEOUT 안에 빈 연결을 얻지 못했습니다."""
+
+
+class _Entry:
+    """ 풀이 관리하는 연결 하나와 상태 (lane, 생성 세대, 빌려 간 스레드, 마지막 반납 시각) """
+    def __init__(self, conn, lane, epoch):
+        self.conn = conn
+        self.lane = lane
+        self.epoch = epoch
+        self.owner = None
+        self.returned_at = time.monotonic()
+
+
+class ConnectionPool:
+    """
+    SQLite 파일 하나에 대한 프로세스 공용 연결 풀.
+    connect(lane)으로 연결을 만들고, lane별로 최대 연결 수를 넘지 않도록 빌려주고(checkout) 돌려받습니다(checkin).
+    - 스레드 임대: acquire(lane)는 현재 스레드에 연결을 묶어 release()나 스레드 종료 때까지 재사용합니다.
+      같은 스레드의 DBUpdater/MarketDB 인스턴스는 같은 연결을 공유하며,
+      반납하지 않고 끝난 스레드(예: ThreadPoolExecutor 작업 스레드)의 연결은 자리가 부족할 때 회수합니다.
+    - 범위 임대: lease(lane)는 with 블록 동안만 빌려 쓰고 바로 반납합니다. (이미 스레드에 묶인 연결이 있으면 그 연결 사용)
+    - 상태 확인: 반납 시 열린 트랜잭션은 롤백하고, 오래 쉰 연결은 꺼낼 때 SELECT 1로 확인하여 실패하면 새로 만듭니다.
+    - invalidate(): 스키마(ATTACH/임시 뷰 등)가 바뀌었을 때 쉬고 있는 연결을 닫고 사용 중인 연결은 반납 시 닫습니다.
+    """
+    def __init__(self, name, connect, sizes=None, timeout=CHECKOUT_TIMEOUT):
+        self.name = name
+        self.connect = connect
+        self.sizes = dict(POOL_SIZES, **(sizes or {}))
+        self.timeout = timeout
+        self.cond = threading.Condition()
+        self.idle = {}          # lane -> [_Entry]
+        self.in_use = {}        # id(conn) -> _Entry
+        self.open = {}          # lane -> 열린 연결 수
+        self.epoch = 0
+        self.local = threading.local()
+        self.stats = {}
+
+    def _size(self, lane):
+        return self.sizes.get(lane, DEFAULT_POOL_SIZE)
+
+    def _lane_stats(self, lane):
+        if lane not in self.stats:
+            self.stats[lane] = {'checkouts': 0, 'created': 0, 'waits': 0, 'wait_sec': 0.0, 'max_wait_sec': 0.0,
+                                'timeouts': 0, 'reclaimed': 0, 'discarded': 0}
+        return self.stats[lane]
+
+    def _reclaim_dead_owners(self, lane):
+        """빌려 간 스레드가 이미 끝난 연결을 회수합니다. (cond 잠금 안에서 호출)"""
+        for entry in list(self.in_use.values()):
+            if entry.lane == lane and entry.owner is not None and not entry.owner.is_alive():
+                del self.in_use[id(entry.conn)]
+                self._lane_stats(lane)['reclaimed'] += 1
+                self._put_back(entry)
+
+    def _put_back(self, entry):
+        """반납된 연결을 정리해 쉬는 목록에 넣거나, 세대가 지났거나 상태가 나쁘면 닫습니다. (cond 잠금 안에서 호출)"""
+        entry.owner = None
+        try:
+            if entry.conn.in_transaction:
+                entry.conn.rollback()
+            healthy = entry.epoch == self.epoch
+        except sqlite3.Error:
+            healthy = False
+        if healthy:
+            entry.returned_at = time.monotonic()
+            self.idle.setdefault(entry.lane, []).append(entry)
+        else:
+            self._discard(entry)
+        self.cond.notify()
+
+    def _discard(self, entry):
+        self.open[entry.lane] -= 1
+        self._lane_stats(entry.lane)['discarded'] += 1
+        try:
+            entry.conn.close()
+        except sqlite3.Error:
+            pass
+
+    def _healthy(self, entry):
+        if time.monotonic() - entry.returned_at < HEALTH_CHECK_IDLE:
+            return True
+        try:
+            entry.conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def checkout(self, lane):
+        """lane의 연결을 하나 빌립니다. 최대 연결 수에 도달했으면 반납될 때까지 기다립니다."""
+        started = time.monotonic()
+        waited = False
+        with self.cond:
+            stats = self._lane_stats(lane)
+            while True:
+                idle = self.idle.get(lane)
+                while idle:
+                    entry = idle.pop()
+                    if self._healthy(entry):
+                        break
+                    self._discard(entry)
+                    entry = None
+                else:
+                    entry = None
+                if entry is None and self.open.get(lane, 0) < self._size(lane):
+                    self.open[lane] = self.open.get(lane, 0) + 1
+                    try:
+                        entry = _Entry(self.connect(lane), lane, self.epoch)
+                    except Exception:
+                        self.open[lane] -= 1
+                        raise
+                    stats['created'] += 1
+                if entry is not None:
+                    break
+
+                self._reclaim_dead_owners(lane)
+                if self.idle.get(lane):
+                    continue
+                remaining = self.timeout - (time.monotonic() - started)
+                if remaining <= 0:
+                    stats['timeouts'] += 1
+                    raise PoolTimeout(f"[{self.name}] {lane} 연결을 {self.timeout:.0f}초 안에 얻지 못했습니다. "
+                                      f"(최대 {self._size(lane)}개 사용 중)")
+                waited = True
+                self.cond.wait(remaining)
+
+            entry.owner = threading.current_thread()
+            self.in_use[id(entry.conn)] = entry
+            stats['checkouts'] += 1
+            if waited:
+                wait = time.monotonic() - started
+                stats['waits'] += 1
+                stats['wait_sec'] += wait
+                stats['max_wait_sec'] = max(stats['max_wait_sec'], wait)
+        return entry.conn
+
+    def checkin(self, conn):
+        """빌린 연결을 반납합니다."""
+        with self.cond:
+            entry = self.in_use.pop(id(conn), None)
+            if entry is not None:
+                self._put_back(entry)
+
+    def _bound(self):
+        if not hasattr(self.local, 'conns'):
+            self.local.conns = {}
+        return self.local.conns
+
+    def acquire(self, lane):
+        """현재 스레드에 묶인 lane 연결 (없으면 빌려서 묶음). release() 전까지 같은 연결을 반환합니다."""
+        bound = self._bound()
+        if lane not in bound:
+            bound[lane] = self.checkout(lane)
+        return bound[lane]
+
+    def release(self, lane=None):
+        """현재 스레드에 묶인 연결(lane이 없으면 전부)을 반납합니다."""
+        bound = self._bound()
+        for name in ([lane] if lane is not None else list(bound)):
+            conn = bound.pop(name, None)
+            if conn is not None:
+                self.checkin(conn)
+
+    @contextlib.contextmanager
+    def lease(self, lane):
+        """with 블록 동안만 연결을 빌립니다. 스레드에 이미 묶인 연결이 있으면 그 연결을 그대로 사용합니다."""
+        bound = self._bound()
+        if lane in bound:
+            yield bound[lane]
+            return
+        conn = self.checkout(lane)
+        bound[lane] = conn
+        try:
+            yield conn
+        finally:
+            bound.pop(lane, None)
+            self.checkin(conn)
+
+    def invalidate(self):
+        """쉬고 있는 연결을 닫고, 사용 중인 연결은 반납될 때 닫도록 세대를 올립니다."""
+        with self.cond:
+            self.epoch += 1
+            for entries in self.idle.values():
+                for entry in entries:
+                    self._discard(entry)
+            self.idle = {}
+
+    def close_all(self):
+        """쉬고 있는 연결을 모두 닫습니다. (사용 중인 연결은 반납 시 닫힘)"""
+        self.invalidate()
+
+    def pool_stats(self):
+        """lane별 열린/사용 중/쉬는 연결 수와 대여, 생성, 대기(횟수/누적/최대 초), 시간 초과, 회수, 폐기 횟수"""
+        with self.cond:
+            result = {}
+            for lane in set(self.stats) | set(self.open):
+                in_use = sum(1 for entry in self.in_use.values() if entry.lane == lane)
+                result[lane] = dict(self._lane_stats(lane), open=self.open.get(lane, 0), in_use=in_use,
+                                    idle=len(self.idle.get(lane, ())), size=self._size(lane))
+            return result
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_connection_pool(key, connect, sizes=None, name=None):
+    """
+    key(파일 경로 등)별로 프로세스 전체에서 공유하는 ConnectionPool을 반환합니다.
+    connect는 처음 만들 때만 사용하므로 같은 key에는 같은 방식으로 연결하는 함수를 넘겨야 합니다.
+    """
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = ConnectionPool(name or str(key), connect, sizes)
+        return _pools[key]
+
+
+def release_thread_connections():
+    """현재 스레드에 묶인 모든 풀의 연결을 반납합니다. (재사용되는 작업 스레드가 작업을 마칠 때 호출)"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    for pool in pools:
+        pool.release()
+
+
+def pool_stats():
+    """{풀 이름: {lane: 통계}}"""
+    with _pools_lock:
+        pools = list(_pools.values())
+    return {pool.name: pool.pool_stats() for pool in pools}
+
+
+def print_pool_stats():
+    for name, lanes in sorted(pool_stats().items()):
+        for lane, s in sorted(lanes.items()):
+            avg_wait = s['wait_sec'] / s['waits'] if s['waits'] else 0.0
+            print(f"[DB 풀] {name} {lane}: 열림 {s['open']}/{s['size']} "
+                  f"(사용 중 {s['in_use']}, 유휴 {s['idle']}), 대여 {s['checkouts']}회, 생성 {s['created']}회, "
+                  f"대기 {s['waits']}회(평균 {avg_wait:.3f}s, 최대 {s['max_wait_sec']:.3f}s), "
+                  f"시간 초과 {s['timeouts']}회, 회수 {s['reclaimed']}개, 폐기 {s['discarded']}개")
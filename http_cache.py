@@ -0,0 +1,234 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+# 캐시 디렉터리와 전체 용량 상한. 상대 경로는 ResponseCache를 만들 때 base_dir 기준으로 해석하며,
+# DBUpdater_new는 configure_response_cache(base_dir=DB_DIR)로 DB 폴더를 기준으로 지정합니다.
+DEFAULT_CACHE_DIR = os.environ.get('STOCK_HTTP_CACHE_DIR', 'http_cache')
+DEFAULT_MAX_BYTES = 200 * 1024 * 1024
+
+# 소스별 캐시 유효 기간(초). 유효 기간이 지나면 ETag/Last-Modified가 있으면 조건부 요청으로 재검증합니다.
+SOURCE_TTLS = {
+    'wikipedia': 24 * 3600,         # S&P 500 구성 종목
+    'fdr_listing': 24 * 3600,       # FinanceDataReader 거래소 종목 목록
+    'naver_sector': 24 * 3600,      # 네이버 업종 목록/업종별 구성 종목 페이지
+}
+DEFAULT_TTL = 3600
+
+
+class CachedResponse:
+    """ 캐시에서 꺼낸 응답. 호출하는 쪽에서 requests.Response처럼 content/text를 사용합니다. """
+    def __init__(self, content, encoding, status_code=200, from_cache=True):
+        self.content = content
+        self.encoding = encoding or 'utf-8'
+        self.status_code = status_code
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors='replace')
+
+
+class ResponseCache:
+    """
+    느리게 변하는 소스(종목 목록, 업종 페이지 등)의 응답을 디스크에 보관하는 캐시.
+    본문은 키별 파일로, 메타데이터(ETag, Last-Modified, 수집/접근 시각, 크기)는 index.db에 저장합니다.
+    - 소스별 TTL 이내: 네트워크 요청 없이 캐시 사용 (hit)
+    - TTL 경과 + 검증자 있음: If-None-Match/If-Modified-Since 조건부 요청, 304면 캐시 재사용 (revalidated)
+    - 그 외: 새로 받아 저장 (miss). 전체 용량이 max_bytes를 넘으면 가장 오래 사용하지 않은 항목부터 삭제 (LRU)
+    """
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, ttls=None, base_dir=None):
+        self.cache_dir = os.path.abspath(os.path.join(base_dir or os.getcwd(), cache_dir))
+        self.max_bytes = max_bytes
+        self.ttls = dict(SOURCE_TTLS, **(ttls or {}))
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(os.path.join(self.cache_dir, 'index.db'), check_same_thread=False)
+        self.conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY, source TEXT, etag TEXT, last_modified TEXT, encoding TEXT,
+                fetched_at REAL, accessed_at REAL, size INTEGER
+            )""")
+        self.conn.commit()
+        self.stats = {'hits': 0, 'revalidated': 0, 'misses': 0, 'errors': 0, 'evictions': 0, 'bytes_saved': 0}
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+    def _ttl(self, source):
+        return self.ttls.get(source, DEFAULT_TTL)
+
+    def _lookup(self, key):
+        """(메타데이터 dict, 본문 bytes)를 반환합니다. 없거나 본문 파일이 사라졌으면 (None, None)."""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT etag, last_modified, encoding, fetched_at FROM entries WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None, None
+        try:
+            with open(self._path(key), 'rb') as f:
+                body = f.read()
+        except OSError:
+            return None, None
+        return dict(zip(('etag', 'last_modified', 'encoding', 'fetched_at'), row)), body
+
+    def _touch(self, key, fetched=False):
+        now = time.time()
+        with self.lock:
+            if fetched:
+                self.conn.execute("UPDATE entries SET fetched_at = ?, accessed_at = ? WHERE key = ?", (now, now, key))
+            else:
+                self.conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self.conn.commit()
+
+    def _store(self, key, source, body, etag=None, last_modified=None, encoding=None):
+        with open(self._path(key), 'wb') as f:
+            f.write(body)
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "REPLACE INTO entries (key, source, etag, last_modified, encoding, fetched_at, accessed_at, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, source, etag, last_modified, encoding, now, now, len(body)))
+            self.conn.commit()
+        self._evict()
+
+    def _evict(self):
+        """전체 크기가 max_bytes 이하가 될 때까지 마지막 접근 시각이 오래된 항목부터 삭제합니다."""
+        with self.lock:
+            total = self.conn.execute("SELECT coalesce(sum(size), 0) FROM entries").fetchone()[0]
+            if total <= self.max_bytes:
+                return
+            victims = []
+            for key, size in self.conn.execute("SELECT key, size FROM entries ORDER BY accessed_at"):
+                if total <= self.max_bytes:
+                    break
+                victims.append(key)
+                total -= size
+            self.conn.executemany("DELETE FROM entries WHERE key = ?", [(key,) for key in victims])
+            self.conn.commit()
+            self.stats['evictions'] += len(victims)
+        for key in victims:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+    def _count(self, name, n_bytes=0):
+        with self.lock:
+            self.stats[name] += 1
+            self.stats['bytes_saved'] += n_bytes
+
+    def get(self, http, url, source, force=False, **kwargs):
+        """
+        HttpClient로 url을 요청하되 캐시를 우선 사용합니다. 반환값은 content/text를 가진 응답 객체입니다.
+        force=True이면 TTL과 상관없이 서버에 다시 요청합니다. (검증자가 있으면 조건부 요청)
+        요청이 실패하면 만료된 캐시라도 있으면 그 내용을 대신 반환합니다.
+        """
+        meta, body = self._lookup(url)
+        if not force and meta is not None and time.time() - meta['fetched_at'] < self._ttl(source):
+            self._touch(url)
+            self._count('hits', len(body))
+            return CachedResponse(body, meta['encoding'])
+
+        headers = dict(kwargs.pop('headers', None) or {})
+        if meta is not None:
+            if meta['etag']:
+                headers['If-None-Match'] = meta['etag']
+            if meta['last_modified']:
+                headers['If-Modified-Since'] = meta['last_modified']
+
+        try:
+            response = http.get(url, headers=headers, **kwargs)
+        except Exception:
+            if meta is None:
+                raise
+            response = None
+
+        if response is not None and response.status_code == 304 and meta is not None:
+            self._touch(url, fetched=True)
+            self._count('revalidated', len(body))
+            return CachedResponse(body, meta['encoding'])
+        if response is None or response.status_code != 200:
+            if meta is not None:
+                self._count('errors')
+                return CachedResponse(body, meta['encoding'])
+            return response
+
+        self._store(url, source, response.content, etag=response.headers.get('ETag'),
+                    last_modified=response.headers.get('Last-Modified'), encoding=response.encoding)
+        self._count('misses')
+        return response
+
+    def get_object(self, key, source, loader):
+        """
+        HTTP가 아닌 소스(FinanceDataReader 종목 목록 등)의 결과 객체를 pickle로 캐시합니다.
+        검증자가 없으므로 TTL만 사용하며, loader()가 실패하면 만료된 캐시라도 반환합니다.
+        """
+        meta, body = self._lookup(key)
+        if meta is not None and time.time() - meta['fetched_at'] < self._ttl(source):
+            self._touch(key)
+            self._count('hits', len(body))
+            return pickle.loads(body)
+        try:
+            value = loader()
+        except Exception:
+            if meta is None:
+                raise
+            self._count('errors')
+            return pickle.loads(body)
+        self._store(key, source, pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        self._count('misses')
+        return value
+
+    def cache_stats(self):
+        """적중/재검증/미스/오류 대체/삭제 횟수, 절약한 바이트 수, 현재 항목 수와 크기를 반환합니다."""
+        with self.lock:
+            entries, size = self.conn.execute("SELECT count(*), coalesce(sum(size), 0) FROM entries").fetchone()
+            return dict(self.stats, entries=entries, size=size)
+
+    def print_cache_stats(self):
+        stats = self.cache_stats()
+        print(f"[캐시] 적중 {stats['hits']}회, 재검증(304) {stats['revalidated']}회, 미스 {stats['misses']}회, "
+              f"오류 시 대체 {stats['errors']}회, 삭제 {stats['evictions']}개, "
+              f"절약 {stats['bytes_saved'] / 1024:,.0f}KB, 보관 {stats['entries']}개 {stats['size'] / 1024:,.0f}KB")
+
+    def clear(self):
+        with self.lock:
+            keys = [row[0] for row in self.conn.execute("SELECT key FROM entries")]
+            self.conn.execute("DELETE FROM entries")
+            self.conn.commit()
+        for key in keys:
+            try:
+                os.remove(self._path(key))
+            except OSError:
+                pass
+
+
+_cache = None
+_cache_options = {}
+_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """프로세스 전체에서 공유하는 ResponseCache를 반환합니다. (최초 호출 시 생성)"""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = ResponseCache(**_cache_options)
+        return _cache
+
+
+def configure_response_cache(**kwargs):
+    """
+    공유 ResponseCache의 설정(cache_dir, max_bytes, ttls, base_dir)을 바꿉니다.
+    캐시는 다음 get_response_cache() 호출 때 새 설정으로 만들므로 모듈을 불러올 때 호출해도 파일을 만들지 않습니다.
+    """
+    global _cache
+    with _cache_lock:
+        _cache_options.update(kwargs)
+        _cache = None
@@ -0,0 +1,261 @@
+import random
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from http_cache import get_response_cache
+from job_scheduler import current_priority, current_token
+
+# 모든 스크래퍼가 공통으로 사용하는 기본 헤더 (gzip 압축 응답 허용)
+DEFAULT_HEADERS = {
+    'User-agent': 'Mozilla/5.0',
+    'Accept-Encoding': 'gzip, deflate',
+    'Connection': 'keep-alive',
+}
+
+# 호스트 풀 개수, 호스트당 최대 연결 수, (연결, 읽기) 타임아웃(초)
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 50
+DEFAULT_TIMEOUT = (5, 20)
+
+# 실패(연결 오류, 429, 5xx) 시 재시도 횟수와 지수 백오프 기준/상한(초)
+DEFAULT_RETRIES = 3
+BACKOFF_BASE = 0.5
+BACKOFF_CAP = 15.0
+
+# 호스트별 초당 요청 수와 버스트 크기 (토큰 버킷). 목록에 없는 호스트는 제한하지 않습니다.
+HOST_RATE_LIMITS = {
+    'api.finance.naver.com': (20, 40),
+    'finance.naver.com': (10, 20),
+}
+
+# 호스트별 동시 요청 수 AIMD 제어 (초기값, 최소, 최대, 지연 목표(초))
+CONCURRENCY_INITIAL = 8
+CONCURRENCY_MIN = 2
+CONCURRENCY_MAX = 50
+LATENCY_TARGET = 2.0
+
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_CAP):
+    """지터를 섞은 지수 백오프 대기 시간 (full jitter: 0 ~ min(cap, base * 2^attempt))"""
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class TokenBucket:
+    """ 초당 rate개의 토큰이 burst개까지 쌓이는 토큰 버킷. acquire()는 토큰이 생길 때까지 기다립니다. """
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class AdaptiveConcurrency:
+    """
+    AIMD 방식으로 동시 요청 수를 조절하는 리미터.
+    성공하고 지연이 목표 이하이면 한도를 조금씩(1/limit) 늘리고,
+    오류/스로틀링/지연 초과가 발생하면 한도를 절반으로 줄입니다. (감소는 1초에 한 번까지)
+    한도가 찼을 때는 더 급한 lane(job_scheduler 우선순위)의 대기 요청부터 내보냅니다.
+    """
+    def __init__(self, initial=CONCURRENCY_INITIAL, minimum=CONCURRENCY_MIN, maximum=CONCURRENCY_MAX,
+                 latency_target=LATENCY_TARGET):
+        self.limit = float(initial)
+        self.minimum = minimum
+        self.maximum = maximum
+        self.latency_target = latency_target
+        self.in_flight = 0
+        self.last_decrease = 0.0
+        self.waiting = {}   # lane -> 대기 중인 요청 수
+        self.cond = threading.Condition()
+
+    def acquire(self, priority=0):
+        with self.cond:
+            self.waiting[priority] = self.waiting.get(priority, 0) + 1
+            try:
+                while self.in_flight >= int(self.limit) or any(
+                        count and lane < priority for lane, count in self.waiting.items()):
+                    self.cond.wait()
+            finally:
+                self.waiting[priority] -= 1
+                self.cond.notify_all()
+            self.in_flight += 1
+
+    def release(self, ok, latency, adjust=True):
+        """adjust=False이면 결과를 쓰지 않는 요청(취소된 헤지 요청 등)이므로 동시성 한도를 조정하지 않습니다."""
+        with self.cond:
+            self.in_flight -= 1
+            if adjust and ok and latency <= self.latency_target:
+                self.limit = min(self.maximum, self.limit + 1 / self.limit)
+            elif adjust and time.monotonic() - self.last_decrease >= 1.0:
+                self.limit = max(self.minimum, self.limit / 2)
+                self.last_decrease = time.monotonic()
+            self.cond.notify_all()
+
+
+class HttpClient:
+    """
+    호스트별 keep-alive 연결 풀을 공유하는 HTTP 클라이언트.
+    하나의 requests.Session을 여러 스레드가 함께 사용하여 종목/페이지마다
+    TCP+TLS 핸드셰이크를 새로 하지 않도록 하고, 호스트별 연결 재사용 통계를 제공합니다.
+    """
+    def __init__(self, pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 timeout=DEFAULT_TIMEOUT, headers=None):
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.headers.update(DEFAULT_HEADERS)
+        if headers:
+            self.session.headers.update(headers)
+
+        self.adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.session.mount('https://', self.adapter)
+        self.session.mount('http://', self.adapter)
+
+        self.stats_lock = threading.Lock()
+        self.host_stats = {}
+        self.buckets = {host: TokenBucket(rate, burst) for host, (rate, burst) in HOST_RATE_LIMITS.items()}
+        self.limiters = {}
+
+    def limiter(self, host):
+        """호스트별 AdaptiveConcurrency 리미터를 반환합니다. (없으면 생성)"""
+        with self.stats_lock:
+            if host not in self.limiters:
+                self.limiters[host] = AdaptiveConcurrency()
+            return self.limiters[host]
+
+    def get(self, url, retries=DEFAULT_RETRIES, **kwargs):
+        """
+        공유 세션으로 GET 요청을 보냅니다. timeout을 지정하지 않으면 기본 타임아웃을 사용합니다.
+        호스트별 토큰 버킷과 적응형 동시성 한도를 지키며, 연결 오류/429/5xx는
+        지터를 섞은 지수 백오프로 retries회까지 재시도합니다.
+        스케줄러 작업 안에서 호출하면 작업이 취소되었을 때 요청 전에 JobCancelled를 발생시킵니다.
+        """
+        kwargs.setdefault('timeout', self.timeout)
+        host = urlsplit(url).netloc
+        bucket = self.buckets.get(host)
+        limiter = self.limiter(host)
+        token = current_token()
+        priority = current_priority()
+
+        for attempt in range(retries + 1):
+            token.raise_if_cancelled()
+            if bucket is not None:
+                bucket.acquire()
+            limiter.acquire(priority)
+            start = time.monotonic()
+            response, error = None, None
+            try:
+                response = self.session.get(url, **kwargs)
+            except requests.RequestException as e:
+                error = e
+            finally:
+                throttled = response is None or response.status_code == 429 or response.status_code >= 500
+                # 요청 중에 작업이 취소되었으면(헤지 요청에서 진 쪽 등) 결과를 쓰지 않으므로 한도 조정에 반영하지 않습니다.
+                limiter.release(not throttled, time.monotonic() - start, adjust=not token.cancelled)
+
+            if not throttled:
+                self._record(host, n_bytes=len(response.content), retried=attempt > 0)
+                return response
+            self._record(host, error=True, retried=attempt > 0)
+            if attempt < retries and not token.cancelled:
+                time.sleep(self._retry_after(response) or backoff_delay(attempt))
+
+        if error is not None:
+            raise error
+        return response
+
+    def get_cached(self, url, source, force=False, **kwargs):
+        """
+        느리게 변하는 소스용 GET. 디스크 응답 캐시(http_cache)를 거쳐 소스별 TTL 이내면 캐시를 사용하고,
+        만료되었거나 force=True이면 ETag/Last-Modified로 재검증합니다.
+        """
+        return get_response_cache().get(self, url, source, force=force, **kwargs)
+
+    @staticmethod
+    def _retry_after(response):
+        """서버가 Retry-After(초)를 보냈으면 그 값을 사용합니다."""
+        if response is None:
+            return None
+        try:
+            return min(float(response.headers.get('Retry-After')), BACKOFF_CAP)
+        except (TypeError, ValueError):
+            return None
+
+    def _record(self, host, n_bytes=0, error=False, retried=False):
+        with self.stats_lock:
+            stats = self.host_stats.setdefault(host, {'requests': 0, 'errors': 0, 'retries': 0, 'bytes': 0})
+            stats['requests'] += 1
+            stats['bytes'] += n_bytes
+            if error:
+                stats['errors'] += 1
+            if retried:
+                stats['retries'] += 1
+
+    def connection_stats(self):
+        """
+        호스트별 요청 수, 새로 연 연결(핸드셰이크) 수, 연결 재사용률을 반환합니다.
+        연결 수는 urllib3 연결 풀의 카운터를 그대로 사용합니다.
+        """
+        pools = self.adapter.poolmanager.pools
+        with self.stats_lock:
+            result = {host: dict(stats, connections=0) for host, stats in self.host_stats.items()}
+            for host, limiter in self.limiters.items():
+                if host in result:
+                    result[host]['concurrency'] = int(limiter.limit)
+        for key in list(pools.keys()):
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            host = pool.host if pool.port in (None, 80, 443) else f"{pool.host}:{pool.port}"
+            stats = result.setdefault(host, {'requests': 0, 'errors': 0, 'retries': 0, 'bytes': 0, 'connections': 0})
+            stats['connections'] += pool.num_connections
+        for stats in result.values():
+            stats['reuse_ratio'] = 1 - stats['connections'] / stats['requests'] if stats['requests'] else 0.0
+        return result
+
+    def print_connection_stats(self):
+        for host, stats in sorted(self.connection_stats().items()):
+            print(f"[HTTP] {host}: 요청 {stats['requests']}회, 새 연결 {stats['connections']}개, "
+                  f"재사용률 {stats['reuse_ratio']:.0%}, 오류 {stats['errors']}회, 재시도 {stats['retries']}회, "
+                  f"동시성 한도 {stats.get('concurrency', '-')}, {stats['bytes'] / 1024:,.0f}KB")
+
+    def close(self):
+        self.session.close()
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_http_client():
+    """프로세스 전체에서 공유하는 HttpClient를 반환합니다. (최초 호출 시 생성)"""
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = HttpClient()
+        return _client
+
+
+def configure_http_client(**kwargs):
+    """공유 HttpClient를 주어진 설정(pool_connections, pool_maxsize, timeout, headers)으로 다시 만듭니다."""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+        _client = HttpClient(**kwargs)
+        return _client
@@ -0,0 +1,335 @@
+import concurrent.futures
+import contextlib
+import heapq
+import itertools
+import threading
+import time
+
+from db_pool import release_thread_connections
+
+# 작업 우선순위(lane). 숫자가 작을수록 먼저 실행됩니다.
+PRIORITY_INTERACTIVE = 0    # 사용자가 기다리는 단건 조회 (차트 클릭 등)
+PRIORITY_WATCHLIST = 1      # 보유/관심/포트폴리오 종목 갱신
+PRIORITY_BULK = 2           # 전체 시세 업데이트, 백필
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: 'interactive', PRIORITY_WATCHLIST: 'watchlist', PRIORITY_BULK: 'bulk'}
+
+# 작업 스레드 수 상한. interactive가 아닌 작업은 RESERVED_WORKERS개를 남겨 두어
+# 일괄 업데이트가 스레드를 모두 차지하고 있어도 단건 조회가 곧바로 시작됩니다.
+RESERVED_WORKERS = 4
+SCHEDULER_WORKERS = 50 + RESERVED_WORKERS
+# 대화형 단건 조회의 기본 지연 예산(초). 대기열에서 예산을 넘기면 시작하지 않고 취소합니다.
+INTERACTIVE_BUDGET = 20.0
+# 실행 조건을 기다리는 작업 스레드가 취소/예산 초과 작업을 다시 확인하는 간격(초)
+DISPATCH_POLL = 0.5
+
+
+class JobCancelled(concurrent.futures.CancelledError):
+    """작업이 취소되었거나 지연 예산을 넘겼습니다."""
+
+
+class CancelToken:
+    """
+    작업 취소 토큰. cancel()을 호출하거나 budget(초)이 지나거나 parent 토큰이 취소되면 cancelled가 True가 됩니다.
+    작업 함수는 반복문/요청 사이에 cancelled나 raise_if_cancelled()로 확인하여 스스로 멈추고,
+    remaining()으로 남은 예산을 네트워크 요청 제한 시간으로 사용합니다.
+    """
+    def __init__(self, budget=None, parent=None):
+        self.deadline = time.monotonic() + budget if budget is not None else None
+        self.parent = parent
+        self.event = threading.Event()
+        self.reason = None
+
+    def cancel(self, reason='cancelled'):
+        if not self.event.is_set():
+            self.reason = reason
+            self.event.set()
+
+    @property
+    def cancelled(self):
+        if self.event.is_set():
+            return True
+        if self.deadline is not None and time.monotonic() >= self.deadline:
+            self.cancel('expired')
+            return True
+        if self.parent is not None and self.parent.cancelled:
+            self.cancel(self.parent.reason)
+            return True
+        return False
+
+    def remaining(self, default=None):
+        """남은 예산(초). 예산이 없으면 default, 있으면 default와 남은 예산 중 작은 값"""
+        left = default
+        if self.parent is not None:
+            left = self.parent.remaining(left)
+        if self.deadline is not None:
+            own = max(0.0, self.deadline - time.monotonic())
+            left = own if left is None else min(left, own)
+        return left
+
+    def raise_if_cancelled(self):
+        if self.cancelled:
+            raise JobCancelled(self.reason)
+
+
+class _NullToken(CancelToken):
+    """스케줄러 작업 밖에서 사용하는 취소되지 않는 토큰"""
+    def cancel(self, reason='cancelled'):
+        pass
+
+
+_NULL_TOKEN = _NullToken()
+_local = threading.local()
+
+
+def current_token():
+    """현재 스레드에서 실행 중인 작업의 취소 토큰 (작업 밖이면 취소되지 않는 토큰)"""
+    return getattr(_local, 'token', None) or _NULL_TOKEN
+
+
+def current_priority(default=PRIORITY_BULK):
+    """현재 스레드에서 실행 중인 작업의 lane (작업 밖이면 default)"""
+    priority = getattr(_local, 'priority', None)
+    return default if priority is None else priority
+
+
+@contextlib.contextmanager
+def _job_context(token, priority):
+    saved = (getattr(_local, 'token', None), getattr(_local, 'priority', None))
+    _local.token, _local.priority = token, priority
+    try:
+        yield
+    finally:
+        _local.token, _local.priority = saved
+
+
+def bind_context(fn, token=None):
+    """
+    현재 스레드의 작업 컨텍스트(취소 토큰, lane)를 다른 스레드 풀에서 실행할 fn에 이어 줍니다.
+    token을 주면 현재 토큰 대신 그 토큰을 사용합니다. (현재 작업의 자식 토큰으로 일부 요청만 취소할 때)
+    """
+    token, priority = token or getattr(_local, 'token', None), getattr(_local, 'priority', None)
+
+    def run(*args, **kwargs):
+        with _job_context(token, priority):
+            return fn(*args, **kwargs)
+    return run
+
+
+class _Job:
+    __slots__ = ('priority', 'seq', 'fn', 'args', 'kwargs', 'token', 'future', 'queued_at')
+
+    def __init__(self, priority, seq, fn, args, kwargs, token):
+        self.priority = priority
+        self.seq = seq
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.token = token
+        self.future = concurrent.futures.Future()
+        self.queued_at = time.monotonic()
+
+    def __lt__(self, other):
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class JobScheduler:
+    """
+    우선순위 lane을 가진 프로세스 공용 작업 스케줄러.
+    - 대기열은 (lane, 제출 순서) 순으로 꺼내므로 interactive 작업은 쌓여 있는 bulk 작업보다 먼저 시작합니다.
+    - 더 급한 lane의 작업이 실행 중이면 덜 급한 lane의 새 작업은 시작하지 않고 기다립니다.
+      (실행 중인 작업은 끝까지 실행하며, 네트워크 요청도 http_client가 급한 lane부터 내보냅니다)
+    - interactive가 아닌 작업은 스레드를 RESERVED_WORKERS개 남기고 사용합니다.
+    - 작업마다 CancelToken을 받아 cancel(lane)이나 예산 초과 시 대기 중인 작업은 버리고
+      실행 중인 작업은 current_token()으로 취소를 확인해 멈추게 합니다.
+    submit()은 concurrent.futures.Future를 반환하며, 작업이 끝나면 작업 스레드에 묶인 DB 연결을 풀에 반납합니다.
+    """
+    def __init__(self, workers=SCHEDULER_WORKERS, reserved=RESERVED_WORKERS):
+        self.workers = workers
+        self.reserved = reserved
+        self.cond = threading.Condition()
+        self.queue = []
+        self.seq = itertools.count()
+        self.threads = []
+        self.idle = 0
+        self.running = {}       # lane -> 실행 중인 작업 수
+        self.in_flight = set()  # 실행 중인 _Job
+        self.scopes = []        # [(lane, CancelToken)] scope()로 열린 토큰
+        self.stats = {}
+
+    def _lane_stats(self, priority):
+        if priority not in self.stats:
+            self.stats[priority] = {'submitted': 0, 'completed': 0, 'failed': 0, 'cancelled': 0, 'expired': 0,
+                                    'started': 0, 'wait_sec': 0.0, 'max_wait_sec': 0.0}
+        return self.stats[priority]
+
+    def submit(self, fn, *args, priority=PRIORITY_BULK, token=None, budget=None, **kwargs):
+        """
+        fn(*args, **kwargs)를 priority lane에 넣습니다. token이 없으면 budget(초) 예산의 새 토큰을 만듭니다.
+        반환값: Future (취소되거나 시작 전에 예산을 넘기면 result()가 CancelledError 발생)
+        """
+        token = token or CancelToken(budget)
+        with self.cond:
+            job = _Job(priority, next(self.seq), fn, args, kwargs, token)
+            heapq.heappush(self.queue, job)
+            self._lane_stats(priority)['submitted'] += 1
+            # 쉬고 있는 스레드보다 대기 작업이 많으면 상한까지 스레드를 더 띄웁니다.
+            # (idle == 0일 때만 늘리면 스레드 한두 개가 쉬고 있을 때 몰려 들어온 작업이 그 스레드로만 실행됩니다)
+            while len(self.queue) > self.idle and len(self.threads) < self.workers:
+                thread = threading.Thread(target=self._worker, name=f"job-{len(self.threads)}", daemon=True)
+                self.threads.append(thread)
+                thread.start()
+            self.cond.notify_all()
+        return job.future
+
+    def run(self, fn, *args, priority=PRIORITY_INTERACTIVE, budget=None, **kwargs):
+        """
+        fn을 priority lane 작업으로 실행하고 결과를 기다립니다.
+        이미 같거나 더 급한 lane의 작업 안에서 호출하면 대기열을 거치지 않고 바로 실행합니다.
+        """
+        if getattr(_local, 'priority', None) is not None and _local.priority <= priority:
+            return fn(*args, **kwargs)
+        token = CancelToken(budget, parent=getattr(_local, 'token', None))
+        return self.submit(fn, *args, priority=priority, token=token, **kwargs).result()
+
+    @contextlib.contextmanager
+    def scope(self, priority, budget=None):
+        """
+        priority lane에 속한 취소 토큰을 열고 현재 스레드의 작업 컨텍스트로 설정합니다.
+        여러 작업을 제출하고 기다리는 함수(일괄 업데이트 등)가 사용하며, cancel(priority)로 함께 취소됩니다.
+        """
+        token = CancelToken(budget, parent=getattr(_local, 'token', None))
+        entry = (priority, token)
+        with self.cond:
+            self.scopes.append(entry)
+        try:
+            with _job_context(token, priority):
+                yield token
+        finally:
+            with self.cond:
+                self.scopes.remove(entry)
+
+    def cancel(self, priority=None, reason='cancelled'):
+        """
+        priority lane(없으면 전체)의 대기 중/실행 중 작업과 열린 scope를 취소합니다.
+        대기 중인 작업은 바로 버리고, 실행 중인 작업은 다음 취소 확인 지점에서 멈춥니다. 반환값: 취소한 작업 수
+        """
+        with self.cond:
+            count = 0
+            for job in list(self.queue) + list(self.in_flight):
+                if priority is None or job.priority == priority:
+                    job.token.cancel(reason)
+                    count += 1
+            for lane, token in self.scopes:
+                if priority is None or lane == priority:
+                    token.cancel(reason)
+            self._purge()
+            self.cond.notify_all()
+        return count
+
+    def _drop(self, job):
+        """시작하지 않은 작업을 취소 처리합니다. (cond 잠금 안에서 호출)"""
+        stats = self._lane_stats(job.priority)
+        if job.future.cancel():
+            # wait()/as_completed()로 기다리는 쪽에 취소를 알립니다.
+            job.future.set_running_or_notify_cancel()
+            stats['expired' if job.token.reason == 'expired' else 'cancelled'] += 1
+
+    def _purge(self):
+        """대기열에서 취소된 작업을 모두 버립니다. (cond 잠금 안에서 호출)"""
+        kept = []
+        for job in self.queue:
+            if job.token.cancelled or job.future.cancelled():
+                self._drop(job)
+            else:
+                kept.append(job)
+        if len(kept) != len(self.queue):
+            heapq.heapify(kept)
+            self.queue = kept
+
+    def _can_start(self, priority):
+        if any(count and lane < priority for lane, count in self.running.items()):
+            return False
+        if priority > PRIORITY_INTERACTIVE:
+            busy = sum(count for lane, count in self.running.items() if lane > PRIORITY_INTERACTIVE)
+            if busy >= self.workers - self.reserved:
+                return False
+        return True
+
+    def _take(self):
+        """실행할 다음 작업을 꺼냅니다. 실행 조건이 될 때까지 기다립니다. (cond 잠금 안에서 호출)"""
+        while True:
+            while self.queue and (self.queue[0].token.cancelled or self.queue[0].future.cancelled()):
+                self._drop(heapq.heappop(self.queue))
+            if self.queue and self._can_start(self.queue[0].priority):
+                return heapq.heappop(self.queue)
+            self.idle += 1
+            self.cond.wait(DISPATCH_POLL if self.queue else None)
+            self.idle -= 1
+
+    def _worker(self):
+        while True:
+            with self.cond:
+                job = self._take()
+                if not job.future.set_running_or_notify_cancel():
+                    self._lane_stats(job.priority)['cancelled'] += 1
+                    continue
+                stats = self._lane_stats(job.priority)
+                wait = time.monotonic() - job.queued_at
+                stats['started'] += 1
+                stats['wait_sec'] += wait
+                stats['max_wait_sec'] = max(stats['max_wait_sec'], wait)
+                self.running[job.priority] = self.running.get(job.priority, 0) + 1
+                self.in_flight.add(job)
+
+            outcome = 'completed'
+            try:
+                with _job_context(job.token, job.priority):
+                    result = job.fn(*job.args, **job.kwargs)
+            except JobCancelled as e:
+                outcome = 'expired' if job.token.reason == 'expired' else 'cancelled'
+                job.future.set_exception(e)
+            except BaseException as e:
+                outcome = 'failed'
+                job.future.set_exception(e)
+            else:
+                job.future.set_result(result)
+            finally:
+                release_thread_connections()
+
+            with self.cond:
+                self.running[job.priority] -= 1
+                self.in_flight.discard(job)
+                stats[outcome] += 1
+                self.cond.notify_all()
+
+    def scheduler_stats(self):
+        """lane별 제출/완료/실패/취소/예산 초과 작업 수, 대기열 대기 시간(평균/최대 초), 대기 중/실행 중 작업 수"""
+        with self.cond:
+            result = {}
+            for priority in sorted(set(self.stats) | set(self.running)):
+                stats = dict(self._lane_stats(priority))
+                stats['avg_wait_sec'] = stats['wait_sec'] / stats['started'] if stats['started'] else 0.0
+                stats['queued'] = sum(1 for job in self.queue if job.priority == priority)
+                stats['running'] = self.running.get(priority, 0)
+                result[PRIORITY_NAMES.get(priority, str(priority))] = stats
+            return result
+
+    def print_scheduler_stats(self):
+        for name, s in self.scheduler_stats().items():
+            print(f"[스케줄러] {name}: 제출 {s['submitted']}개, 완료 {s['completed']}개, 실패 {s['failed']}개, "
+                  f"취소 {s['cancelled']}개, 예산 초과 {s['expired']}개, "
+                  f"대기 평균 {s['avg_wait_sec'] * 1000:.0f}ms/최대 {s['max_wait_sec'] * 1000:.0f}ms, "
+                  f"대기 중 {s['queued']}개, 실행 중 {s['running']}개")
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_job_scheduler():
+    """프로세스 전체에서 공유하는 JobScheduler를 반환합니다. (DBUpdater/MarketDB/UI가 같은 lane을 사용)"""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = JobScheduler()
+        return _scheduler
@@ -0,0 +1,94 @@
+import threading
+from datetime import datetime, timezone
+
+import pandas as pd
+import exchange_calendars as xcals
+
+# 국가별 거래소 캘린더 코드
+CALENDAR_CODES = {'kr': 'XKRX', 'us': 'XNYS'}
+
+# 장 마감 후 시세 제공처에 종가가 반영되기까지 기다리는 시간
+SETTLE_DELAY = pd.Timedelta(minutes=20)
+# 장중에는 이 시간 안에 받아온 종목은 다시 요청하지 않습니다.
+INTRADAY_TTL = pd.Timedelta(minutes=1)
+
+_calendars = {}
+_calendars_lock = threading.Lock()
+
+
+def get_calendar(country):
+    """국가 코드('kr', 'us')에 해당하는 exchange_calendars 캘린더를 반환합니다. (프로세스 내 캐시)"""
+    with _calendars_lock:
+        if country not in _calendars:
+            _calendars[country] = xcals.get_calendar(CALENDAR_CODES[country])
+        return _calendars[country]
+
+
+def utc_now():
+    return pd.Timestamp.now(tz='UTC')
+
+
+def sync_timestamp():
+    """price_sync 테이블에 기록하는 UTC 시각 문자열"""
+    return datetime.now(timezone.utc).isoformat(timespec='seconds')
+
+
+class FreshnessOracle:
+    """
+    XKRX/XNYS 캘린더로 국가별 최신 완료 세션을 계산하고,
+    네트워크 없이 DB(price_sync 테이블)만으로 종목 시세가 최신인지 판단합니다.
+    - 장 마감 후: 마지막 완료 세션의 종가 반영 시각 이후에 받아온 적이 있으면 최신
+    - 주말/휴장일: 직전 완료 세션 기준으로 판단하므로 추가 요청 없음
+    - 장중: 당일 봉이 계속 바뀌므로 INTRADAY_TTL 이내에 받아온 경우만 최신
+    """
+    def __init__(self, db_manager, settle_delay=SETTLE_DELAY, intraday_ttl=INTRADAY_TTL):
+        self.db_manager = db_manager
+        self.settle_delay = settle_delay
+        self.intraday_ttl = intraday_ttl
+
+    def latest_completed_session(self, country, now=None):
+        """now 시점 기준으로 종가까지 반영된 가장 최근 세션 날짜(tz-naive Timestamp)를 반환합니다."""
+        cal = get_calendar(country)
+        cutoff = (now or utc_now()) - self.settle_delay
+        end = min(cutoff.tz_convert(None).normalize(), cal.last_session)
+        sessions = cal.sessions_in_range(end - pd.Timedelta(days=14), end)
+        for session in reversed(sessions):
+            if cal.session_close(session) <= cutoff:
+                return session
+        return cal.date_to_session(end, direction='previous')
+
+    def is_trading(self, country, now=None):
+        """해당 국가 거래소가 지금 장중인지 여부"""
+        return get_calendar(country).is_open_on_minute(now or utc_now())
+
+    def fresh_after(self, country, now=None):
+        """이 시각 이후에 동기화된 종목은 최신으로 봅니다. (UTC Timestamp)"""
+        now = now or utc_now()
+        if self.is_trading(country, now):
+            return now - self.intraday_ttl
+        session = self.latest_completed_session(country, now)
+        return get_calendar(country).session_close(session) + self.settle_delay
+
+    def is_up_to_date(self, code, country, now=None):
+        """DB만 조회하여 종목 시세가 최신인지 판단합니다."""
+        if country not in CALENDAR_CODES:
+            return False
+        with self.db_manager.connection() as (conn, cur):
+            cur.execute("SELECT synced_at FROM price_sync WHERE code = ?", (code,))
+            row = cur.fetchone()
+        if row is None or row[0] is None:
+            return False
+        return pd.Timestamp(row[0]) >= self.fresh_after(country, now)
+
+    def filter_stale(self, stocks, now=None):
+        """(code, country) 목록 중 새로 받아와야 하는 종목만 남겨 반환합니다. (DB 조회 1회)"""
+        with self.db_manager.connection() as (conn, cur):
+            cur.execute("SELECT code, synced_at FROM price_sync")
+            synced = dict(cur.fetchall())
+        thresholds = {country: self.fresh_after(country, now) for country in CALENDAR_CODES}
+        stale = []
+        for code, country in stocks:
+            synced_at = synced.get(code)
+            if country not in thresholds or synced_at is None or pd.Timestamp(synced_at) < thresholds[country]:
+                stale.append((code, country))
+        return stale
@@ -0,0 +1,225 @@
+import os
+import struct
+import threading
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from db_pool import get_connection_pool
+
+# 분봉 컬럼 (minute: 1970-01-01 00:00 기준 분 단위 정수, 거래소 현지 시각)
+MINUTE_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+# 가격이 모두 정수(원화 등)면 1, 아니면 소수 넷째 자리까지 정수 틱으로 저장합니다.
+PRICE_SCALES = (1, 10000)
+# 블록 압축 수준 (zlib)
+BLOCK_COMPRESS_LEVEL = 6
+# 종목/월별 블록 테이블. 블록 하나가 한 종목의 한 달 분봉 전체를 압축해 담으므로
+# 분봉마다 행을 만들지 않고, 구간 조회는 해당 월의 블록 몇 개만 읽어 배열로 풉니다.
+MINUTE_DDL = """
+    CREATE TABLE IF NOT EXISTS minute_block (
+        code TEXT NOT NULL, month INTEGER NOT NULL, n INTEGER NOT NULL,
+        first_minute INTEGER NOT NULL, last_minute INTEGER NOT NULL, scale INTEGER NOT NULL,
+        data BLOB NOT NULL, PRIMARY KEY (code, month)
+    )"""
+
+_INT_TYPES = (np.int8, np.int16, np.int32, np.int64)
+# 블록 헤더: 행 수(uint32) + 첫 분봉 시각(int64) + 첫 종가 틱(int64), 이어서 컬럼별 정수 크기(byte)
+_HEADER = struct.Struct('<Iqq')
+
+
+def minutes_to_months(minutes):
+    """분 단위 정수 배열을 1970-01 기준 개월 수 배열로 변환합니다."""
+    return np.asarray(minutes, dtype=np.int64).astype('M8[m]').astype('M8[M]').astype(np.int64)
+
+
+def to_minutes(value):
+    """datetime/문자열/Timestamp를 분 단위 정수로 변환합니다. (시간대 정보는 버리고 표시된 시각 그대로 사용)"""
+    ts = pd.Timestamp(value)
+    if ts.tzinfo is not None:
+        ts = ts.tz_localize(None)
+    return ts.value // 60_000_000_000
+
+
+def _narrow(values):
+    """정수 배열을 값이 들어가는 가장 작은 부호 있는 정수형(little-endian)으로 바꿉니다."""
+    for dtype in _INT_TYPES:
+        info = np.iinfo(dtype)
+        if values.size == 0 or (values.min() >= info.min and values.max() <= info.max):
+            break
+    return values.astype(np.dtype(dtype).newbyteorder('<'))
+
+
+def _price_scale(*columns):
+    for scale in PRICE_SCALES:
+        ticks = np.concatenate(columns) * scale
+        if np.all(np.abs(ticks - np.round(ticks)) < 1e-6):
+            return scale
+    return PRICE_SCALES[-1]
+
+
+def encode_block(bars):
+    """
+    한 종목/한 달의 분봉 배열(minute 오름차순, 중복 없음)을 압축 블록으로 인코딩합니다. 반환값: (blob, scale)
+    - 시각: 분 차이(대부분 1)의 델타, 종가: 정수 틱의 델타 (첫 값은 헤더에 두고 델타는 0부터 시작)
+    - 시가/고가/저가: 종가와의 틱 차이, 거래량: 그대로
+    각 컬럼을 값 범위에 맞는 가장 작은 정수형으로 줄인 뒤 zlib으로 압축합니다.
+    """
+    minutes = np.asarray(bars['minute'], dtype=np.int64)
+    prices = {name: np.asarray(bars[name], dtype=np.float64) for name in MINUTE_COLUMNS[:4]}
+    scale = _price_scale(*prices.values())
+    ticks = {name: np.round(values * scale).astype(np.int64) for name, values in prices.items()}
+    close = ticks['close']
+    first_minute, first_close = (int(minutes[0]), int(close[0])) if len(minutes) else (0, 0)
+    columns = [
+        np.diff(minutes, prepend=first_minute),
+        np.diff(close, prepend=first_close),
+        ticks['open'] - close,
+        ticks['high'] - close,
+        ticks['low'] - close,
+        np.asarray(bars['volume'], dtype=np.int64),
+    ]
+    packed = [_narrow(column) for column in columns]
+    header = _HEADER.pack(len(minutes), first_minute, first_close) + bytes(column.dtype.itemsize for column in packed)
+    payload = header + b''.join(column.tobytes() for column in packed)
+    return zlib.compress(payload, BLOCK_COMPRESS_LEVEL), scale
+
+
+def decode_block(blob, scale):
+    """encode_block의 역변환. 반환값: {'minute': int64, 'open'/'high'/'low'/'close': float64, 'volume': int64}"""
+    payload = zlib.decompress(blob)
+    n, first_minute, first_close = _HEADER.unpack_from(payload)
+    offset = _HEADER.size + 6
+    columns = []
+    for itemsize in payload[_HEADER.size:offset]:
+        dtype = np.dtype(f'<i{itemsize}')
+        columns.append(np.frombuffer(payload, dtype=dtype, count=n, offset=offset).astype(np.int64))
+        offset += n * itemsize
+    minute_delta, close_delta, open_off, high_off, low_off, volume = columns
+    close = first_close + np.cumsum(close_delta)
+    return {
+        'minute': first_minute + np.cumsum(minute_delta),
+        'open': (close + open_off) / scale,
+        'high': (close + high_off) / scale,
+        'low': (close + low_off) / scale,
+        'close': close / scale,
+        'volume': volume,
+    }
+
+
+def merge_bars(old, new):
+    """두 분봉 배열을 합쳐 minute 오름차순으로 정렬합니다. 같은 분은 new 값을 사용합니다."""
+    merged = {name: np.concatenate([old[name], new[name]]) for name in ('minute',) + MINUTE_COLUMNS}
+    order = np.argsort(merged['minute'], kind='stable')
+    minutes = merged['minute'][order]
+    # 같은 분이 여러 개면 마지막(new) 값만 남깁니다.
+    keep = np.append(minutes[1:] != minutes[:-1], True) if len(minutes) else np.empty(0, dtype=bool)
+    return {name: values[order][keep] for name, values in merged.items()}
+
+
+def _empty_bars():
+    bars = {name: np.empty(0, dtype=np.float64) for name in MINUTE_COLUMNS[:4]}
+    bars['minute'] = np.empty(0, dtype=np.int64)
+    bars['volume'] = np.empty(0, dtype=np.int64)
+    return bars
+
+
+_created = set()
+_created_lock = threading.Lock()
+
+
+class MinuteBarStore:
+    """
+    분봉 저장소. 일별 시세와 분리된 파일(investar_minute.db)에 종목/월 단위 압축 블록으로 저장합니다.
+    write()는 새 분봉이 속한 월의 블록만 읽어 합친 뒤 블록째 교체하고,
+    read()는 구간에 걸친 블록만 풀어서 NumPy 배열로 반환합니다.
+    연결은 db_manager의 연결 프로파일과 프로세스 공용 풀을 사용합니다.
+    """
+    def __init__(self, db_manager):
+        root, ext = os.path.splitext(db_manager.db_path)
+        self.path = f"{root}_minute{ext}"
+        self.pool = get_connection_pool((os.path.abspath(self.path), 'minute'),
+                                        lambda profile: db_manager._connect(self.path, profile),
+                                        name=os.path.basename(self.path))
+        with _created_lock:
+            if self.path not in _created:
+                with self.pool.lease('ingest') as conn:
+                    conn.execute(MINUTE_DDL)
+                    conn.commit()
+                _created.add(self.path)
+
+    def write(self, code, bars):
+        """
+        분봉 배열(minute 키 포함)을 저장합니다. 같은 분의 기존 값은 덮어씁니다. 반환값: 새로 추가된 분봉 수
+        """
+        minutes = np.asarray(bars['minute'], dtype=np.int64)
+        if minutes.size == 0:
+            return 0
+        months = minutes_to_months(minutes)
+        added = 0
+        with self.pool.lease('ingest') as conn:
+            with conn:
+                for month in np.unique(months):
+                    mask = months == month
+                    new = {name: np.asarray(bars[name])[mask] for name in ('minute',) + MINUTE_COLUMNS}
+                    row = conn.execute("SELECT data, scale, n FROM minute_block WHERE code = ? AND month = ?",
+                                       (code, int(month))).fetchone()
+                    old = decode_block(row[0], row[1]) if row else _empty_bars()
+                    merged = merge_bars(old, new)
+                    blob, scale = encode_block(merged)
+                    conn.execute("REPLACE INTO minute_block (code, month, n, first_minute, last_minute, scale, data) "
+                                 "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                                 (code, int(month), len(merged['minute']), int(merged['minute'][0]),
+                                  int(merged['minute'][-1]), scale, blob))
+                    added += len(merged['minute']) - (row[2] if row else 0)
+        return added
+
+    def read(self, code, start=None, end=None):
+        """
+        [start, end] 구간의 분봉을 반환합니다. (start/end: datetime, 'YYYY-MM-DD HH:MM' 문자열 등, 없으면 전체)
+        반환값: {'time': datetime64[m], 'open'/'high'/'low'/'close': float64, 'volume': int64} 배열
+        """
+        lo = to_minutes(start) if start is not None else None
+        hi = to_minutes(end) if end is not None else None
+        # 'YYYY-MM-DD'처럼 날짜만 주어진 end는 그날 마지막 분봉까지 포함합니다.
+        if isinstance(end, str) and len(end) == 10:
+            hi += 24 * 60 - 1
+        sql, params = "SELECT data, scale FROM minute_block WHERE code = ?", [code]
+        if lo is not None:
+            sql += " AND month >= ?"
+            params.append(int(minutes_to_months([lo])[0]))
+        if hi is not None:
+            sql += " AND month <= ?"
+            params.append(int(minutes_to_months([hi])[0]))
+        with self.pool.lease('read') as conn:
+            rows = conn.execute(sql + " ORDER BY month", params).fetchall()
+
+        blocks = [decode_block(data, scale) for data, scale in rows]
+        bars = {name: np.concatenate([block[name] for block in blocks]) for name in ('minute',) + MINUTE_COLUMNS} \
+            if blocks else _empty_bars()
+        mask = np.ones(len(bars['minute']), dtype=bool)
+        if lo is not None:
+            mask &= bars['minute'] >= lo
+        if hi is not None:
+            mask &= bars['minute'] <= hi
+        result = {'time': bars['minute'][mask].astype('M8[m]')}
+        result.update({name: bars[name][mask] for name in MINUTE_COLUMNS})
+        return result
+
+    def last_minutes(self, codes=None):
+        """종목별 마지막 저장 분봉 시각(분 단위 정수) {code: minute}"""
+        with self.pool.lease('read') as conn:
+            if codes is None:
+                rows = conn.execute("SELECT code, max(last_minute) FROM minute_block GROUP BY code").fetchall()
+            else:
+                codes = list(codes)
+                rows = conn.execute(f"SELECT code, max(last_minute) FROM minute_block "
+                                    f"WHERE code IN ({', '.join('?' * len(codes))}) GROUP BY code", codes).fetchall()
+        return dict(rows)
+
+    def storage_stats(self):
+        """블록 수, 분봉 수, 압축된 블록 크기 합계(bytes)"""
+        with self.pool.lease('read') as conn:
+            blocks, bars, size = conn.execute(
+                "SELECT count(*), coalesce(sum(n), 0), coalesce(sum(length(data)), 0) FROM minute_block").fetchone()
+        return {'blocks': blocks, 'bars': bars, 'bytes': size}
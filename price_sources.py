@@ -0,0 +1,184 @@
+import bisect
+import concurrent.futures
+import threading
+import time
+
+from job_scheduler import CancelToken, JobCancelled, bind_context, current_token
+
+# 지연 히스토그램 버킷 상한(초): 50ms ~ 60s 로그 간격
+LATENCY_BUCKETS = (0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 1.5, 2.0, 3.0, 5.0, 7.5, 10.0, 15.0, 20.0, 30.0, 60.0)
+
+# 헤지 요청 기준: 주 소스 지연의 HEDGE_PERCENTILE 백분위까지 기다린 뒤 보조 소스에 요청합니다.
+# 표본이 HEDGE_MIN_SAMPLES개 미만이면 HEDGE_DEFAULT_DEADLINE을 사용하고, 기준은 [MIN, MAX]로 제한합니다.
+HEDGE_PERCENTILE = 90
+HEDGE_MIN_SAMPLES = 10
+HEDGE_DEFAULT_DEADLINE = 1.5
+HEDGE_MIN_DEADLINE = 0.3
+HEDGE_MAX_DEADLINE = 5.0
+# 모든 소스를 합쳐 이 시간 안에 유효한 응답이 없으면 포기합니다.
+FETCH_TIMEOUT = 20.0
+
+
+class LatencyHistogram:
+    """ 소스별 응답 지연 히스토그램. 성공 응답의 지연으로 백분위를 계산합니다. """
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.total = 0
+        self.failures = 0
+        self.wins = 0
+        self.hedged = 0
+        self.lock = threading.Lock()
+
+    def record(self, seconds, ok=True):
+        with self.lock:
+            if not ok:
+                self.failures += 1
+                return
+            self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+            self.total += 1
+
+    def count(self, field):
+        """wins(먼저 도착해 채택됨) / hedged(헤지 요청으로 호출됨) 카운터 증가"""
+        with self.lock:
+            setattr(self, field, getattr(self, field) + 1)
+
+    def percentile(self, p):
+        """p 백분위 지연(버킷 상한, 초). 표본이 없으면 None."""
+        with self.lock:
+            if self.total == 0:
+                return None
+            rank = self.total * p / 100
+            seen = 0
+            for i, count in enumerate(self.counts):
+                seen += count
+                if seen >= rank:
+                    return self.buckets[i] if i < len(self.buckets) else self.buckets[-1] * 2
+            return self.buckets[-1] * 2
+
+    def snapshot(self):
+        with self.lock:
+            counts = dict(zip([f"<={b}s" for b in self.buckets] + [f">{self.buckets[-1]}s"], self.counts))
+            result = {'count': self.total, 'failures': self.failures, 'wins': self.wins,
+                      'hedged': self.hedged, 'buckets': counts}
+        for p in (50, 90, 99):
+            result[f'p{p}'] = self.percentile(p)
+        return result
+
+
+_histograms = {}
+_histograms_lock = threading.Lock()
+
+
+def get_latency_histogram(name):
+    """소스 이름별 LatencyHistogram. DBUpdater를 새로 만들어도 프로세스 안에서는 누적됩니다."""
+    with _histograms_lock:
+        if name not in _histograms:
+            _histograms[name] = LatencyHistogram()
+        return _histograms[name]
+
+
+def latency_stats():
+    """소스별 요청 수, 실패 수, 승리(먼저 응답) 수, 헤지 요청 수, p50/p90/p99 지연과 버킷별 개수"""
+    with _histograms_lock:
+        names = list(_histograms)
+    return {name: get_latency_histogram(name).snapshot() for name in names}
+
+
+def print_latency_stats():
+    for name, stats in sorted(latency_stats().items()):
+        p = {k: '-' if stats[k] is None else f"{stats[k]}s" for k in ('p50', 'p90', 'p99')}
+        print(f"[지연] {name}: 성공 {stats['count']}회, 실패 {stats['failures']}회, 채택 {stats['wins']}회, "
+              f"헤지 요청 {stats['hedged']}회, p50 {p['p50']}, p90 {p['p90']}, p99 {p['p99']}")
+
+
+class PriceSource:
+    """
+    일별 시세 제공처 하나. fetch(code, **kwargs)는 날짜 인덱스와
+    open/high/low/close/volume 소문자 컬럼을 가진 DataFrame(없으면 None)을 반환해야 합니다.
+    """
+    def __init__(self, name, fetch):
+        self.name = name
+        self.fetch = fetch
+        self.histogram = get_latency_histogram(name)
+
+    def hedge_deadline(self, percentile=HEDGE_PERCENTILE):
+        """이 소스를 주 소스로 쓸 때 보조 소스 요청을 보내기까지 기다릴 시간(초)"""
+        if self.histogram.total < HEDGE_MIN_SAMPLES:
+            return HEDGE_DEFAULT_DEADLINE
+        deadline = self.histogram.percentile(percentile)
+        return min(HEDGE_MAX_DEADLINE, max(HEDGE_MIN_DEADLINE, deadline))
+
+    def timed_fetch(self, *args, **kwargs):
+        start = time.monotonic()
+        df = None
+        try:
+            df = self.fetch(*args, **kwargs)
+        except JobCancelled:
+            # 헤지 요청에서 져서 취소된 요청은 소스의 실패가 아니므로 기록하지 않습니다.
+            raise
+        except BaseException:
+            self.histogram.record(time.monotonic() - start, ok=False)
+            raise
+        self.histogram.record(time.monotonic() - start, ok=df is not None and not df.empty)
+        return df
+
+
+# 헤지 요청용 공유 스레드 풀
+_executor = concurrent.futures.ThreadPoolExecutor(max_workers=16, thread_name_prefix='hedge')
+
+
+def hedged_fetch(sources, *args, timeout=FETCH_TIMEOUT, **kwargs):
+    """
+    sources를 우선순위대로 사용하는 헤지 요청.
+    앞 소스가 hedge_deadline 안에 응답하지 않거나 실패하면 다음 소스에도 요청을 보내고,
+    먼저 도착한 유효한 응답(비어 있지 않은 DataFrame)을 반환합니다. timeout 안에 없거나 작업이 취소되면 None.
+    반환하면 남은 요청은 취소하므로, 진 쪽 요청은 다음 HTTP 요청(재시도 포함) 전에 멈추고
+    진행 중이던 요청은 호스트별 동시성 한도 조정에 반영되지 않습니다.
+    반환값: (DataFrame 또는 None, 채택된 소스 이름 또는 None)
+    """
+    started = time.monotonic()
+    token = current_token()
+    # 호출한 작업이 취소되면 함께 취소되고, 이 함수가 반환할 때 남은 요청만 따로 취소하는 토큰
+    hedge_token = CancelToken(parent=token)
+    pending = {}
+    remaining = list(sources)
+
+    def launch():
+        source = remaining.pop(0)
+        if pending:
+            source.histogram.count('hedged')
+        # 헤지 스레드에서도 호출한 작업의 lane을 사용하고, 취소는 hedge_token으로 확인합니다.
+        pending[_executor.submit(bind_context(source.timed_fetch, hedge_token), *args, **kwargs)] = source
+        return source
+
+    current = launch()
+    try:
+        while pending:
+            elapsed = time.monotonic() - started
+            if elapsed >= timeout or token.cancelled:
+                break
+            wait = timeout - elapsed
+            if remaining:
+                wait = min(wait, current.hedge_deadline())
+            done, _ = concurrent.futures.wait(pending, timeout=wait, return_when=concurrent.futures.FIRST_COMPLETED)
+
+            for future in done:
+                source = pending.pop(future)
+                try:
+                    df = future.result()
+                except Exception as e:
+                    print(f"[{source.name}] 시세 요청 오류: {e}")
+                    df = None
+                if df is not None and not df.empty:
+                    source.histogram.count('wins')
+                    return df, source.name
+
+            # 기준 시간이 지났거나 응답이 실패했으면 다음 소스에 요청
+            if remaining:
+                current = launch()
+        return None, None
+    finally:
+        hedge_token.cancel('hedged')
+        for future in pending:
+            future.cancel()
@@ -0,0 +1,118 @@
+import concurrent.futures
+import threading
+import time
+
+from job_scheduler import JobCancelled, current_token
+
+# 끝난 작업의 결과를 같은 키의 다음 요청에 재사용하는 시간(초)
+RECENT_TTL = 10.0
+
+
+class _Flight:
+    """ 진행 중이거나 최근에 끝난 작업 하나 (범위 rank, 결과 Future, 끝난 시각) """
+    __slots__ = ('rank', 'future', 'finished_at')
+
+    def __init__(self, rank):
+        self.rank = rank
+        self.future = concurrent.futures.Future()
+        self.finished_at = None
+
+
+class SingleFlight:
+    """
+    키별로 겹치는 작업을 한 번만 실행하고 결과를 함께 사용하게 하는 single-flight 계층.
+    rank는 작업 범위를 나타내며 작을수록 넓은 범위입니다. (예: 같은 종목 시세 요청의 시작일)
+    진행 중이거나 ttl초 안에 성공한 작업의 rank가 요청 rank 이하이면 그 작업이 요청 범위를 포함하므로
+    새로 실행하지 않고 진행 중인 작업을 기다리거나(joined) 끝난 결과를 재사용합니다(reused).
+    실패한 작업(예외 또는 None 반환)의 결과는 기다리던 요청에만 전달하고 재사용하지 않습니다.
+    """
+    def __init__(self, name, ttl=RECENT_TTL):
+        self.name = name
+        self.ttl = ttl
+        self.lock = threading.Lock()
+        self.flights = {}   # key -> [_Flight]
+        self.stats = {'requests': 0, 'executed': 0, 'joined': 0, 'reused': 0, 'failed': 0}
+
+    def _covering(self, key, rank, now):
+        """rank 범위를 포함하는 진행 중/최근 작업을 찾고 만료된 작업은 정리합니다. (lock 안에서 호출)"""
+        flights = [f for f in self.flights.get(key, ()) if f.finished_at is None or now - f.finished_at < self.ttl]
+        if flights:
+            self.flights[key] = flights
+        else:
+            self.flights.pop(key, None)
+        for flight in flights:
+            if flight.rank <= rank:
+                return flight
+        return None
+
+    def _finish(self, key, flight, ok):
+        with self.lock:
+            flight.finished_at = time.monotonic()
+            if not ok:
+                self.stats['failed'] += 1
+                flights = self.flights.get(key, [])
+                if flight in flights:
+                    flights.remove(flight)
+
+    def do(self, key, rank, fn, *args, **kwargs):
+        """
+        key/rank 요청을 포함하는 작업이 없으면 fn(*args, **kwargs)를 실행하고, 있으면 그 결과를 반환합니다.
+        스케줄러 작업 안에서 기다릴 때는 작업의 남은 지연 예산까지만 기다립니다. (넘기면 JobCancelled)
+        """
+        with self.lock:
+            self.stats['requests'] += 1
+            flight = self._covering(key, rank, time.monotonic())
+            leader = flight is None
+            if leader:
+                flight = _Flight(rank)
+                self.flights.setdefault(key, []).append(flight)
+                self.stats['executed'] += 1
+            else:
+                self.stats['reused' if flight.finished_at is not None else 'joined'] += 1
+
+        if not leader:
+            try:
+                return flight.future.result(current_token().remaining())
+            except concurrent.futures.TimeoutError:
+                raise JobCancelled('expired')
+
+        try:
+            result = fn(*args, **kwargs)
+        except BaseException as e:
+            self._finish(key, flight, ok=False)
+            flight.future.set_exception(e)
+            raise
+        self._finish(key, flight, ok=result is not None)
+        flight.future.set_result(result)
+        return result
+
+    def snapshot(self):
+        with self.lock:
+            stats = dict(self.stats)
+        stats['saved'] = stats['joined'] + stats['reused']
+        return stats
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def get_single_flight(name):
+    """이름별 SingleFlight. DBUpdater를 여러 개 만들어도(UI, DataManager 등) 프로세스 안에서 공유됩니다."""
+    with _flights_lock:
+        if name not in _flights:
+            _flights[name] = SingleFlight(name)
+        return _flights[name]
+
+
+def single_flight_stats():
+    """이름별 요청 수, 실제 실행 수, 진행 중 작업 합류 수, 최근 결과 재사용 수, 실패 수, 절약한 요청 수"""
+    with _flights_lock:
+        names = list(_flights)
+    return {name: get_single_flight(name).snapshot() for name in names}
+
+
+def print_single_flight_stats():
+    for name, s in sorted(single_flight_stats().items()):
+        print(f"[중복 요청] {name}: 요청 {s['requests']}회, 실행 {s['executed']}회, 진행 중 합류 {s['joined']}회, "
+              f"최근 결과 재사용 {s['reused']}회, 실패 {s['failed']}회 (절약 {s['saved']}회)")
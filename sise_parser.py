@@ -0,0 +1,105 @@
+import numpy as np
+import pandas as pd
+
+# siseJson 응답의 괄호/따옴표를 공백으로 바꿔 숫자와 쉼표만 남기기 위한 변환 테이블
+_STRIP_TABLE = str.maketrans({'[': ' ', ']': ' ', '"': ' ', "'": ' ', '(': ' ', ')': ' '})
+
+SISE_COLUMNS = ('date', 'open', 'high', 'low', 'close', 'volume')
+
+
+def yyyymmdd_to_days(values):
+    """YYYYMMDD 정수 배열을 1970-01-01 기준 일수(int64) 배열로 변환합니다."""
+    values = values.astype(np.int64)
+    years = values // 10000 - 1970
+    months = values // 100 % 100 - 1
+    days = values % 100 - 1
+    dates = years.astype('M8[Y]') + months.astype('m8[M]')
+    return (dates.astype('M8[D]') + days.astype('m8[D]')).view(np.int64)
+
+
+def _parse_sise_table(text):
+    """siseJson 응답 본문을 (행 수, 컬럼 수) float64 배열로 읽습니다. 본문이 없으면 None."""
+    header_start = text.index('[[')
+    header_end = text.index(']', header_start)
+    n_cols = text.count(',', header_start, header_end) + 1
+    if n_cols < 6:
+        raise ValueError(f"예상하지 못한 siseJson 헤더입니다: {text[header_start:header_end + 1]}")
+
+    first_row = text.find('[', header_end)
+    body = text[first_row:] if first_row >= 0 else ''
+    n_rows = body.count('[')
+    if n_rows == 0:
+        return None
+
+    values = np.fromstring(body.translate(_STRIP_TABLE), sep=',')
+    if values.size != n_rows * n_cols:
+        raise ValueError(f"siseJson 본문 파싱 실패: {values.size}개 값 (예상 {n_rows * n_cols}개)")
+    return values.reshape(n_rows, n_cols)
+
+
+def parse_sise_json(text):
+    """
+    네이버 siseJson 일봉 응답을 파싱하여 타입이 정해진 NumPy 배열로 반환합니다.
+    응답 형식:
+        [['날짜', '시가', '고가', '저가', '종가', '거래량', '외국인소진율'],
+        ["20240102", 78200, 79800, 78200, 79600, 17142847, 53.28],
+        ...]
+    헤더 이후 본문의 괄호/따옴표를 공백으로 바꾼 뒤 np.fromstring으로 한 번에 읽으므로
+    행마다 파이썬 리스트나 object 컬럼을 만들지 않습니다.
+    반환값: {'date': int64 일수, 'open'/'high'/'low'/'close': float64, 'volume': int64}
+    """
+    table = _parse_sise_table(text)
+    if table is None:
+        return {name: np.empty(0, dtype=np.int64 if name in ('date', 'volume') else np.float64)
+                for name in SISE_COLUMNS}
+
+    return {
+        'date': yyyymmdd_to_days(table[:, 0]),
+        'open': table[:, 1].copy(),
+        'high': table[:, 2].copy(),
+        'low': table[:, 3].copy(),
+        'close': table[:, 4].copy(),
+        'volume': table[:, 5].astype(np.int64),
+    }
+
+
+def sise_arrays_to_frame(arrays):
+    """parse_sise_json 결과를 날짜 오름차순 DataFrame(date 컬럼은 datetime64)으로 만듭니다."""
+    order = np.argsort(arrays['date'], kind='stable')
+    columns = {'date': pd.to_datetime(arrays['date'][order], unit='D')}
+    columns.update({name: arrays[name][order] for name in SISE_COLUMNS[1:]})
+    return pd.DataFrame(columns)
+
+
+def parse_sise_minute_json(text, cumulative_volume=True):
+    """
+    네이버 siseJson 분봉(timeframe=minute) 응답을 파싱합니다.
+    날짜 컬럼이 YYYYMMDDHHMM(한국 시각)이고 분봉 응답은 시가/고가/저가가 0으로 오므로 0인 가격은 종가로 채웁니다.
+    cumulative_volume=True이면 거래량을 당일 누적값으로 보고 하루 단위로 분별 거래량으로 되돌립니다.
+    (그래서 응답은 하루의 첫 분봉부터 요청해야 합니다)
+    반환값: {'minute': int64 (1970-01-01 00:00 기준 분), 'open'/'high'/'low'/'close': float64, 'volume': int64}
+            (minute 오름차순)
+    """
+    table = _parse_sise_table(text)
+    if table is None:
+        arrays = {name: np.empty(0, dtype=np.float64) for name in SISE_COLUMNS[1:5]}
+        arrays.update(minute=np.empty(0, dtype=np.int64), volume=np.empty(0, dtype=np.int64))
+        return arrays
+
+    stamps = table[:, 0].astype(np.int64)
+    days = yyyymmdd_to_days(stamps // 10000)
+    minutes = days * 1440 + stamps // 100 % 100 * 60 + stamps % 100
+    order = np.argsort(minutes, kind='stable')
+    table, minutes, days = table[order], minutes[order], days[order]
+
+    close = table[:, 4].copy()
+    arrays = {'minute': minutes, 'close': close}
+    for i, name in enumerate(('open', 'high', 'low'), 1):
+        arrays[name] = np.where(table[:, i] > 0, table[:, i], close)
+
+    volume = table[:, 5].astype(np.int64)
+    if cumulative_volume:
+        new_day = np.append(True, days[1:] != days[:-1])
+        volume = np.where(new_day, volume, np.diff(volume, prepend=0))
+    arrays['volume'] = volume
+    return arrays
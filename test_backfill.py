@@ -0,0 +1,69 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import DBUpdater_new
+
+CODE = '005930'
+
+
+def fake_price_range(self, code, country, start, end):
+    """영업일마다 종가가 1씩 오르는 가짜 시세 (전일비는 항상 1)"""
+    days = pd.bdate_range('2020-01-01', '2026-12-31')
+    close = 1000.0 + np.arange(len(days))
+    df = pd.DataFrame({'open': close, 'high': close, 'low': close, 'close': close, 'volume': 100}, index=days)
+    return df.loc[start:end].copy()
+
+
+@pytest.fixture
+def dbu(tmp_path, monkeypatch):
+    monkeypatch.setattr(DBUpdater_new.DBUpdater, 'fetch_price_range', fake_price_range)
+    dbu = DBUpdater_new.DBUpdater(str(tmp_path / 'investar.db'))
+    with dbu.connection() as (conn, cur):
+        cur.execute("INSERT INTO comp_info (code, company, country) VALUES (?, '삼성전자', 'kr')", (CODE,))
+        conn.commit()
+    return dbu
+
+
+def stored_diffs(dbu):
+    with dbu.connection('kr') as (conn, cur):
+        table, key = dbu._price_table()
+        cur.execute(f"SELECT {dbu._date_sql(key)}, diff FROM {table} WHERE code = ? ORDER BY {key}", (CODE,))
+        return cur.fetchall()
+
+
+def test_backfill_fills_diff_across_chunk_boundaries(dbu):
+    dbu.backfill(CODE, since='2023-01-02', until='2025-12-31', chunk_days=365)
+    rows = stored_diffs(dbu)
+    assert rows[0] == ('2023-01-02', 0)
+    assert [date for date, diff in rows[1:] if diff != 1] == []
+
+
+def test_backfill_fixes_diff_of_stored_bar_after_gap(dbu):
+    # 증분 갱신으로 최근 구간만 저장된 상태: 첫 봉의 전일비는 0으로 저장됩니다.
+    recent = fake_price_range(dbu, CODE, 'kr', '2025-06-02', '2025-12-31')
+    dbu.replace_into_db(recent, CODE, 'kr')
+    assert stored_diffs(dbu)[0] == ('2025-06-02', 0)
+
+    dbu.backfill(CODE, since='2024-01-01', until='2025-12-31', chunk_days=200)
+    rows = stored_diffs(dbu)
+    assert rows[0] == ('2024-01-01', 0)
+    assert [date for date, diff in rows[1:] if diff != 1] == []
+
+
+def test_backfill_failed_download_is_not_recorded_as_pre_listing(tmp_path, monkeypatch):
+    def failing_ticker(symbol):
+        raise ConnectionError("rate limited")
+
+    monkeypatch.setattr(DBUpdater_new.yf, 'Ticker', failing_ticker)
+    dbu = DBUpdater_new.DBUpdater(str(tmp_path / 'investar.db'))
+    with dbu.connection() as (conn, cur):
+        cur.execute("INSERT INTO comp_info (code, company, country) VALUES ('AAPL', 'Apple', 'us')")
+        conn.commit()
+    dbu.replace_into_db(fake_price_range(dbu, 'AAPL', 'us', '2025-06-02', '2025-12-31'), 'AAPL', 'us')
+    covered = dbu.get_coverage('AAPL', 'us')
+
+    result = dbu.backfill('AAPL', since='2016-01-04', until='2025-12-31')
+    assert result['bars'] == 0
+    # 요청 실패는 다음 백필 때 다시 요청해야 하므로 받아 둔 구간으로 기록하지 않습니다.
+    assert dbu.get_coverage('AAPL', 'us') == covered
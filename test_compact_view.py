@@ -0,0 +1,25 @@
+import sqlite3
+
+import pandas as pd
+
+import DBUpdater_new
+
+
+def test_compact_view_returns_prices_as_real(tmp_path):
+    # 이전 버전의 호환 뷰(가격을 정수 그대로 반환)로 만든 국가별 파일
+    for country in DBUpdater_new.SHARD_COUNTRIES:
+        conn = sqlite3.connect(tmp_path / f'investar_{country}.db')
+        for sql in DBUpdater_new.COMPACT_PRICE_DDL:
+            conn.execute(sql.replace(DBUpdater_new.COMPACT_VIEW_PRICES, 'open, high, low, close, diff'))
+        conn.commit()
+        conn.close()
+
+    dbu = DBUpdater_new.DBUpdater(str(tmp_path / 'investar.db'))
+    close = [70000.0, 70500.0]
+    df = pd.DataFrame({'open': close, 'high': close, 'low': close, 'close': close, 'volume': 10},
+                      index=pd.to_datetime(['2026-10-15', '2026-10-16']))
+    dbu.replace_into_db(df, '005930', 'kr')
+
+    with dbu.connection() as (conn, cur):
+        cur.execute("SELECT typeof(open), typeof(high), typeof(low), typeof(close), typeof(diff) FROM daily_price")
+        assert set(cur.fetchall()) == {('real',) * 5}
@@ -0,0 +1,20 @@
+import concurrent.futures
+import time
+
+from job_scheduler import PRIORITY_BULK, JobScheduler
+
+
+def test_burst_after_idle_threads_grows_the_pool():
+    scheduler = JobScheduler(workers=54, reserved=4)
+    # 작업 두 개를 끝내 스레드 두 개가 쉬고 있는 상태를 만듭니다.
+    concurrent.futures.wait([scheduler.submit(time.sleep, 0, priority=PRIORITY_BULK) for _ in range(2)])
+    time.sleep(0.1)
+    assert scheduler.idle >= 1
+
+    started = time.monotonic()
+    futures = [scheduler.submit(time.sleep, 0.3, priority=PRIORITY_BULK) for _ in range(100)]
+    concurrent.futures.wait(futures)
+    elapsed = time.monotonic() - started
+    # 50개 스레드(bulk 상한)로 두 번이면 끝납니다. 쉬던 스레드 두 개로만 실행하면 15초 걸립니다.
+    assert elapsed < 3.0
+    assert len(scheduler.threads) == scheduler.workers
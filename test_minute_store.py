@@ -0,0 +1,21 @@
+import zlib
+
+import numpy as np
+
+from minute_store import _HEADER, decode_block, encode_block, to_minutes
+
+
+def test_block_stores_first_minute_in_header_and_small_deltas():
+    minutes = to_minutes('2026-10-16 09:00') + np.arange(390)
+    close = 70000.0 + np.cumsum(np.tile([100.0, -100.0, 200.0], 130))
+    bars = {'minute': minutes, 'open': close, 'high': close + 100, 'low': close - 100, 'close': close,
+            'volume': np.full(390, 1000)}
+
+    blob, scale = encode_block(bars)
+    decoded = decode_block(blob, scale)
+    assert np.array_equal(decoded['minute'], minutes)
+    assert np.allclose(decoded['close'], close)
+    assert np.allclose(decoded['low'], close - 100)
+    # 첫 시각/종가는 헤더에 있으므로 시각 델타는 1바이트, 종가 델타는 2바이트 정수로 저장됩니다.
+    itemsizes = list(zlib.decompress(blob)[_HEADER.size:_HEADER.size + 2])
+    assert itemsizes == [1, 2]
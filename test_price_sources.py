@@ -0,0 +1,36 @@
+import threading
+import time
+
+import pandas as pd
+
+from job_scheduler import current_token
+from price_sources import PriceSource, hedged_fetch
+
+
+def test_losing_hedge_request_is_cancelled_and_not_counted():
+    stopped = threading.Event()
+
+    def slow_fetch():
+        # HTTP 클라이언트처럼 요청 사이마다 취소 여부를 확인하는 느린 주 소스
+        token = current_token()
+        for _ in range(100):
+            token.raise_if_cancelled()
+            time.sleep(0.05)
+        return None
+
+    def guarded_slow_fetch():
+        try:
+            return slow_fetch()
+        finally:
+            stopped.set()
+
+    slow = PriceSource('test_slow', guarded_slow_fetch)
+    fast = PriceSource('test_fast', lambda: pd.DataFrame({'close': [1.0]}))
+    slow.hedge_deadline = lambda percentile=None: 0.1
+
+    df, source = hedged_fetch([slow, fast], timeout=5.0)
+    assert source == 'test_fast'
+    assert not df.empty
+    # 진 쪽 요청은 다음 확인 지점에서 멈추고, 소스의 실패로 기록되지 않습니다.
+    assert stopped.wait(1.0)
+    assert slow.histogram.failures == 0
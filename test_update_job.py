@@ -0,0 +1,56 @@
+import pandas as pd
+import pytest
+
+import DBUpdater_new
+
+CODES = [f"{i:06d}" for i in range(10)]
+DELISTED = '000009'
+
+
+@pytest.fixture
+def dbu(tmp_path, monkeypatch):
+    fetched = []
+
+    def fake_fetch(self, code, country, period=2, start_date=None, hedge=False):
+        fetched.append(code)
+        if code == DELISTED:
+            return None
+        close = [100.0, 101.0]
+        return pd.DataFrame({'open': close, 'high': close, 'low': close, 'close': close, 'volume': 10},
+                            index=pd.to_datetime(['2026-10-15', '2026-10-16']))
+
+    monkeypatch.setattr(DBUpdater_new.DBUpdater, 'fetch_daily_price_by_code', fake_fetch)
+    dbu = DBUpdater_new.DBUpdater(str(tmp_path / 'investar.db'))
+    # 모든 종목을 최신이 아닌 것으로 봅니다.
+    dbu.freshness.filter_stale = lambda stocks, now=None: list(stocks)
+    with dbu.connection() as (conn, cur):
+        cur.executemany("INSERT INTO comp_info (code, company, country) VALUES (?, ?, 'kr')",
+                        [(code, code) for code in CODES])
+        conn.commit()
+    dbu.fetched = fetched
+    return dbu
+
+
+def test_finished_job_with_no_data_failure_is_not_resumed(dbu):
+    first = dbu.update_daily_price('kr', resume=True)
+    assert first['status'] == 'done'
+    assert first['failures'] == {'no_data': [DELISTED]}
+
+    dbu.fetched.clear()
+    second = dbu.update_daily_price('kr', resume=True)
+    assert second['job_id'] != first['job_id']
+    assert sorted(dbu.fetched) == CODES
+
+
+def test_stopped_job_resumes_leftovers_then_rest_of_universe(dbu):
+    job_id = dbu._start_job('kr', 1, [(code, 'kr') for code in CODES[:8]])
+    dbu.mark_job_items(job_id, 'done', [(code, None) for code in CODES[:5]])
+    dbu.mark_job_items(job_id, 'failed', [('000005', 'no_data'), ('000006', 'error:Timeout')])
+    dbu._finish_job(job_id, 'stopped')
+
+    report = dbu.update_daily_price('kr', resume=True)
+    assert report['job_id'] == job_id
+    # 데이터가 없었던 종목만 다시 요청하지 않고, 작업 이후 추가된 종목(000008, 000009)도 받습니다.
+    assert sorted(dbu.fetched) == [code for code in CODES if code != '000005']
+    assert report['total'] == len(CODES)
+    assert report['status'] == 'done'
@@ -1,9 +1,11 @@
 import sys
 import os
-import time
+import concurrent.futures
 from threading import Thread, Lock
 import pandas as pd
 import DBUpdater_new
+from job_scheduler import (PRIORITY_INTERACTIVE, PRIORITY_WATCHLIST, INTERACTIVE_BUDGET, JobCancelled,
+                           current_priority, get_job_scheduler)
 
 from PySide6 import QtCore, QtWidgets, QtGui
 from PySide6.QtWebEngineCore import QWebEnginePage, QWebEngineProfile, QWebEngineScript
@@ -43,6 +45,7 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         self.treemap_manager = TreemapManager()
 
         self.db_lock = Lock()
+        self.scheduler = get_job_scheduler()
         self.file_lock = Lock()
         self.run = True
         self.codes = {}
@@ -437,7 +440,7 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
             print(f"매도 조건: {sell_cond}")
 
             # 데이터 업데이트 및 가져오기
-            self.update_stock_price(company, 10) # 10년치 데이터
+            self.scheduler.run(self.update_stock_price, company, 10, priority=PRIORITY_INTERACTIVE) # 10년치 데이터
             df = self.data_manager.get_daily_price(company, start_date)
 
             if df is not None and not df.empty:
@@ -464,7 +467,8 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
             
             # 각 종목 데이터 업데이트 (필요 시)
             for stock in stock_list:
-                self.update_stock_price(stock, 3) # 최근 3년 데이터 (최적화에 충분한 데이터 확보)
+                # 최근 3년 데이터 (최적화에 충분한 데이터 확보)
+                self.scheduler.run(self.update_stock_price, stock, 3, priority=PRIORITY_WATCHLIST)
                 
             self.portfolio_optimizer.optimize_portfolio(stock_list)
             
@@ -489,13 +493,13 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
             if company is None or isinstance(company, bool):
                 company = self.le_ent.text()
             print(f"종목 조회 시작: {company}")
-            
-            with self.db_lock:
-                db_updater = DBUpdater_new.DBUpdater()
-                db_updater.update_daily_price("stop")
-            
-            time.sleep(0.2)
-            self.update_stock_price(company, 2)
+
+            # 일괄 업데이트를 멈추지 않고 interactive lane으로 먼저 실행합니다. (지연 예산을 넘기면 저장된 데이터로 표시)
+            try:
+                self.scheduler.run(self.update_stock_price, company, 2,
+                                   priority=PRIORITY_INTERACTIVE, budget=INTERACTIVE_BUDGET)
+            except concurrent.futures.CancelledError:
+                print(f"'{company}' 시세 업데이트가 지연 예산({INTERACTIVE_BUDGET:.0f}초)을 넘겨 저장된 데이터로 표시합니다.")
             
             df = self.data_manager.get_daily_price(company)
             if df is not None and not df.empty:
@@ -565,7 +569,12 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
             print(f"웹뷰 업데이트 오류: {str(e)}")
 
     def update_stock_price(self, company, period):
+        """
+        종목 시세를 최신으로 업데이트합니다.
+        period: 1 = 최근 20일, 2 = 기본 시작일(2024-01-01)부터, 3 이상 = 최근 period년 (과거 구간은 백필)
+        """
         try:
+            # DB 잠금은 종목 정보 조회에만 사용하고, 네트워크 요청/백필은 잠금 밖에서 실행합니다.
             with self.db_lock:
                 mk = DBUpdater_new.MarketDB()
                 stock_list = mk.get_comp_info(company)
@@ -589,29 +598,35 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
                 company_name = val.iloc[0]['company']
                 country = val.iloc[0]['country']
 
-                db_updater = DBUpdater_new.DBUpdater()
-                
-                if country == 'kr':
-                    print(f"한국 종목 데이터 업데이트 중: {company_name}({code})")
-                    df = db_updater.read_naver_api(code, company_name)
-                    if df is not None and not df.empty:
-                        df.set_index('date', inplace=True)
-                elif country == 'us':
-                    print(f"미국 종목 데이터 업데이트 중: {company_name}({code})")
-                    df = db_updater.read_yfinance(code, period)
-                    if df is not None and not df.empty:
-                        # yfinance 데이터의 컬럼명을 소문자로 변환 (Open -> open, Close -> close 등)
-                        df.columns = [col.lower() for col in df.columns]
-                else:
-                    print(f"지원하지 않는 국가: {country}")
-                    return
+            db_updater = self.db_updater
+
+            if period > 2 and country in ('kr', 'us'):
+                # 받아 두지 않은 과거 구간만 구간 단위로 나눠 받습니다. (이미 받은 구간은 요청하지 않음)
+                # 호출한 작업과 같은 lane에서 실행하므로 일괄 업데이트 중단의 영향을 받지 않습니다.
+                db_updater.backfill(code, years=period, priority=current_priority())
+
+            # 휴장일/장 마감 후 이미 저장된 경우 등 최신 상태면 네트워크 요청을 생략합니다.
+            if db_updater.freshness.is_up_to_date(code, country):
+                print(f"'{company_name}' 데이터가 최신 상태입니다.")
+                return
+            
+            if country not in ('kr', 'us'):
+                print(f"지원하지 않는 국가: {country}")
+                return
+            print(f"{'한국' if country == 'kr' else '미국'} 종목 데이터 업데이트 중: {company_name}({code})")
+            # 주 소스가 늦으면 보조 소스에도 요청하여 먼저 온 응답을 사용합니다. (전체 제한 시간 있음)
+            # 같은 종목의 요청이 진행 중이거나 방금 끝났으면 다운로드/저장을 함께 사용합니다.
+            # 마지막으로 저장된 봉 이후 구간만 받아옵니다. (저장된 데이터가 없으면 period 기본 구간)
+            last_date = db_updater.get_last_bar_date(code)
+            df = db_updater.sync_daily_price(code, country, period, start_date=last_date, hedge=True)
+            
+            if df is not None and not df.empty:
+                print(f"'{company_name}' 데이터 업데이트 완료")
+            else:
+                print(f"'{company_name}' 데이터를 가져올 수 없습니다.")
                 
-                if df is not None and not df.empty:
-                    db_updater.replace_into_db(df, code)
-                    print(f"'{company_name}' 데이터 업데이트 완료")
-                else:
-                    print(f"'{company_name}' 데이터를 가져올 수 없습니다.")
-                    
+        except JobCancelled:
+            print(f"'{company}' 시세 업데이트가 취소되었습니다.")
         except Exception as e:
             print(f"update_stock_price 오류: {str(e)}")
 
@@ -962,15 +977,15 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         try:
             # 먼저 종목 목록 업데이트
             self.db_updater.update_comp_info(nation)
-            # 그 다음 시세 업데이트
-            self.db_updater.update_daily_price(nation)
+            # 그 다음 시세 업데이트 (이전 실행이 중단되었으면 남은 종목부터 이어서 실행)
+            self.db_updater.update_daily_price(nation, resume=True)
         except Exception as e:
             print(f"업데이트 중 오류 발생: {e}")
 
     def stop_update_thread(self):
         """DB 업데이트를 중단합니다."""
         print("업데이트 중단 요청...")
-        self.db_updater.update_daily_price('stop')
+        self.db_updater.stop_update()
 
     def update_single_stock_ui(self):
         """개별 종목 업데이트 (UI 버튼 연결용)"""
@@ -0,0 +1,169 @@
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+from DBUpdater_new import DBUpdater
+from market_calendar import CALENDAR_CODES, get_calendar, sync_timestamp, utc_now
+
+# 다음 실행 시각까지 한 번에 잠드는 최대 시간(초). 절전/시계 변경 후에도 일정을 다시 계산합니다.
+MAX_SLEEP = 1800
+# 장중 분봉 수집 간격(초)
+INTRADAY_INTERVAL = 60
+# 분봉을 수집하는 종목 목록 파일 (files 폴더의 보유/관심 종목)
+INTRADAY_LISTS = ('stock_hold.txt', 'stock_interest.txt')
+# 종목 목록 폴더. 배포 시 _MEIPASS, 개발 시 이 모듈이 있는 폴더의 files 폴더를 읽으므로 실행 위치(cwd)와 무관합니다.
+# ConfigManager는 utils를 통해 PySide6를 불러오므로 Qt가 없는 서버에서도 동작하도록 파일을 직접 읽습니다.
+INTRADAY_LIST_DIR = os.path.join(getattr(sys, '_MEIPASS', os.path.dirname(os.path.abspath(__file__))), 'files')
+
+
+class UpdateDaemon:
+    """
+    GUI 없이 국가별 장 마감 후에 종목 목록과 시세를 업데이트하는 스케줄러.
+    exchange_calendars 세션으로 실행 시각(세션 종가 + 정산 지연)을 계산하므로 휴장일에는 실행하지 않으며,
+    세션별 실행 기록(update_run 테이블)을 남겨 재시작하거나 절전에서 깨어나도 놓친 세션만 한 번 실행합니다.
+    """
+    def __init__(self, db_updater=None, nations=None):
+        self.db = db_updater or DBUpdater()
+        self.nations = list(nations or CALENDAR_CODES)
+        with self.db.connection() as (conn, cur), conn:
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS update_run (
+                    country TEXT, session TEXT, status TEXT, started_at TEXT, finished_at TEXT, summary TEXT,
+                    PRIMARY KEY (country, session)
+                )""")
+
+    def due_session(self, country, now=None):
+        """아직 실행하지 않은 가장 최근 완료 세션(YYYY-MM-DD)을 반환합니다. 이미 실행했으면 None."""
+        session = self.db.freshness.latest_completed_session(country, now).strftime('%Y-%m-%d')
+        with self.db.connection() as (conn, cur):
+            cur.execute("SELECT status FROM update_run WHERE country = ? AND session = ?", (country, session))
+            row = cur.fetchone()
+        return None if row is not None and row[0] == 'done' else session
+
+    def next_run_at(self, country, now=None):
+        """다음 세션의 실행 시각(종가 + 정산 지연, UTC Timestamp)"""
+        now = now or utc_now()
+        cal = get_calendar(country)
+        session = cal.date_to_session(now.tz_convert(None).normalize(), direction='next')
+        run_at = cal.session_close(session) + self.db.freshness.settle_delay
+        if run_at <= now:
+            run_at = cal.session_close(cal.next_session(session)) + self.db.freshness.settle_delay
+        return run_at
+
+    def run_session(self, country, session):
+        """한 국가의 종목 목록과 시세를 업데이트하고 실행 요약을 update_run에 기록합니다."""
+        print(f"\n[{country}] {session} 세션 업데이트를 시작합니다.")
+        started = time.monotonic()
+        with self.db.connection() as (conn, cur), conn:
+            cur.execute("REPLACE INTO update_run (country, session, status, started_at) VALUES (?, ?, 'running', ?)",
+                        (country, session, sync_timestamp()))
+
+        summary = {'country': country, 'session': session}
+        status = 'done'
+        try:
+            self.db.update_comp_info(country)
+            report = self.db.update_daily_price(country, resume=True)
+            summary.update({key: report[key] for key in ('job_id', 'total', 'done', 'pending', 'failed')})
+            summary['failures'] = {reason: len(codes) for reason, codes in report['failures'].items()}
+            if report['pending']:
+                status = 'partial'
+        except Exception as e:
+            status = 'failed'
+            summary['error'] = f"{type(e).__name__}: {e}"
+            print(f"[{country}] 업데이트 중 오류 발생: {e}")
+        summary['elapsed_sec'] = round(time.monotonic() - started, 1)
+
+        with self.db.connection() as (conn, cur), conn:
+            cur.execute("UPDATE update_run SET status = ?, finished_at = ?, summary = ? WHERE country = ? AND session = ?",
+                        (status, sync_timestamp(), json.dumps(summary, ensure_ascii=False), country, session))
+        print(f"[{country}] {session} 세션 업데이트 {status}: {json.dumps(summary, ensure_ascii=False)}")
+        return summary
+
+    def run_due(self, now=None):
+        """실행할 세션이 남은 국가를 모두 실행합니다. 반환값: 실행 요약 목록"""
+        summaries = []
+        for country in self.nations:
+            session = self.due_session(country, now)
+            if session is not None:
+                summaries.append(self.run_session(country, session))
+        return summaries
+
+    def run_forever(self):
+        print(f"업데이트 데몬을 시작합니다. 대상: {', '.join(self.nations)}")
+        while True:
+            self.run_due()
+            now = utc_now()
+            schedule = {country: self.next_run_at(country, now) for country in self.nations}
+            country, run_at = min(schedule.items(), key=lambda item: item[1])
+            wait = max(1.0, (run_at - now).total_seconds())
+            print(f"다음 실행: [{country}] {run_at.tz_convert('Asia/Seoul'):%Y-%m-%d %H:%M} (KST), "
+                  f"{wait / 3600:.1f}시간 후")
+            time.sleep(min(wait, MAX_SLEEP))
+
+    def intraday_companies(self):
+        """보유/관심 종목 목록 (중복 제거, 파일 순서 유지)"""
+        companies = []
+        for filename in INTRADAY_LISTS:
+            try:
+                with open(os.path.join(INTRADAY_LIST_DIR, filename), 'r', encoding='utf-8') as f:
+                    names = [line.strip() for line in f if line.strip()]
+            except FileNotFoundError:
+                continue
+            companies += [name for name in names if name not in companies]
+        return companies
+
+    def run_intraday(self, interval=INTRADAY_INTERVAL):
+        """
+        보유/관심 종목의 분봉을 장중에 interval초마다 수집합니다.
+        국가별 장 시간은 거래소 캘린더로 판단하며, 장이 끝나면 마지막 분봉까지 한 번 더 받습니다.
+        """
+        codes = {code: country for code, country in self.db._resolve_codes(self.intraday_companies()).items()
+                 if country in self.nations}
+        print(f"분봉 수집을 시작합니다. 대상 {len(codes)}개 종목, {interval}초 간격")
+        was_trading = set()
+        while True:
+            trading = {country for country in set(codes.values()) if self.db.freshness.is_trading(country)}
+            targets = [code for code, country in codes.items() if country in trading | was_trading]
+            if targets:
+                self.db.update_minute_bars(targets)
+            was_trading = trading
+            time.sleep(interval)
+
+    def print_recent_runs(self, limit=10):
+        with self.db.connection() as (conn, cur):
+            runs = pd.read_sql("SELECT country, session, status, started_at, finished_at FROM update_run "
+                               "ORDER BY started_at DESC LIMIT ?", conn, params=(limit,))
+        print(runs.to_string(index=False) if not runs.empty else "실행 기록이 없습니다.")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="장 마감 후 종목 목록/시세를 자동으로 업데이트합니다.")
+    parser.add_argument('--nation', choices=sorted(CALENDAR_CODES), action='append',
+                        help="업데이트할 국가 (여러 번 지정 가능, 기본값: 전체)")
+    parser.add_argument('--once', action='store_true', help="실행할 세션이 남은 국가만 한 번 실행하고 종료")
+    parser.add_argument('--status', action='store_true', help="최근 실행 기록을 출력하고 종료")
+    parser.add_argument('--intraday', action='store_true',
+                        help="장중에 보유/관심 종목의 분봉을 주기적으로 수집 (일별 업데이트 대신 실행)")
+    parser.add_argument('--migrate-schema', action='store_true',
+                        help="시세 테이블을 compact 형식(정수 날짜, WITHOUT ROWID)으로 변환하고 종료 (실행 중인 앱과 함께 사용 가능)")
+    args = parser.parse_args(argv)
+
+    daemon = UpdateDaemon(nations=args.nation)
+    if args.migrate_schema:
+        daemon.db.migrate_price_schema()
+    elif args.status:
+        daemon.print_recent_runs()
+    elif args.intraday:
+        daemon.run_intraday()
+    elif args.once:
+        daemon.run_due()
+    else:
+        daemon.run_forever()
+
+
+if __name__ == '__main__':
+    main()